@@ -1,26 +1,33 @@
-from PyQt6.QtWidgets import QMessageBox, QWidget, QApplication
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QWidget
 from BundleQtGui import Ui_BundleOptimizer
 from PyQt6 import QtGui
 from PyQt6 import QtCore
 
-import openpyxl
-from openpyxl.worksheet.formula import ArrayFormula
-import pandas as pd
-from tkinter import filedialog
 import os
 from math import ceil, floor
 from datetime import datetime
 import time
-import numpy as np
+import threading
 import warnings
 import ctypes
-import cProfile
+from typing import TYPE_CHECKING
 
 from bundle_classes import SKU, create_packaging_classes
-from bundle_visualize import visualize_bundles
-from bundle_packing import pack_skus
+from bundle_config import PackingConfig, load_packing_config
+from bundle_preview import preview_panels
+from bundle_render import RenderPool
+from bundle_svg import write_html_report
+from bundle_pipeline import PackingTimeout, Pipeline, Stage, pack_executor, pack_order
+from bundle_store import ResultsStore, store_path_for
+from bundle_fingerprint import catalog_version, order_fingerprint
+from bundle_result import PACK_RESULT_EXTENSION, PackResult, PackResultWriter, is_pack_result_file, load_pack_result
 from getJSONdata import VARIABLES
 
+# pandas, numpy and openpyxl take longer to import than the window takes to appear,
+# so they are imported by the methods that use them (on the first optimization)
+if TYPE_CHECKING:
+    import pandas as pd
+
 def excepthook(type, value, traceback):
     """
     Handle exceptions
@@ -37,6 +44,32 @@ def excepthook(type, value, traceback):
 
     QMessageBox.critical(None, "Error", errorString)
 
+class PackingError(Exception):
+    """An order that cannot be packed, which stops the run"""
+
+class OptimizeWorker(QtCore.QObject):
+    """
+    Runs the optimization in a background thread, reporting progress and alerts through signals
+    """
+    progress = QtCore.pyqtSignal(object, object)  # value, text (None to leave unchanged)
+    alert = QtCore.pyqtSignal(str, str, str)  # title, message, type
+    orderPacked = QtCore.pyqtSignal(object, object)  # order, preview panels
+    finished = QtCore.pyqtSignal()
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        try:
+            self.task()
+        except Exception as e:
+            # the global excepthook would show its dialog from this thread
+            self.alert.emit("Error", f"An error occurred:\n\n{e}", "error")
+            self.progress.emit(0, "")
+        finally:
+            self.finished.emit()
+
 class ProgramGUI:
     def __init__(self):
         self.Widget = QWidget()
@@ -49,7 +82,8 @@ class ProgramGUI:
     def setupUi(self):
         # Set icon
         myappid = 'com.aionex.bundleoptimizer'
-        ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+        if os.name == 'nt':
+            ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
         icon_path = os.path.join(os.path.dirname(__file__), 'app_icon_alt.ico')
         self.Widget.setWindowIcon(QtGui.QIcon(icon_path))
@@ -67,8 +101,14 @@ class ProgramGUI:
         self.ui.helpButton.clicked.connect(self.openHelp)
         self.ui.metricButton.clicked.connect(self.setMetricUnits)
         self.ui.imperialButton.clicked.connect(self.setImperialUnits)
+        self.ui.cancelOptimization.clicked.connect(self.cancelOptimization)
+        self.ui.previewOrder.currentIndexChanged.connect(self.showPreviewOrder)
 
         self.workingDir = None  # to hold the directory of the selected Excel file
+        self.worker = None  # to hold the optimization worker while it runs
+        self.renderPool = None  # to hold the image rendering processes while they run
+        self.cancel_requested = False
+        self.order_previews = {}  # order -> preview panels of the packed orders
         self.disabledButton = "background-color: rgb(39, 39, 39); color: rgb(255, 255, 255);"
         self.enabledButton = "background-color: rgb(0, 90, 180); color: rgb(255, 255, 255);"
         self.setImperialUnits()  # Set default units to metric
@@ -81,6 +121,7 @@ class ProgramGUI:
         Set the units to metric (mm, kg)
         """
         self.unit = 'metric'
+        self.ui.previewWidget.set_unit(self.unit)
         self.ui.metricButton.setStyleSheet(self.enabledButton)
         self.ui.imperialButton.setStyleSheet(self.disabledButton)
 
@@ -89,6 +130,7 @@ class ProgramGUI:
         Set the units to imperial (inches, lbs)
         """
         self.unit = 'imperial'
+        self.ui.previewWidget.set_unit(self.unit)
         self.ui.imperialButton.setStyleSheet(self.enabledButton)
         self.ui.metricButton.setStyleSheet(self.disabledButton)
 
@@ -97,9 +139,9 @@ class ProgramGUI:
         Open a dialog to pick an Excel file, return the workbook object
         """
         # get excel file path from user
-        path = filedialog.askopenfilename(
-            title="Select an Excel file",
-            filetypes=[("Excel files", "*.xlsx; *.xls; *.xlsm")],
+        path, _ = QFileDialog.getOpenFileName(
+            self.Widget, "Select an Excel file", self.workingDir or "",
+            f"Excel files (*.xlsx *.xls *.xlsm);;Pack results (*{PACK_RESULT_EXTENSION})",
         )
         if not path:
             return
@@ -113,9 +155,9 @@ class ProgramGUI:
         """
         Get the workbook of Optimized data to append new data to
         """
-        path = filedialog.askopenfilename(
-            title="Select an Excel file to append optimized data to",
-            filetypes=[("Excel files", "*.xlsx; *.xls; *.xlsm")],
+        path, _ = QFileDialog.getOpenFileName(
+            self.Widget, "Select an Excel file to append optimized data to", self.workingDir or "",
+            "Excel files (*.xlsx *.xls *.xlsm)",
         )
         if not path:
             return
@@ -135,27 +177,110 @@ class ProgramGUI:
 
     def optimizeBundles(self):
         """
-        Optimize bundles based on the data from the Excel file
+        Optimize bundles based on the data from the Excel file, in a background thread
+        """
+        if self.worker is not None:
+            return  # already running
+        self.set_unit = self.unit
+        self.export_formats = self.get_export_formats()
+        if not self.export_formats:
+            self.show_alert("No Output", "Please select at least one output file type.", "error")
+            return
+        # read the inputs here, as the worker thread must not touch the widgets
+        self.input_path = self.ui.excelDir.text()
+        self.append_path = self.ui.appendDir.text()
+        self.draw_images = self.ui.exportImages.isChecked()
+        self.cancel_requested = False
+        self.order_previews = {}
+        self.ui.previewOrder.clear()
+        self.ui.previewWidget.clear("Waiting for the first packed order...")
+
+        self.workerThread = QtCore.QThread()
+        self.worker = OptimizeWorker(self.run_optimization)
+        self.worker.moveToThread(self.workerThread)
+        self.workerThread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.alert.connect(self.show_alert)
+        self.worker.orderPacked.connect(self.addPreviewOrder)
+        self.worker.finished.connect(self.workerThread.quit)
+        self.worker.finished.connect(self.optimizationFinished)
+
+        self.ui.optimizeBundles.setEnabled(False)
+        self.ui.cancelOptimization.setEnabled(True)
+        self.workerThread.start()
+
+    def cancelOptimization(self):
+        """
+        Stop the optimization after the current order; completed orders are still saved
+        """
+        self.cancel_requested = True
+        self.ui.cancelOptimization.setEnabled(False)
+        self.ui.progressLabel.setText("Cancelling after the current order...")
+
+    def showProgress(self, value, text):
+        """
+        Show progress reported by the worker thread
+        """
+        if value is not None:
+            self.ui.progressBar.setValue(value)
+        if text is not None:
+            self.ui.progressLabel.setText(text)
+
+    def addPreviewOrder(self, order, panels):
+        """
+        Add a packed order to the preview, showing it unless the user has selected an earlier order
+        """
+        self.order_previews[order] = panels
+        follow = self.ui.previewOrder.currentIndex() in (-1, self.ui.previewOrder.count() - 1)
+        self.ui.previewOrder.addItem(str(order).split('.')[0], order)
+        if follow:
+            self.ui.previewOrder.setCurrentIndex(self.ui.previewOrder.count() - 1)
+
+    def showPreviewOrder(self, index):
         """
-        self.maxWidth = round(VARIABLES['MAX_WIDTH'])  # mm
-        self.maxHeight = round(VARIABLES['MAX_HEIGHT'])  # mm
+        Preview the bundles of the selected order
+        """
+        order = self.ui.previewOrder.itemData(index)
+        if order in self.order_previews:
+            self.ui.previewWidget.set_panels(self.order_previews[order])
+
+    def optimizationFinished(self):
+        """
+        Clean up the worker thread once the optimization has finished
+        """
+        self.workerThread.wait()
+        self.stop_render_pool()  # in case the run stopped with images still queued
+        self.worker.deleteLater()
+        self.workerThread.deleteLater()
+        self.worker = None
+        self.ui.optimizeBundles.setEnabled(True)
+        self.ui.cancelOptimization.setEnabled(False)
+
+    def run_optimization(self):
+        """
+        Get the order data, pack each order's SKUs and write the results (runs in the worker thread)
+        """
+        import numpy as np
+        import openpyxl
         self.maxLength = 3880 # mm
         self.missingDataSKUs = []  # to hold SKUs that are missing data in the Excel file
         self.removed_skus = []  # to hold SKUs that were removed during optimization
         self.mach1_skus = []  # to hold SKUs that are packed with Mach1
         self.append_data = False  # to indicate if we are appending data to an existing workbook
-        self.set_unit = self.unit
 
-        self.ui.progressLabel.setText("Getting data for new orders...")
-        self.ui.progressBar.setValue(10)
+        # previously packed orders are re-rendered and re-written without packing them again
+        if is_pack_result_file(self.input_path):
+            self.rewrite_pack_result(self.input_path)
+            return
+
+        self.set_progress(10, "Getting data for new orders...")
         # Get data from input workbook
         try:
-            self.workbook = openpyxl.load_workbook(self.ui.excelDir.text(), data_only=True)
+            self.workbook = openpyxl.load_workbook(self.input_path, data_only=True)
             data = self.get_data(self.workbook)
         except Exception as e:
             self.show_alert("Error", "Unable to retrieve data from the Excel file.\nEnsure the file is not open and the path is correct.", "error")
-            self.ui.progressBar.setValue(0)
-            self.ui.progressLabel.setText("")
+            self.set_progress(0, "")
             return
 
         # Get packaging and filler data from the packaging_data file
@@ -164,29 +289,47 @@ class ProgramGUI:
             self.packaging_height, self.packaging_width, self.lumber_height = create_packaging_classes(packaging_data)
         except Exception as e:
             self.show_alert("Error", f"Unable to retrieve data from the packaging data file. Error: {e}", "error")
-            self.ui.progressBar.setValue(0)
-            self.ui.progressLabel.setText("")
+            self.set_progress(0, "")
+            return
+
+        # Get the packing limits (bundle size and weight, tolerances) from variables.json
+        try:
+            self.packing_config = self.get_packing_config()
+        except (OSError, ValueError) as e:
+            self.show_alert("Error", f"Unable to read the packing limits from variables.json. Error: {e}", "error")
+            self.set_progress(0, "")
             return
 
         # get unique orders
         unique_orders = list(data['OrderNbr'].unique())
 
-        if self.ui.appendDir.text():
-            self.ui.progressLabel.setText("Getting data from existing bundles...")
-            self.ui.progressBar.setValue(15)
-            QApplication.processEvents()
-            self.appendWorkbook = openpyxl.load_workbook(self.ui.appendDir.text())
+        # get the rows of each order, grouping the lines once (keyed like unique_orders, which sets the output order)
+        groups = dict(list(data.groupby('OrderNbr', sort=False)))
+        order_rows = {order: groups.get(order, data.iloc[:0]) for order in unique_orders}
+
+        # create SKU objects for each order
+        order_skus = self.create_sku_objects(order_rows)
+
+        if self.append_path:
+            self.set_progress(15, "Getting data from existing bundles...")
+            try:
+                self.resultsStore = self.get_results_store(self.append_path)
+            except Exception as e:
+                self.show_alert("Error", f"Error with the existing optimized data file.\nEnsure the path is correct and the file is not open. Error: {e}", "error")
+                self.set_progress(0, "")
+                return
             self.append_data = True
-            unique_orders, self.appendWorkbook = self.remove_optimized_orders(unique_orders, self.appendWorkbook)
+            # fingerprint each order's line items so unchanged orders are not re-packed
+            catalog = self.get_catalog_version(self.packing_config)
+            self.order_fingerprints = {order: order_fingerprint(skus, catalog) for order, skus in order_skus.items()}
+            unique_orders = self.remove_optimized_orders(unique_orders, self.resultsStore)
             if not unique_orders:
                 self.show_alert("No Orders", "All selected orders have already been optimized in the append workbook.", "info")
-                self.ui.progressBar.setValue(0)
-                self.ui.progressLabel.setText("")
+                self.set_progress(0, "")
                 return
             elif unique_orders == -1:
                 self.show_alert("Error", "Unit mismatch between the program input and the append workbook.\nPlease ensure the units of measurement are consistent.", "error")
-                self.ui.progressBar.setValue(0)
-                self.ui.progressLabel.setText("")
+                self.set_progress(0, "")
                 return
         else:
             # delete existing file
@@ -196,16 +339,11 @@ class ProgramGUI:
                     os.remove(f"{self.workingDir}/Optimized_Bundles.xlsx")
             except Exception as e:
                 self.show_alert("Error", f"Error accessing Optimized_Bundles.xlsx file: {e}", "error")
-                self.ui.progressBar.setValue(0)
-                self.ui.progressLabel.setText("")
+                self.set_progress(0, "")
                 return
 
-        # get array of rows in sorted_data that belong to each order
-        order_rows = {order: data[data['OrderNbr'] == order] for order in unique_orders}
-
-        # create SKU objects for each order
-        order_skus = self.create_sku_objects(order_rows)
-
+        # only the orders still to optimize are packed (in append mode, the new and changed ones)
+        order_skus = {order: skus for order, skus in order_skus.items() if order in unique_orders}
         order_skus = self.remove_invalids(order_skus)
 
         # convert orders from numpy floats to ints
@@ -213,52 +351,56 @@ class ProgramGUI:
             if isinstance(order, np.float64) or isinstance(order, np.int64):
                 order_skus[int(order)] = order_skus.pop(order)
 
-        self.ui.progressBar.setValue(20)
-        images_dir = f"{self.workingDir}/images"
-        os.makedirs(images_dir, exist_ok=True)
-
-        images_dir = f"{self.workingDir}/images"
-        os.makedirs(images_dir, exist_ok=True)
-
-        # pack each order's SKUs into bundles
-        order_bundles = {}
-        for order, skus in order_skus.items():
-            self.ui.progressLabel.setText(f"Packing order {str(order).split('.')[0]}...")
-            # pause to update the GUI
-            QApplication.processEvents()
-            if skus == []:
-                order_bundles[order] = []
-                continue
-            self.ui.progressBar.setValue(int(round(20 + 70 * (list(order_skus.keys()).index(order)) / len(order_skus))))
-            bundles, self.removed_skus = pack_skus(skus, self.maxWidth, self.maxHeight, self.mach1_skus)
-            if bundles == -1:
-                self.show_alert("Error", "Cannot mix MACH1 and MACH5 SKUs in the same bundle override.", "error")
-                self.ui.progressBar.setValue(0)
-                self.ui.progressLabel.setText("")
-                return
-            order_bundles[order] = bundles
+        self.set_progress(20)
+        # images are drawn by worker processes while the next orders are packed
+        self.renderPool = self.start_render_pool()
+        # orders are packed by PACK_WORKERS threads (each with its own process if there are several),
+        # while the finished orders are drawn and turned into output rows
+        pack_workers = max(1, int(VARIABLES.get('PACK_WORKERS', 1)))
+        self.start_pack_pool(packaging_data, pack_workers)
+        self.packResult = PackResultWriter()
+
+        # progress is weighted by the number of SKUs in each order
+        self.order_sizes = {order: len(skus) for order, skus in order_skus.items()}
+        self.budget_limited_orders = []  # orders whose packing budget ran out
+        self.stopped_orders = []  # orders stopped at the hard time limit
+        try:
+            order_count = self.run_pipeline(order_skus.items(), [Stage("pack", self.pack_order_skus, pack_workers)])
+        except PackingError as e:
+            self.show_alert("Error", str(e), "error")
+            self.set_progress(0, "")
+            self.stop_render_pool()
+            return
+        finally:
+            self.stop_pack_pool()
 
-            visualize_bundles(bundles, f"{images_dir}/Order_{order}.png", self.set_unit, self.packaging_height, self.packaging_width, self.lumber_height)
-        self.images_dir = images_dir
+        if not order_count:
+            if self.cancel_requested:
+                self.set_progress(0, "Cancelled.")
+            else:
+                self.show_alert("No Orders", "There are no orders to pack in the input file.", "info")
+                self.set_progress(0, "")
+            self.stop_render_pool()
+            return
 
-        # write the packed bundles to a new sheet in the workbook
-        if self.append_data:
-            self.workbook = self.appendWorkbook
-        self.ui.progressBar.setValue(90)
-        self.ui.progressLabel.setText("Writing optimized bundles to Excel...")
-        QApplication.processEvents()
-        # self.missingDataSKUs.extend(self.removed_skus)  # add removed SKUs to missing data SKUs
-        self.write_optimized_bundles(self.workbook, order_bundles)
-
-        # bundle_counter = 0
-        # for order_id in order_bundles:
-        #     bundle_counter += len(order_bundles[order_id])
-        # print(f"Total bundle count: {bundle_counter}")
-        self.ui.progressBar.setValue(100)
-        self.ui.progressLabel.setText("Packing complete!")
+        # keep the packed bundles, so they can be re-rendered and re-written without packing them again
+        try:
+            self.packResult.save(f"{self.workingDir}/Optimized_Bundles{PACK_RESULT_EXTENSION}", PackResult(
+                order_bundles={},
+                removed_skus=self.removed_skus,
+                packaging_height=self.packaging_height,
+                packaging_width=self.packaging_width,
+                lumber_height=self.lumber_height,
+                unit=self.set_unit,
+                params={'max_width': self.packing_config.max_width, 'max_height': self.packing_config.max_height,
+                        'variables': {**VARIABLES, **self.packing_config.to_variables()}, 'headers': self.input_headers,
+                        'budget_limited_orders': self.budget_limited_orders},
+            ))
+        except Exception as e:
+            self.show_alert("Warning", f"Unable to save the pack result file: {e}")
+        self.packResult = None
 
-        if self.missingDataSKUs:
-            self.show_alert("Missing Data", "There exist InventoryIDs that are missing data in the Excel file\nand have been excluded from optimization.\n\nThey can be found under bundle \'0\' for each order in the optimization file.", "warning")
+        self.write_outputs(order_count)
 
     def openImages(self):
         """
@@ -313,7 +455,8 @@ class ProgramGUI:
             </li>
 
             <li>Click on 'Perform Bundle Optimization' to start the optimization process.<br>
-                Wait for the progress bar to complete.
+                Wait for the progress bar to complete, or click 'Cancel' to stop after the current order<br>
+                (orders completed so far are still saved).
             </li>
 
             <li>Once the optimization is complete, you can:<br>
@@ -322,15 +465,260 @@ class ProgramGUI:
             </li>
         </ol>
 
-        <p><b>NOTE:</b> All files are generated in the same directory as the input Excel file.</p>
+        <p>Select the output files to generate under 'Output Files'. CSV, Parquet and JSON Lines files<br>
+        hold one row per sub-bundle with its placement in the bundle, in metric units.</p>
+
+        <p>Each order is shown in the preview as soon as it is packed; pick an order to preview from the list.<br>
+        Scroll to zoom, drag to move, double-click to reset, and right-click to save the preview as an image.<br>
+        Uncheck 'Images' to skip writing the image files.</p>
+
+        <p><b>NOTE:</b> All files are generated in the same directory as the input Excel file.<br>
+        When appending, a results database (.db) with the same name is kept next to the append file.</p>
         """, type="help")
 
 ## Helper Methods (snake_case)
 
+    def rewrite_pack_result(self, path: str):
+        """
+        Load previously packed orders from a pack result file, then regenerate their images and output files
+        in the selected units
+        """
+        import openpyxl
+        self.set_progress(10, "Loading packed bundles...")
+        try:
+            result = load_pack_result(path)
+        except Exception as e:
+            self.show_alert("Error", f"Unable to load the pack result file. Error: {e}", "error")
+            self.set_progress(0, "")
+            return
+
+        self.missingDataSKUs = result.missing_skus
+        self.removed_skus = result.removed_skus
+        self.packaging_height, self.packaging_width, self.lumber_height = result.packaging_height, result.packaging_width, result.lumber_height
+        self.headers = list(result.params['headers'])
+        self.order_fingerprints = result.fingerprints
+        self.budget_limited_orders = list(result.params.get('budget_limited_orders', []))
+        self.stopped_orders = []
+        # output workbook without the input sheet
+        self.workbook = openpyxl.Workbook()
+        self.workbook.remove(self.workbook.active)
+
+        self.append_data = bool(self.append_path)
+        if self.append_data:
+            try:
+                self.resultsStore = self.get_results_store(self.append_path)
+            except Exception as e:
+                self.show_alert("Error", f"Error with the existing optimized data file.\nEnsure the path is correct and the file is not open. Error: {e}", "error")
+                self.set_progress(0, "")
+                return
+            if self.resultsStore.order_count() and self.resultsStore.get_meta('unit') not in (None, self.set_unit):
+                self.show_alert("Error", "Unit mismatch between the program input and the append workbook.\nPlease ensure the units of measurement are consistent.", "error")
+                self.set_progress(0, "")
+                return
+
+        self.renderPool = self.start_render_pool()
+        self.packResult = None  # the input is already a pack result
+        self.order_sizes = {order: sum(len(bundle.skus) for bundle in bundles) for order, bundles in result.order_bundles.items()}
+        self.write_outputs(self.run_pipeline(result.order_bundles.items(), []))
+
+    def run_pipeline(self, orders, stages: list) -> int:
+        """
+        Run (order, value) items through the stages, which must produce each order's bundles, and into the output sinks
+        (images and preview, pack result, export records and Excel rows). Returns the number of orders completed
+        """
+        self.export_records = []
+        self.order_rows = {}
+        self.order_totals = {}  # order -> (bundle count, weight in kg), for the comparison sheet
+        self.completed_skus = 0
+        self.length_divisor, self.weight_multiplier = self.prepare_bundle_headers()
+
+        # the exports are built before the Excel rows, which fill in the order data of packaging SKUs
+        sinks = [self.order_packed]
+        if self.packResult is not None:
+            sinks.append(self.add_pack_result)
+        if any(fmt != 'xlsx' for fmt in self.export_formats):
+            sinks.append(self.add_export_records)
+        # the append workbook is always updated, as it holds the record of optimized orders
+        if 'xlsx' in self.export_formats or self.append_data:
+            sinks.append(self.add_order_rows)
+        sinks.append(self.order_completed)
+
+        pipeline = Pipeline(stages, sinks, int(VARIABLES.get('PIPELINE_QUEUE_SIZE', 4)), lambda: self.cancel_requested)
+        return pipeline.run(orders)
+
+    def pack_order_skus(self, order, skus: list) -> list:
+        """
+        Pipeline stage: pack one order's SKUs into bundles (in a packing process if there are several packing workers)
+        """
+        if skus == []:
+            return []
+        if self.packPool is None:
+            bundles, removed_skus, budget_limited = pack_order(skus, self.mach1_skus, self.packing_config)
+        else:
+            try:
+                bundles, removed_skus, budget_limited = self.packPool.pack(skus, self.mach1_skus, self.packing_config)
+            except PackingTimeout:
+                self.stopped_orders.append(order)
+                return None  # left out of the outputs
+        if bundles == -1:
+            raise PackingError("Cannot mix MACH1 and MACH5 SKUs in the same bundle override.")
+        self.removed_skus.extend(removed_skus)
+        if budget_limited:
+            self.budget_limited_orders.append(order)
+        return bundles
+
+    def add_pack_result(self, order, bundles: list):
+        """
+        Output sink: add a packed order to the pack result file
+        """
+        self.packResult.add_order(order, bundles, self.missingDataSKUs,
+                                  self.order_fingerprints.get(order) if self.append_data else None)
+
+    def add_export_records(self, order, bundles: list):
+        """
+        Output sink: add a packed order's records to the export files
+        """
+        from bundle_export import bundle_records
+        self.export_records.extend(bundle_records({order: bundles}, self.missingDataSKUs, self.packaging_width,
+                                                  self.packaging_height, self.lumber_height,
+                                                  self.packing_config.packing_engine, self.packing_config.packing_effort,
+                                                  order in self.budget_limited_orders))
+
+    def add_order_rows(self, order, bundles: list):
+        """
+        Output sink: build a packed order's "Optimized_Bundles" rows
+        """
+        self.order_rows[order] = self.build_order_rows(order, bundles, self.length_divisor, self.weight_multiplier)
+        self.order_totals[order] = (len(bundles), sum(bundle.get_total_weight() for bundle in bundles))
+
+    def order_completed(self, order, bundles: list):
+        """
+        Output sink: report progress once every other sink has consumed an order
+        """
+        self.completed_skus += self.order_sizes.get(order, 0)
+        total_skus = sum(self.order_sizes.values()) or 1
+        self.set_progress(int(round(20 + 60 * self.completed_skus / total_skus)), f"Finished order {str(order).split('.')[0]}...")
+
+    def write_outputs(self, order_count: int):
+        """
+        Write the selected output files for the completed orders, then wait for their images
+        (already queued in the render pool)
+        """
+        import openpyxl
+        from bundle_export import export_base_path, write_records
+        export_formats = [fmt for fmt in self.export_formats if fmt != 'xlsx']
+        if export_formats:
+            self.set_progress(text="Writing export files...")
+            try:
+                write_records(self.export_records, export_base_path(self.workingDir, self.append_path or None), export_formats)
+            except Exception as e:
+                self.show_alert("Error", f"Error writing export files: {e}", "error")
+        self.export_records = None
+
+        if 'xlsx' in self.export_formats or self.append_data:
+            if self.append_data:
+                try:
+                    self.workbook = openpyxl.load_workbook(self.append_path)
+                except Exception as e:
+                    self.show_alert("Error", f"Error with the existing optimized data file.\nEnsure the path is correct and the file is not open. Error: {e}", "error")
+                    self.set_progress(0, "")
+                    return
+            self.set_progress(90, "Writing optimized bundles to Excel...")
+            self.write_optimized_bundles(self.workbook, self.order_rows, self.order_totals)
+
+        if self.renderPool is not None:
+            self.finish_images()
+
+        if self.cancel_requested:
+            self.set_progress(100, f"Cancelled - {order_count} completed orders saved.")
+        else:
+            self.set_progress(100, "Packing complete!")
+
+        if self.missingDataSKUs:
+            self.show_alert("Missing Data", "There exist InventoryIDs that are missing data in the Excel file\nand have been excluded from optimization.\n\nThey can be found under bundle \'0\' for each order in the optimization file.", "warning")
+
+        if self.budget_limited_orders:
+            orders = ", ".join(str(order).split('.')[0] for order in self.budget_limited_orders)
+            self.show_alert("Packing Budget", f"The packing budget (ORDER_TIME_BUDGET / ORDER_ITERATION_BUDGET) ran out for orders:\n{orders}\n\nTheir bundles are the best found within the budget.", "warning")
+        if self.stopped_orders:
+            orders = ", ".join(str(order).split('.')[0] for order in self.stopped_orders)
+            self.show_alert("Packing Stopped", f"These orders were still packing at the time limit (ORDER_TIME_LIMIT) and were stopped:\n{orders}\n\nThey are not in the output files.", "warning")
+
+    def start_render_pool(self) -> RenderPool:
+        """
+        Start the worker processes that draw the bundle images (None if images are not selected;
+        orders can still be previewed, and saved as images from the preview)
+        """
+        if not self.draw_images:
+            return None
+        images_dir = f"{self.workingDir}/images"
+        os.makedirs(images_dir, exist_ok=True)
+        self.images_dir = images_dir
+        return RenderPool(images_dir, self.set_unit, self.packaging_height, self.packaging_width, self.lumber_height,
+                          VARIABLES.get('IMAGE_RENDERER', 'matplotlib'))
+
+    def start_pack_pool(self, packaging_data: dict, workers: int):
+        """
+        Start the packing processes, if orders are packed by several workers
+        """
+        self.packPool = pack_executor(packaging_data, workers)
+
+    def stop_pack_pool(self):
+        """
+        Stop the packing processes once the orders are packed
+        """
+        if self.packPool is not None:
+            self.packPool.shutdown(cancel_futures=True)
+            self.packPool = None
+
+    def stop_render_pool(self):
+        """
+        Stop drawing images after the run was stopped
+        """
+        if self.renderPool is not None:
+            self.renderPool.shutdown(cancel=True)
+            self.renderPool = None
+
+    def order_packed(self, order, bundles):
+        """
+        Queue a packed order's image and show it in the preview
+        """
+        if self.renderPool is not None:
+            self.renderPool.submit(order, bundles)
+        if self.worker is not None:
+            # a snapshot, as the bundles are still used (and changed) while writing the outputs
+            self.worker.orderPacked.emit(order, preview_panels(bundles, self.packaging_height, self.packaging_width, self.lumber_height))
+
+    def finish_images(self):
+        """
+        Wait for the queued bundle images (dropping those not started if cancelled), and report any that failed
+        """
+        if self.cancel_requested:
+            # images can be regenerated later from the pack result file
+            self.renderPool.cancel_pending()
+        self.set_progress(95, "Finishing bundle images...")
+        failures = self.renderPool.wait(lambda done, total: self.set_progress(
+            int(round(95 + 5 * done / total)), f"Finishing bundle images ({done} of {total})..."))
+        self.renderPool.shutdown(cancel=self.cancel_requested)
+
+        if self.renderPool.renderer == 'svg':
+            # one page with every order's drawing
+            try:
+                write_html_report({order: self.renderPool.image_path(order) for order in self.renderPool.orders},
+                                  f"{self.images_dir}/Bundle_Report.html")
+            except Exception as e:
+                self.show_alert("Warning", f"Unable to write the bundle report: {e}")
+        self.renderPool = None
+
+        if failures:
+            failed = "\n".join(f"Order {str(order).split('.')[0]}: {error}" for order, error in failures.items())
+            self.show_alert("Images", f"The bundle images of the following orders could not be drawn:\n\n{failed}", "warning")
+
     def get_sub_bundle_data_sheets(self):
         """
         Open a dialog to pick an Excel file, return the sheet "Sub-Bundle_Data"
         """
+        import openpyxl
         # load the workbook and read the sheet "Sub-Bundle_Data"
         path = os.path.join(os.path.dirname(__file__), 'Sub-Bundle_Data.xlsx')
         workbook = openpyxl.load_workbook(path)
@@ -344,113 +732,107 @@ class ProgramGUI:
             return None
         return sb_data, mach1_skus
 
-    def remove_optimized_orders(self, orders, workbook):
+    def get_results_store(self, workbook_path) -> ResultsStore:
         """
-        Remove orders that are already optimized in the workbook
+        Open the results store that belongs to the append workbook, importing the workbook's
+        "Optimized_Bundles" sheet if the store is new or the workbook was edited outside of the program
         """
-        if "Optimized_Bundles" not in workbook.sheetnames:
-            return orders, workbook
-        
-        optimized_sheet = workbook["Optimized_Bundles"]
-        # remove table formatting if it exists
-        if "OptimizedBundlesTable" in optimized_sheet.tables:
-            del optimized_sheet.tables["OptimizedBundlesTable"]
+        import openpyxl
+        store = ResultsStore(store_path_for(workbook_path))
+        if store.needs_sync(workbook_path):
+            workbook = openpyxl.load_workbook(workbook_path, read_only=True)
+            if "Optimized_Bundles" in workbook.sheetnames:
+                store.import_sheet(workbook["Optimized_Bundles"])
+            workbook.close()
+        return store
+
+    def remove_optimized_orders(self, orders, store: ResultsStore):
+        """
+        Remove orders that are already optimized in the results store
+        """
+        if store.order_count() == 0:
+            return orders
 
         # Check if units match
-        for header in optimized_sheet[1]:
-            if 'Width' in header.value or 'Height' in header.value or 'Length' in header.value:
-                if self.set_unit == 'imperial' and '_mm' in header.value:
-                    return -1, workbook  # units mismatch
-                if self.set_unit == 'metric' and '_in' in header.value:
-                    return -1, workbook
-
-        # find orders that have been updated since last optimization (the 'OptimizedOn' column is earlier than the 'LastModifiedOn' column)
-        orders_to_remove = []
-        found_order = False
-        reverted_overrides = []
-        order_rows = {}
-        # get the last modified date of the order from the optimized sheet
-        for rowIdx in range(optimized_sheet.max_row, 0, -1):
-            row = optimized_sheet[rowIdx]
-            if not any(cell.value for cell in row):
-                found_order = False
-                continue  # skip empty rows
-            orderNbr = row[1].value
-            if orderNbr in orders:
-                # remove the order from the file so it can be re-optimized
-                if orderNbr not in order_rows:
-                    order_rows[orderNbr] = []
-                if not found_order:
-                    found_order = True
-                    order_rows[orderNbr].append(rowIdx + 1)
-                order_rows[orderNbr].append(rowIdx)
-
-                if type(row[2].value) is not int:
-                    continue
-                last_modified_on = row[-2].value
-                optimized_on = row[-1].value
-                # convert to datetime if not None
-                if last_modified_on and optimized_on:
-                    last_modified_on = datetime.strptime(last_modified_on, "%Y-%m-%d")
-                    optimized_on = datetime.strptime(optimized_on, "%Y-%m-%d")
-                    if last_modified_on <= optimized_on:
-
-                        override = row[3].value
-                        sku_id = row[7].value.strip()
-
-                        if override and not str(sku_id).startswith('Pack_'):
-                            if (orderNbr not in reverted_overrides
-                                and orderNbr not in self.override_orders
-                                and orderNbr in orders):
-                                reverted_overrides.append(orderNbr)
-
-                        elif orderNbr not in self.override_orders: # modified earlier than it was optimized
-                            # don't re-optimize this order
-                            orders_to_remove.append(orderNbr)
-        # remove the orders that have been optimized
-        orders_to_remove = set(orders_to_remove)  # convert to set for faster lookup
-        orders_to_remove = [order for order in orders_to_remove if order not in reverted_overrides]
-        orders = [order for order in orders if order not in orders_to_remove]
-
-        for order in orders:
-            if order in order_rows:
-                for rowIdx in order_rows[order]:
-                    optimized_sheet.row_dimensions[rowIdx].outlineLevel = 0
-                    optimized_sheet.delete_rows(rowIdx, 1)
-
-        # save the workbook after removing orders
-        try:
-            if optimized_sheet.max_row != 1:
-                optimized_sheet.append([])  # add a blank row at the end to separate orders
-            workbook.save(self.ui.appendDir.text())
-        except Exception as e:
-            self.show_alert("Error", f"Error with the existing optimized data file.\nEnsure the path is correct and the file is not open. Error: {e}", "error")
-            return [], workbook
-        return orders, workbook
+        store_unit = store.get_meta('unit')
+        if store_unit and store_unit != self.set_unit:
+            return -1  # units mismatch
+
+        # orders are re-optimized if they are new or their fingerprint changed; orders without a stored
+        # fingerprint are re-optimized if they have been updated since last optimization
+        # (the 'OptimizedOn' column is earlier than the 'LastModifiedOn' column), or have (or had) a bundle override
+        return store.orders_to_optimize(orders, self.override_orders, self.order_fingerprints)
+
+    def get_export_formats(self) -> list:
+        """
+        Get the output file types selected for this run
+        """
+        checkboxes = {
+            'xlsx': self.ui.exportXlsx,
+            'csv': self.ui.exportCsv,
+            'parquet': self.ui.exportParquet,
+            'jsonl': self.ui.exportJsonl,
+        }
+        return [fmt for fmt, checkbox in checkboxes.items() if checkbox.isChecked()]
+
+    def get_catalog_version(self, packing_config: PackingConfig) -> str:
+        """
+        Get the version of the reference data used for packing: the sub-bundle data, the packaging data and the
+        packing limits (not the other settings of variables.json)
+        """
+        program_dir = os.path.dirname(__file__)
+        return catalog_version([
+            os.path.join(program_dir, 'Sub-Bundle_Data.xlsx'),
+            os.path.join(program_dir, 'Packaging_Data.xlsx'),
+        ], packing_config.to_variables())
 
     def get_data(self, workbook):
         """
         Read data from the 'SO_Input' sheet of the workbook
         """
+        import pandas as pd
         # get the "SO_PackExportData" sheet
         so_input = workbook["SO-PackExportData"]
         if not so_input:
             self.show_alert("Warning", "Sheet 'SO-PackExportData' is empty or not found. Using first sheet in the file instead.")
             so_input = workbook.active  # fallback to the first sheet if is not found
-        sb_data, mach1_skus_data = self.get_sub_bundle_data_sheets()
 
         df = pd.DataFrame(columns=[cell.value for cell in so_input[1]])
-        sb_df = pd.DataFrame(columns=[cell.value for cell in sb_data[2]])
-        # read all rows from the sheets
+        # read all rows from the sheet
         for row in so_input.iter_rows(min_row=2, values_only=True):
             if all(cell is None for cell in row):
                 continue
             df.loc[len(df)] = row
+        return self.prepare_order_data(df)
+
+    def get_sub_bundle_rows(self) -> list:
+        """
+        Get the rows of the sub-bundle data that have all their dimensions, as (SKU, row) pairs in the sheet's order
+        """
+        import pandas as pd
+        sb_data, _ = self.get_sub_bundle_data_sheets()
+        sb_df = pd.DataFrame(columns=[cell.value for cell in sb_data[2]])
         for row in sb_data.iter_rows(min_row=3, values_only=True):
             # check for any empty cells in the row
             if any(cell is None for cell in [el for el in row][2:7]):
                 continue
             sb_df.loc[len(sb_df)] = row
+        sb_rows = []
+        for _, row in sb_df.iterrows():
+            if row['Partial Dim To Reduce'] is None:
+                row['Partial Dim To Reduce'] = ''
+            sb_rows.append((row['SKU'], row))
+        return sb_rows
+
+    def prepare_order_data(self, df: "pd.DataFrame", sb_rows: list = None) -> "pd.DataFrame":
+        """
+        Fill in the sub-bundle data of each order line (in the "SO-PackExportData" columns)
+        and convert quantities from pieces to bundles. sb_rows are the rows of get_sub_bundle_rows, if already read
+        """
+        import pandas as pd
+        _, mach1_skus_data = self.get_sub_bundle_data_sheets()
+        if sb_rows is None:
+            sb_rows = self.get_sub_bundle_rows()
 
         # check if the required columns are present
         self.headers = ["OrderType", "OrderNbr", "Bdl_Override", "InventoryID", "Quantity", "Pcs/Bundle", "Can_be_bottom",
@@ -462,25 +844,19 @@ class ProgramGUI:
                 # add the column with default values
                 df[col] = None
 
-        # put data from sb_df into df rows
-        for _, row in sb_df.iterrows():
-            sku_id = row['SKU']
-            df_rows = []
-            if row['Bottom Row Acceptable']:
-                can_be_bottom = True
-            else:
-                can_be_bottom = False
-            for index, df_row in df.iterrows():
+        # put the sub-bundle data into the df rows: a line takes the last sub-bundle row whose SKU is part of its ID
+        for df_row_idx, inventory_id in df['InventoryID'].items():
+            row = None
+            for sku_id, sb_row in sb_rows:
                 try:
-                    if sku_id in df_row['InventoryID']:
-                        df_rows.append(index)
+                    if sku_id in inventory_id:
+                        row = sb_row
                 except TypeError:
-                    # if df_row['InventoryID'] is None, skip this row
+                    # if the InventoryID is None, it matches no SKU
                     continue
-            if row['Partial Dim To Reduce'] is None:
-                row['Partial Dim To Reduce'] = ''
-            for df_row_idx in df_rows:
-                # update the Pcs/Bundle column with the value from sb_df
+            if row is not None:
+                can_be_bottom = bool(row['Bottom Row Acceptable'])
+                # update the Pcs/Bundle column with the value from the sub-bundle data
                 df.loc[df_row_idx, 'Pcs/Bundle'] = row['Qty/bundle']
                 df.loc[df_row_idx, 'Width_mm'] = row['Width (mm)']
                 df.loc[df_row_idx, 'Height_mm'] = row['Height (mm)']
@@ -523,10 +899,18 @@ class ProgramGUI:
 
         return df
 
+    def get_packing_config(self) -> PackingConfig:
+        """
+        Read the packing limits, engine and effort from variables.json (on every run, so edits apply without restarting the program)
+        """
+        return load_packing_config()
+
     def get_packaging_data(self):
         """
         Read data from the 'Packaging_Data' file
         """
+        import openpyxl
+        import pandas as pd
         path = os.path.join(os.path.dirname(__file__), 'Packaging_Data.xlsx')
         if not os.path.exists(path):
             raise FileNotFoundError("Packaging_Data.xlsx file not found.")
@@ -557,8 +941,8 @@ class ProgramGUI:
             valid_skus = []
             for sku in skus:
                 if None in (sku.width, sku.height, sku.length, sku.weight):
-                    if sku.id not in self.missingDataSKUs:
-                        self.missingDataSKUs.append(sku)  # add to missing data SKUs list
+                    # add to missing data SKUs list (each unit: the list holds SKUs, not IDs, so none is left out)
+                    self.missingDataSKUs.append(sku)
                 else:
                     valid_skus.append(sku)
             order_skus[order] = valid_skus
@@ -566,15 +950,26 @@ class ProgramGUI:
 
     def create_sku_objects(self, order_rows: dict):
         """
-        Create arrays of SKU objects for each order
+        Create arrays of SKU objects for each order: one per sub-bundle of each line. The lines of all orders are
+        converted, and the dimensions of their partial sub-bundles computed, in one batch
         """
+        import pandas as pd
         order_skus = {}
+        if not order_rows:
+            return order_skus
+        lines = pd.concat(order_rows.values())
+        records = lines.to_dict('records')
+        shrink_widths, shrunk_sizes = self.partial_dimensions(lines)
+        line_data = {}  # shared data of the SKUs of identical order lines
+        start = 0
         for order, rows in order_rows.items():
             skus = []
-            for _, row in rows.iterrows():
+            end = start + len(rows)
+            for row, shrink_width, shrunk_size in zip(records[start:end], shrink_widths[start:end], shrunk_sizes[start:end]):
                 # get quantity of SKU from the row
                 quantity = row['Quantity']
                 invID = row['InventoryID'].strip()
+                data = self.sku_data(row, line_data)
                 newLength = row['Length_mm']
                 if newLength is not None:
                     if 3600 <= newLength <= 3700:
@@ -584,7 +979,10 @@ class ProgramGUI:
                     # partial sub-bundle
                     remainder = quantity - floor(quantity)
                     if remainder > 0:
-                        width, height = self.shrink_to_square(row['Width_mm'], row['Height_mm'], remainder, row['Dim_shrink'])
+                        if shrink_width:
+                            width, height = shrunk_size, row['Height_mm']
+                        else:
+                            width, height = row['Width_mm'], shrunk_size
                         new_invID = f"{invID}_Partial"
                         sku = SKU(
                             id=new_invID,
@@ -595,109 +993,76 @@ class ProgramGUI:
                             weight=row['Weight_kg'] * remainder,
                             desc=row['Description'],
                             can_be_bottom=row['Can_be_bottom'],
-                            data={
-                                'OrderType': row['OrderType'],
-                                'OrderNbr': row['OrderNbr'],
-                                'UOM': row['UOM'],
-                                'Bdl_Override': row['Bdl_Override'] if pd.notna(row['Bdl_Override']) else None,
-                                'ShipTo': row['ShipTo'],
-                                'AddressLine1': row['AddressLine1'],
-                                'AddressLine2': row['AddressLine2'],
-                                'City': row['City'],
-                                'State': row['State'],
-                                'Country': row['Country'],
-                                'Status': row['Status'],
-                                'OrderDate': row['OrderDate'],
-                                'ProdReleaseDate': row['ProdReleaseDate'],
-                                'SchedShipDate': row['SchedShipDate'],
-                                'TargetArrival': row['TargetArrival'],
-                                'NotBefore': row['NotBefore'],
-                                'ShipVia': row['ShipVia'],
-                                'LastModifiedOn': row['LastModifiedOn'],
-                                'Component': row['Component']
-                            }
+                            data=data,
                         )
                         skus.append(sku)
                     quantity = floor(quantity)  # convert to whole number for the rest of the SKUs
 
-                for _ in range(int(abs(ceil(quantity)))):
-                    sku = SKU(
-                        id=invID,
-                        bundleqty=row['Pcs/Bundle'],
-                        width=row['Width_mm'],
-                        height=row['Height_mm'],
-                        length=newLength,
-                        weight=row['Weight_kg'],
-                        desc=row['Description'],
-                        can_be_bottom=row['Can_be_bottom'],
-                        data={
-                            'OrderType': row['OrderType'],
-                            'OrderNbr': row['OrderNbr'],
-                            'UOM': row['UOM'],
-                            'Bdl_Override': row['Bdl_Override'] if pd.notna(row['Bdl_Override']) else None,
-                            'ShipTo': row['ShipTo'],
-                            'AddressLine1': row['AddressLine1'],
-                            'AddressLine2': row['AddressLine2'],
-                            'City': row['City'],
-                            'State': row['State'],
-                            'Country': row['Country'],
-                            'Status': row['Status'],
-                            'OrderDate': row['OrderDate'],
-                            'ProdReleaseDate': row['ProdReleaseDate'],
-                            'SchedShipDate': row['SchedShipDate'],
-                            'TargetArrival': row['TargetArrival'],
-                            'NotBefore': row['NotBefore'],
-                            'ShipVia': row['ShipVia'],
-                            'LastModifiedOn': row['LastModifiedOn'],
-                            'Component': row['Component']
-                        }
-                    )
-                    skus.append(sku)
+                bundleqty, width, height = row['Pcs/Bundle'], row['Width_mm'], row['Height_mm']
+                weight, desc, can_be_bottom = row['Weight_kg'], row['Description'], row['Can_be_bottom']
+                skus.extend(SKU(id=invID, bundleqty=bundleqty, width=width, height=height, length=newLength, weight=weight,
+                                desc=desc, can_be_bottom=can_be_bottom, data=data)
+                            for _ in range(int(abs(ceil(quantity)))))
             order_skus[order] = skus
+            start = end
         return order_skus
 
-    def shrink_to_square(self, w, h, x, dim_to_shrink):
+    def sku_data(self, row, line_data: dict) -> dict:
         """
-        Shrinks the area of a rectangle by a multiplier `x`, changing only one dimension
+        The order data of an order line's SKUs. All units of the line, and of identical lines, share one dict
+        (interned in line_data), so SKU data must not be changed in place
         """
-        if not (0 < x < 1):
-            self.show_alert("Error", "Shrink multiplier must be between 0 and 1.", "error")
-
-        original_area = w * h
-        new_area = original_area * x
-
-        if dim_to_shrink.lower() == 'height':
-            # Option 2: change height, keep width
-            new_h2 = new_area / w
-            return (w, new_h2)
-        elif dim_to_shrink.lower() == 'width':
-            # Option 1: change width, keep height
-            new_w1 = new_area / h
-            return (new_w1, h)
-        else:
-            # shrink smaller dim if not specified
-            if w < h:
-                new_w1 = new_area / h
-                return (new_w1, h)
-            else:
-                new_h2 = new_area / w
-                return (w, new_h2)
+        import pandas as pd
+        data = {
+            'OrderType': row['OrderType'],
+            'OrderNbr': row['OrderNbr'],
+            'UOM': row['UOM'],
+            'Bdl_Override': row['Bdl_Override'] if pd.notna(row['Bdl_Override']) else None,
+            'ShipTo': row['ShipTo'],
+            'AddressLine1': row['AddressLine1'],
+            'AddressLine2': row['AddressLine2'],
+            'City': row['City'],
+            'State': row['State'],
+            'Country': row['Country'],
+            'Status': row['Status'],
+            'OrderDate': row['OrderDate'],
+            'ProdReleaseDate': row['ProdReleaseDate'],
+            'SchedShipDate': row['SchedShipDate'],
+            'TargetArrival': row['TargetArrival'],
+            'NotBefore': row['NotBefore'],
+            'ShipVia': row['ShipVia'],
+            'LastModifiedOn': row['LastModifiedOn'],
+            'Component': row['Component']
+        }
+        try:
+            return line_data.setdefault(tuple(data.values()), data)
+        except TypeError:  # a value that cannot be a key
+            return data
 
-    def write_optimized_bundles(self, workbook, order_bundles: dict):
+    def partial_dimensions(self, rows: 'pd.DataFrame') -> tuple:
         """
-        Write the packed bundles to a new sheet in the workbook
+        Shrink the cross-section of each line's partial sub-bundle by its fraction of a sub-bundle, changing only
+        one dimension: the one Dim_shrink names, or else the smaller one. Computed for all lines at once; returns
+        per line whether the width is shrunk, and its shrunk width or height (None without dimensions)
         """
-        # create a new sheet for the optimized bundles
-        if "SO-PackExportData" in workbook.sheetnames:
-            del workbook["SO-PackExportData"]
-        if not self.append_data:
-            if "Optimized_Bundles" in workbook.sheetnames:
-                del workbook["Optimized_Bundles"]
-            optimized_sheet = workbook.create_sheet("Optimized_Bundles")
-        else:
-            optimized_sheet = workbook["Optimized_Bundles"]
-
-        # write headers
+        import numpy as np
+        import pandas as pd
+        quantity = pd.to_numeric(rows['Quantity'], errors='coerce').to_numpy(dtype=float)
+        width = pd.to_numeric(rows['Width_mm'], errors='coerce').to_numpy(dtype=float)
+        height = pd.to_numeric(rows['Height_mm'], errors='coerce').to_numpy(dtype=float)
+        shrink = rows['Dim_shrink'].astype(str).str.lower().to_numpy()
+        shrink_width = (shrink == 'width') | ((shrink != 'height') & (width < height))
+        new_area = width * height * (quantity - np.floor(quantity))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shrunk = np.where(shrink_width, new_area / height, new_area / width)
+        return shrink_width.tolist(), [None if np.isnan(size) else size for size in shrunk.tolist()]
+
+    def prepare_bundle_headers(self) -> tuple:
+        """
+        Turn the input headers into the "Optimized_Bundles" headers in the selected units,
+        returning the length divisor and weight multiplier of those units
+        """
+        self.input_headers = list(self.headers)
         intersect_headers = ['Can_be_bottom', 'Dim_shrink', 'Component']
         # remove intersect headers from the main headers
         self.headers = [header for header in self.headers if header not in intersect_headers]
@@ -725,322 +1090,293 @@ class ProgramGUI:
         else:
             length_divisor = 1
             weight_multiplier = 1
+        return length_divisor, weight_multiplier
 
-        if not self.append_data:
-            optimized_sheet.append(self.headers)
-
-        bottom_groups = []
-
-        # add data for each order's bundles
-        for orderIdx, order in enumerate(order_bundles.keys()):
-            bundles = order_bundles[order]
-            self.ui.progressBar.setValue(int(round(90 + 5 * ((orderIdx + 1) / len(order_bundles)))))
-            QApplication.processEvents()
-
-            # add a row with total order summary (only if there are bundles)
-            if bundles:
-                total_sub_bundles = sum([len(bundle.skus) for bundle in bundles])
-                total_pcs = sum([sku.bundleqty for bundle in bundles for sku in bundle.skus])
-
-                total_weight = sum([bundle.get_total_weight() for bundle in bundles])
-                optimized_sheet.append([
-                    bundles[0].skus[0].data['OrderType'],
-                    order,
-                    'ALL',  # BundleNbr
-                    '',  # Bdl_Override
-                    '',  # Machine
-                    '',  # ReviewedBy
-                    '',  # ApprovedBy
-                    'Total_Order',
-                    total_sub_bundles,
-                    'N/A',
-                    total_pcs,
-                    'N/A',
-                    'N/A',
-                    'N/A',
-                    round(total_weight * weight_multiplier),
-                    '',
-                    'Total Order Summary',
-                    bundles[0].skus[0].data['ShipTo'],
-                    bundles[0].skus[0].data['AddressLine1'],  # AddressLine1
-                    bundles[0].skus[0].data['AddressLine2'],  # AddressLine2
-                    bundles[0].skus[0].data['City'],  # City
-                    bundles[0].skus[0].data['State'],  # State
-                    bundles[0].skus[0].data['Country'],  # Country
-                    bundles[0].skus[0].data['Status'],  # Status
-                    bundles[0].skus[0].data['OrderDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['OrderDate'] else None,  # OrderDate
-                    bundles[0].skus[0].data['ProdReleaseDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['ProdReleaseDate'] else None,  # ProdReleaseDate
-                    bundles[0].skus[0].data['SchedShipDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['SchedShipDate'] else None,  # SchedShipDate
-                    bundles[0].skus[0].data['TargetArrival'],  # TargetArrival
-                    bundles[0].skus[0].data['NotBefore'],  # NotBefore
-                    bundles[0].skus[0].data['ShipVia'],  # ShipVia
-                    bundles[0].skus[0].data['LastModifiedOn'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['LastModifiedOn'] else None,  # LastModifiedOn
-                    datetime.now().strftime("%Y-%m-%d"),
-                ])
-
-            # add missing/removed skus as part of bundle "0"
-            if order in [sku.data['OrderNbr'] for sku in self.missingDataSKUs]:
-
-                order_missing = [sku for sku in self.missingDataSKUs if sku.data['OrderNbr'] == order]
-                # add a summary row for missing SKUs
-                optimized_sheet.append([
-                    order_missing[0].data['OrderType'],
-                    order,
-                    '0_ALL',  # BundleNbr
-                    '',  # Bdl_Override
-                    '',  # Machine
-                    '',  # ReviewedBy
-                    '',  # ApprovedBy
-                    'Missing_SKUs',
-                    len(order_missing),  # TotalPcs
-                    'N/A',  # BundleQty
-                    'N/A',  # Total Bundle Qty
-                    'N/A',  # Width
-                    'N/A',  # Height
-                    'N/A',  # Length
-                    'N/A',  # Weight
-                    '',  # UOM
-                    'Missing SKUs Summary',
-                    order_missing[0].data['ShipTo'],
-                    order_missing[0].data['AddressLine1'],  # AddressLine1
-                    order_missing[0].data['AddressLine2'],  # AddressLine2
-                    order_missing[0].data['City'],  # City
-                    order_missing[0].data['State'],  # State
-                    order_missing[0].data['Country'],  # Country
-                    order_missing[0].data['Status'],  # Status
-                    order_missing[0].data['OrderDate'].strftime("%Y-%m-%d") if order_missing[0].data['OrderDate'] else None,  # OrderDate
-                    order_missing[0].data['ProdReleaseDate'].strftime("%Y-%m-%d") if order_missing[0].data['ProdReleaseDate'] else None,  # ProdReleaseDate
-                    order_missing[0].data['SchedShipDate'].strftime("%Y-%m-%d") if order_missing[0].data['SchedShipDate'] else None,  # SchedShipDate
-                    order_missing[0].data['TargetArrival'],  # TargetArrival
-                    order_missing[0].data['NotBefore'],  # NotBefore
-                    order_missing[0].data['ShipVia'],  # ShipVia
-                    order_missing[0].data['LastModifiedOn'].strftime("%Y-%m-%d") if order_missing[0].data['LastModifiedOn'] else None,  # LastModifiedOn
-                    datetime.now().strftime("%Y-%m-%d"),
-                ])
-
-                # add a row for each missing SKU
-                written_skus = set()  # to avoid writing the same SKU multiple times
-                for sku in order_missing:
-                    if sku.id in written_skus:
-                        continue
-                    else:
-                        written_skus.add(sku.id)
-                        # count the number of identical SKUs in the order
-                        order_skus = [s for s in self.missingDataSKUs if s.id == sku.id]
-                        quantity = len(order_skus)
-                    if sku.data['OrderNbr'] == order:
-                        optimized_sheet.append([
-                            sku.data['OrderType'],
-                            order,
-                            0,
-                            sku.data['Bdl_Override'],
-                            '',  # Machine
-                            '',  # ReviewedBy
-                            '',  # ApprovedBy
-                            sku.id,
-                            quantity,
-                            round(sku.bundleqty) if sku.bundleqty else "N/A",  # default to 1 if bundleqty is None
-                            "N/A" if not sku.bundleqty else round(quantity * sku.bundleqty),
-                            sku.width / length_divisor if sku.width else "N/A",
-                            sku.height / length_divisor if sku.height else "N/A",
-                            sku.length / length_divisor if sku.length else "N/A",
-                            round(sku.weight * weight_multiplier, 1) if sku.weight else "N/A",
-                            sku.data['UOM'],
-                            sku.desc,
-                            sku.data['ShipTo'],
-                            sku.data['AddressLine1'],
-                            sku.data['AddressLine2'],
-                            sku.data['City'],
-                            sku.data['State'],
-                            sku.data['Country'],
-                            sku.data['Status'],
-                            sku.data['OrderDate'].strftime("%Y-%m-%d") if sku.data['OrderDate'] else None,
-                            sku.data['ProdReleaseDate'].strftime("%Y-%m-%d") if sku.data['ProdReleaseDate'] else None,
-                            sku.data['SchedShipDate'].strftime("%Y-%m-%d") if sku.data['SchedShipDate'] else None,
-                            sku.data['TargetArrival'],
-                            sku.data['NotBefore'],
-                            sku.data['ShipVia'],
-                            sku.data['LastModifiedOn'].strftime("%Y-%m-%d") if sku.data['LastModifiedOn'] else None,
-                            datetime.now().strftime("%Y-%m-%d"),
-                        ])
-
-            order_row_count = 0
-            for bundle_index, bundle in enumerate(bundles):
-                # get quantity of each SKU in the bundle (including stacked quantities)
-                sku_counts = {}
-                for sku in bundle.skus:
-                    if sku.id not in sku_counts:
-                        sku_counts[sku.id] = {'qty': 0, 'sku': sku}
-                    sku_counts[sku.id]['qty'] += 1
-
-                # calculate bundle actual dimensions and weight
-                actual_width, actual_height, _ = bundle.get_actual_dimensions(visual=True)
-                total_weight = bundle.get_total_weight()
-                lumber = self.lumber_height if all([sku.rotated is False for sku in bundle.skus]) else 0
-
-                # add summary row for the bundle
-                optimized_sheet.append([
-                    bundle.skus[0].data['OrderType'],
-                    order,
-                    f'{bundle_index + 1}_ALL',  # BundleNbr
-                    bundle.skus[0].data['Bdl_Override'] if bundle.skus[0].data['Bdl_Override'] else '',  # Bdl_Override
-                    bundle.packing_machine,  # Machine
-                    '',  # ReviewedBy
-                    '',  # ApprovedBy
-                    f'Total_Bundle_{bundle_index + 1}',  # SKU
-                    len(bundle.skus),  # TotalPcs
-                    'N/A',  # BundleQty
-                    sum(round(sku.bundleqty) for sku in bundle.skus),
-                    round((actual_width + self.packaging_width) / length_divisor),
-                    round((actual_height + self.packaging_height + lumber) / length_divisor),
-                    round(bundle.max_length / length_divisor),
-                    round(total_weight * weight_multiplier),
-                    '',  # UOM
-                    f'Bundle {bundle_index + 1} Summary',  # Description
-                    bundle.skus[0].data['ShipTo'],
-                    bundle.skus[0].data['AddressLine1'],  # AddressLine1
-                    bundle.skus[0].data['AddressLine2'],  # AddressLine2
-                    bundle.skus[0].data['City'],  # City
-                    bundle.skus[0].data['State'],  # State
-                    bundle.skus[0].data['Country'],  # Country
-                    bundle.skus[0].data['Status'],  # Status
-                    bundle.skus[0].data['OrderDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['OrderDate'] else None,  # OrderDate
-                    bundle.skus[0].data['ProdReleaseDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['ProdReleaseDate'] else None,  # ProdReleaseDate
-                    bundle.skus[0].data['SchedShipDate'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['SchedShipDate'] else None,  # SchedShipDate
-                    bundle.skus[0].data['TargetArrival'],  # TargetArrival
-                    bundle.skus[0].data['NotBefore'],  # NotBefore
-                    bundle.skus[0].data['ShipVia'],  # ShipVia
-                    bundle.skus[0].data['LastModifiedOn'].strftime("%Y-%m-%d") if bundles[0].skus[0].data['LastModifiedOn'] else None,  # LastModifiedOn
-                    datetime.now().strftime("%Y-%m-%d"),
-                ])
-
-                packaging_skus_active = False
-                packaging_idx = 2
-                # write each SKU in the bundle to the sheet
-                for sku_id, sku_data in sku_counts.items():
-                    # fix length of SKU ID
-                    if sku_data['sku'].length == 3650:
-                        sku_data['sku'].length = 3680
-
-                    if "Pack_Angle" in sku_id and not packaging_skus_active:
-                        packaging_skus_active = True
-                        packaging_idx = optimized_sheet.max_row + 2
-                    # check if data is None (this happens for Packaging SKUs)
-                    if sku_data['sku'].data is None:
-                        # give data from another SKU in the order, since they are the same (except UOM)
-                        for _, nested_sku_data in sku_counts.items():
-                            if nested_sku_data['sku'].data is not None:
-                                sku_data['sku'].data = nested_sku_data['sku'].data
-                                sku_data['sku'].data['UOM'] = ''
-                                break
-                    try:
-                        optimized_sheet.append([
-                            sku_data['sku'].data['OrderType'],
-                            order,
-                            bundle_index + 1,
-                            sku_data['sku'].data['Bdl_Override'],
-                            bundle.packing_machine,
-                            '',  # ReviewedBy
-                            '',  # ApprovedBy
-                            sku_id,
-                            sku_data['qty'],
-                            round(sku_data['sku'].bundleqty),
-                            round(sku_data['qty'] * sku_data['sku'].bundleqty),
-                            round(sku_data['sku'].width / length_divisor, 1),
-                            round(sku_data['sku'].height / length_divisor, 1),
-                            round(sku_data['sku'].length / length_divisor),
-                            round(sku_data['sku'].weight * weight_multiplier, 1),
-                            sku_data['sku'].data['UOM'],
-                            sku_data['sku'].desc,
-                            sku_data['sku'].data['ShipTo'],
-                            sku_data['sku'].data['AddressLine1'],
-                            sku_data['sku'].data['AddressLine2'],
-                            sku_data['sku'].data['City'],
-                            sku_data['sku'].data['State'],
-                            sku_data['sku'].data['Country'],
-                            sku_data['sku'].data['Status'],
-                            sku_data['sku'].data['OrderDate'].strftime("%Y-%m-%d") if sku_data['sku'].data['OrderDate'] else None,
-                            sku_data['sku'].data['ProdReleaseDate'].strftime("%Y-%m-%d") if sku_data['sku'].data['ProdReleaseDate'] else None,
-                            sku_data['sku'].data['SchedShipDate'].strftime("%Y-%m-%d") if sku_data['sku'].data['SchedShipDate'] else None,
-                            sku_data['sku'].data['TargetArrival'],
-                            sku_data['sku'].data['NotBefore'],
-                            sku_data['sku'].data['ShipVia'],
-                            sku_data['sku'].data['LastModifiedOn'].strftime("%Y-%m-%d") if sku_data['sku'].data['LastModifiedOn'] else None,
-                            datetime.now().strftime("%Y-%m-%d"),
-                        ])
-                        order_row_count += 1
-                    except Exception as e:
-                        self.show_alert("Error", f"Error writing SKU {sku_id} to the sheet: {e}", "error")
-                        return
-                if packaging_skus_active:
-                    bottom_groups.extend(range(packaging_idx - 1, optimized_sheet.max_row))
-            # add a blank row after each order's bundles
-            optimized_sheet.append([])
-
-        # update text
-        self.ui.progressLabel.setText("Saving Excel file...")
-        QApplication.processEvents()
+    def write_optimized_bundles(self, workbook, order_rows: dict, order_totals: dict):
+        """
+        Write the rows of the packed orders to a new sheet in the workbook
+        """
+        # create a new sheet for the optimized bundles
+        if "SO-PackExportData" in workbook.sheetnames:
+            del workbook["SO-PackExportData"]
 
-        # create a table over the data
-        if "OptimizedBundlesTable" in optimized_sheet.tables:
-            del optimized_sheet.tables["OptimizedBundlesTable"]
-        table = openpyxl.worksheet.table.Table(displayName="OptimizedBundlesTable", ref=optimized_sheet.dimensions, tableStyleInfo=openpyxl.worksheet.table.TableStyleInfo(
-            name="TableStyleMedium9", showFirstColumn=False, showLastColumn=False, showRowStripes=True))
-        # resize the table to fit the data
-        optimized_sheet.add_table(table)
+        if any(rows is None for rows in order_rows.values()):
+            return  # a row could not be built (already reported)
 
-        optimized_sheet.row_dimensions[optimized_sheet.max_row+1].outlineLevel = 1
+        if self.append_data:
+            # replace the re-optimized orders in the results store, then export every stored order
+            self.resultsStore.replace_orders(order_rows, {order: self.order_fingerprints.get(order) for order in order_rows})
+            self.resultsStore.set_meta('unit', self.set_unit)
+            self.resultsStore.set_meta('headers', self.headers)
+            order_rows = dict(self.resultsStore.iter_orders())
 
-        # if two blank rows in a row, remove the first one
-        for row in range(optimized_sheet.max_row, 1, -1):
-            # 2 consecutive blank rows
-            if optimized_sheet[row][0].value is None and optimized_sheet[row - 1][0].value is None:
-                optimized_sheet.delete_rows(row - 1, 1)
-                optimized_sheet.row_dimensions[row + 1].outlineLevel = 1
-            if optimized_sheet.row_dimensions[row].outlineLevel == 3:
-                continue
-            # if the row is blank, set the outline level to 0
-            if row in bottom_groups:
-                optimized_sheet.row_dimensions[row].outlineLevel = 3
-            elif type(optimized_sheet[row][2].value) is int:
-                optimized_sheet.row_dimensions[row].outlineLevel = 2
-            elif optimized_sheet[row][0].value is None:
-                optimized_sheet.row_dimensions[row].outlineLevel = 0
-                optimized_sheet.row_dimensions[row + 1].outlineLevel = 0
-            # if the row is not blank, set the outline level to 1
-            else:
-                optimized_sheet.row_dimensions[row].outlineLevel = 1
-        optimized_sheet.row_dimensions[2].outlineLevel = 0  # first row is the header, no grouping
+        # update text
+        self.set_progress(text="Saving Excel file...")
 
-        for row in range(1, optimized_sheet.max_row + 1):
-            optimized_sheet.row_dimensions[row].hidden = False
+        # (re)create the sheet in the same position
+        sheet_index = None
+        if "Optimized_Bundles" in workbook.sheetnames:
+            sheet_index = workbook.sheetnames.index("Optimized_Bundles")
+            del workbook["Optimized_Bundles"]
+        optimized_sheet = workbook.create_sheet("Optimized_Bundles", sheet_index)
+        self.write_bundle_sheet(optimized_sheet, order_rows)
 
         # create new sheet with formula data
-        self.write_comparison_sheet(workbook, order_bundles)
+        self.write_comparison_sheet(workbook, order_totals)
 
         # save the workbook
         try:
             if self.append_data:
-                workbook.save(self.ui.appendDir.text())
+                workbook.save(self.append_path)
+                self.resultsStore.mark_synced(self.append_path)
             else:
                 workbook.save(f"{self.workingDir}/Optimized_Bundles.xlsx")
         except Exception as e:
             self.show_alert("Error", f"Error saving the file. Is it already open? Error: {e}", "error")
             return
 
-    def write_comparison_sheet(self, workbook, bundles: dict):
+    def build_order_rows(self, order, bundles, length_divisor, weight_multiplier) -> list:
+        """
+        Build the "Optimized_Bundles" rows (order summary, missing SKUs and bundle rows) for one order
+        """
+        rows = []
+        # add a row with total order summary (only if there are bundles)
+        if bundles:
+            total_sub_bundles = sum([len(bundle.skus) for bundle in bundles])
+            total_pcs = sum([sku.bundleqty for bundle in bundles for sku in bundle.skus])
+
+            total_weight = sum([bundle.get_total_weight() for bundle in bundles])
+            rows.append([
+                bundles[0].skus[0].data['OrderType'],
+                order,
+                'ALL',  # BundleNbr
+                '',  # Bdl_Override
+                '',  # Machine
+                '',  # ReviewedBy
+                '',  # ApprovedBy
+                'Total_Order',
+                total_sub_bundles,
+                'N/A',
+                total_pcs,
+                'N/A',
+                'N/A',
+                'N/A',
+                round(total_weight * weight_multiplier),
+                '',
+                'Total Order Summary',
+                *self.order_info_cells(bundles[0].skus[0].data),
+            ])
+
+        # add missing/removed skus as part of bundle "0"
+        if order in [sku.data['OrderNbr'] for sku in self.missingDataSKUs]:
+
+            order_missing = [sku for sku in self.missingDataSKUs if sku.data['OrderNbr'] == order]
+            # add a summary row for missing SKUs
+            rows.append([
+                order_missing[0].data['OrderType'],
+                order,
+                '0_ALL',  # BundleNbr
+                '',  # Bdl_Override
+                '',  # Machine
+                '',  # ReviewedBy
+                '',  # ApprovedBy
+                'Missing_SKUs',
+                len(order_missing),  # TotalPcs
+                'N/A',  # BundleQty
+                'N/A',  # Total Bundle Qty
+                'N/A',  # Width
+                'N/A',  # Height
+                'N/A',  # Length
+                'N/A',  # Weight
+                '',  # UOM
+                'Missing SKUs Summary',
+                *self.order_info_cells(order_missing[0].data),
+            ])
+
+            # add a row for each missing SKU
+            written_skus = set()  # to avoid writing the same SKU multiple times
+            for sku in order_missing:
+                if sku.id in written_skus:
+                    continue
+                else:
+                    written_skus.add(sku.id)
+                    # count the number of identical SKUs in the order
+                    order_skus = [s for s in self.missingDataSKUs if s.id == sku.id]
+                    quantity = len(order_skus)
+                if sku.data['OrderNbr'] == order:
+                    rows.append([
+                        sku.data['OrderType'],
+                        order,
+                        0,
+                        sku.data['Bdl_Override'],
+                        '',  # Machine
+                        '',  # ReviewedBy
+                        '',  # ApprovedBy
+                        sku.id,
+                        quantity,
+                        round(sku.bundleqty) if sku.bundleqty else "N/A",  # default to 1 if bundleqty is None
+                        "N/A" if not sku.bundleqty else round(quantity * sku.bundleqty),
+                        sku.width / length_divisor if sku.width else "N/A",
+                        sku.height / length_divisor if sku.height else "N/A",
+                        sku.length / length_divisor if sku.length else "N/A",
+                        round(sku.weight * weight_multiplier, 1) if sku.weight else "N/A",
+                        sku.data['UOM'],
+                        sku.desc,
+                        *self.order_info_cells(sku.data),
+                    ])
+
+        for bundle_index, bundle in enumerate(bundles):
+            # get quantity of each SKU in the bundle (including stacked quantities)
+            sku_counts = {}
+            for sku in bundle.skus:
+                if sku.id not in sku_counts:
+                    sku_counts[sku.id] = {'qty': 0, 'sku': sku}
+                sku_counts[sku.id]['qty'] += 1
+
+            # calculate bundle actual dimensions and weight
+            actual_width, actual_height, _ = bundle.get_actual_dimensions(visual=True)
+            total_weight = bundle.get_total_weight()
+            lumber = self.lumber_height if all([sku.rotated is False for sku in bundle.skus]) else 0
+
+            # add summary row for the bundle
+            rows.append([
+                bundle.skus[0].data['OrderType'],
+                order,
+                f'{bundle_index + 1}_ALL',  # BundleNbr
+                bundle.skus[0].data['Bdl_Override'] if bundle.skus[0].data['Bdl_Override'] else '',  # Bdl_Override
+                bundle.packing_machine,  # Machine
+                '',  # ReviewedBy
+                '',  # ApprovedBy
+                f'Total_Bundle_{bundle_index + 1}',  # SKU
+                len(bundle.skus),  # TotalPcs
+                'N/A',  # BundleQty
+                sum(round(sku.bundleqty) for sku in bundle.skus),
+                round((actual_width + self.packaging_width) / length_divisor),
+                round((actual_height + self.packaging_height + lumber) / length_divisor),
+                round(bundle.max_length / length_divisor),
+                round(total_weight * weight_multiplier),
+                '',  # UOM
+                f'Bundle {bundle_index + 1} Summary',  # Description
+                *self.order_info_cells(bundle.skus[0].data),
+            ])
+
+            # write each SKU in the bundle to the sheet
+            for sku_id, sku_data in sku_counts.items():
+                # fix length of SKU ID
+                if sku_data['sku'].length == 3650:
+                    sku_data['sku'].length = 3680
+
+                # check if data is None (this happens for Packaging SKUs)
+                if sku_data['sku'].data is None:
+                    # give data from another SKU in the order, since they are the same (except UOM)
+                    for _, nested_sku_data in sku_counts.items():
+                        if nested_sku_data['sku'].data is not None:
+                            sku_data['sku'].data = {**nested_sku_data['sku'].data, 'UOM': ''}
+                            break
+                try:
+                    rows.append([
+                        sku_data['sku'].data['OrderType'],
+                        order,
+                        bundle_index + 1,
+                        sku_data['sku'].data['Bdl_Override'],
+                        bundle.packing_machine,
+                        '',  # ReviewedBy
+                        '',  # ApprovedBy
+                        sku_id,
+                        sku_data['qty'],
+                        round(sku_data['sku'].bundleqty),
+                        round(sku_data['qty'] * sku_data['sku'].bundleqty),
+                        round(sku_data['sku'].width / length_divisor, 1),
+                        round(sku_data['sku'].height / length_divisor, 1),
+                        round(sku_data['sku'].length / length_divisor),
+                        round(sku_data['sku'].weight * weight_multiplier, 1),
+                        sku_data['sku'].data['UOM'],
+                        sku_data['sku'].desc,
+                        *self.order_info_cells(sku_data['sku'].data),
+                    ])
+                except Exception as e:
+                    self.show_alert("Error", f"Error writing SKU {sku_id} to the sheet: {e}", "error")
+                    return None
+        return rows
+
+    def order_info_cells(self, data: dict) -> list:
+        """
+        Get the order information cells (ShipTo through OptimizedOn) that end every "Optimized_Bundles" row
+        """
+        return [
+            data['ShipTo'],
+            data['AddressLine1'],
+            data['AddressLine2'],
+            data['City'],
+            data['State'],
+            data['Country'],
+            data['Status'],
+            data['OrderDate'].strftime("%Y-%m-%d") if data['OrderDate'] else None,
+            data['ProdReleaseDate'].strftime("%Y-%m-%d") if data['ProdReleaseDate'] else None,
+            data['SchedShipDate'].strftime("%Y-%m-%d") if data['SchedShipDate'] else None,
+            data['TargetArrival'],
+            data['NotBefore'],
+            data['ShipVia'],
+            data['LastModifiedOn'].strftime("%Y-%m-%d") if data['LastModifiedOn'] else None,
+            datetime.now().strftime("%Y-%m-%d"),
+        ]
+
+    def write_bundle_sheet(self, optimized_sheet, order_rows: dict):
+        """
+        Write the rows of each order to the "Optimized_Bundles" sheet, grouping bundles and packaging rows
+        """
+        import openpyxl
+        optimized_sheet.append(self.headers)
+        sheet_row = 1  # tracked here, as max_row rescans every cell of the sheet
+        for rows in order_rows.values():
+            for row, level in zip(rows, self.get_outline_levels(rows)):
+                optimized_sheet.append(row)
+                sheet_row += 1
+                optimized_sheet.row_dimensions[sheet_row].outlineLevel = level
+            # add a blank row after each order's bundles
+            optimized_sheet.append([])
+            sheet_row += 1
+
+        # create a table over the data
+        table = openpyxl.worksheet.table.Table(displayName="OptimizedBundlesTable", ref=optimized_sheet.dimensions, tableStyleInfo=openpyxl.worksheet.table.TableStyleInfo(
+            name="TableStyleMedium9", showFirstColumn=False, showLastColumn=False, showRowStripes=True))
+        # resize the table to fit the data
+        optimized_sheet.add_table(table)
+
+    def get_outline_levels(self, rows: list) -> list:
+        """
+        Get the outline (grouping) levels of an order's rows: 0 for the first row (not grouped), 1 for summary rows,
+        2 for SKUs, and 3 for a bundle's packaging SKUs from Pack_Angle on, except its last row
+        """
+        levels = []
+        packaging = False
+        for rowIdx, row in enumerate(rows):
+            if type(row[2]) is not int:
+                packaging = False
+                levels.append(1)
+                continue
+            if 'Pack_Angle' in str(row[7]):
+                packaging = True
+            last_of_bundle = rowIdx + 1 == len(rows) or rows[rowIdx + 1][2] != row[2]
+            levels.append(3 if packaging and not last_of_bundle else 2)
+        if levels:
+            levels[0] = 0
+        return levels
+
+    def write_comparison_sheet(self, workbook, order_totals: dict):
         """
         Write a comparison sheet with optimized vs. actual order data
         """
+        import openpyxl
         if "Order_Comparison" in workbook.sheetnames:
             comparison_sheet = workbook["Order_Comparison"]
             # loop through existing data to find the last row
             start_offset = 0
             for row in comparison_sheet.iter_rows(min_row=2, values_only=True):
-                if row[0] in bundles.keys():
+                if row[0] in order_totals.keys():
                     # update existing row to new info
-                    bundle_count = len(bundles[row[0]])
-                    weight = round(sum([bundle.get_total_weight() for bundle in bundles[row[0]]]))
+                    bundle_count, weight = order_totals[row[0]]
+                    weight = round(weight)
                     comparison_sheet.cell(row=2+start_offset, column=2, value=bundle_count) # B column
                     comparison_sheet.cell(row=2+start_offset, column=5, value=weight) # E column
                 if all(cell is None for cell in row):
@@ -1078,13 +1414,13 @@ class ProgramGUI:
                 multiplier = 2.20462
             comparison_sheet.append(comparison_headers)
 
-        processed_data = sorted(list(bundles.keys()))
+        processed_data = sorted(list(order_totals.keys()))
 
         for i, value in enumerate(processed_data):
             row_nbr = str(2 + i + start_offset)  # Starting from row 2
-            bundle_count = len(bundles[value])
+            bundle_count, weight = order_totals[value]
             bundle_error = f'=B{row_nbr}-C{row_nbr}'
-            weight = round(sum([bundle.get_total_weight() for bundle in bundles[value]]) * multiplier)
+            weight = round(weight * multiplier)
             weight_error = f'=E{row_nbr}-F{row_nbr}'
             comparison_sheet.cell(row=int(row_nbr), column=1, value=value) # A2, A3, A4...
             comparison_sheet.cell(row=int(row_nbr), column=2, value=bundle_count) # B2, B3, B4...
@@ -1102,10 +1438,23 @@ class ProgramGUI:
             name="TableStyleNone", showFirstColumn=False, showLastColumn=False, showRowStripes=True))
         comparison_sheet.add_table(table)
 
+    def set_progress(self, value=None, text=None) -> None:
+        """
+        Update the progress bar and/or label, through the worker's signal when called from the worker thread
+        """
+        if self.worker is not None:
+            self.worker.progress.emit(value, text)
+        else:
+            self.showProgress(value, text)
+
     def show_alert(self, title, message, type="warning") -> None:
         """
         Show an alert dialog with the given title and message
         """
+        if self.worker is not None and threading.current_thread() is not threading.main_thread():
+            # dialogs can only be shown from the GUI thread
+            self.worker.alert.emit(title, message, type)
+            return
         msg_box = QMessageBox(self.Widget)
         if type == "help":
             msg_box.setTextFormat(QtCore.Qt.TextFormat.RichText)
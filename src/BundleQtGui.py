@@ -12,14 +12,23 @@ from PyQt6 import QtCore, QtGui, QtWidgets
 class Ui_BundleOptimizer(object):
     def setupUi(self, BundleOptimizer):
         BundleOptimizer.setObjectName("BundleOptimizer")
-        BundleOptimizer.resize(700, 600)
-        BundleOptimizer.setMinimumSize(QtCore.QSize(700, 600))
+        BundleOptimizer.resize(1200, 630)
+        BundleOptimizer.setMinimumSize(QtCore.QSize(1200, 630))
         BundleOptimizer.setStyleSheet("background-color: rgb(70, 70, 70);")
-        self.verticalLayout_2 = QtWidgets.QVBoxLayout(BundleOptimizer)
+        self.horizontalLayout_main = QtWidgets.QHBoxLayout(BundleOptimizer)
+        self.horizontalLayout_main.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_main.setSpacing(0)
+        self.horizontalLayout_main.setObjectName("horizontalLayout_main")
+        self.controlsFrame = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.controlsFrame.setMinimumSize(QtCore.QSize(700, 0))
+        self.controlsFrame.setMaximumSize(QtCore.QSize(700, 16777215))
+        self.controlsFrame.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
+        self.controlsFrame.setObjectName("controlsFrame")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.controlsFrame)
         self.verticalLayout_2.setContentsMargins(12, 12, 12, 9)
         self.verticalLayout_2.setSpacing(6)
         self.verticalLayout_2.setObjectName("verticalLayout_2")
-        self.frame_4 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame_4 = QtWidgets.QFrame(parent=self.controlsFrame)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Fixed)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
@@ -67,12 +76,12 @@ class Ui_BundleOptimizer(object):
         self.helpButton.setObjectName("helpButton")
         self.horizontalLayout.addWidget(self.helpButton)
         self.verticalLayout_2.addWidget(self.frame_4)
-        self.line = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.line = QtWidgets.QFrame(parent=self.controlsFrame)
         self.line.setFrameShape(QtWidgets.QFrame.Shape.HLine)
         self.line.setFrameShadow(QtWidgets.QFrame.Shadow.Sunken)
         self.line.setObjectName("line")
         self.verticalLayout_2.addWidget(self.line)
-        self.frame = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame = QtWidgets.QFrame(parent=self.controlsFrame)
         self.frame.setMaximumSize(QtCore.QSize(16777215, 70))
         self.frame.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
         self.frame.setFrameShadow(QtWidgets.QFrame.Shadow.Plain)
@@ -97,7 +106,7 @@ class Ui_BundleOptimizer(object):
         self.excelDir = QtWidgets.QLineEdit(parent=self.frame_2)
         self.excelDir.setMinimumSize(QtCore.QSize(0, 30))
         self.excelDir.setStyleSheet("background-color: rgb(234, 234, 234);\n"
-"color: rgb(0, 0, 0);")
+"    color: rgb(0, 0, 0);")
         self.excelDir.setObjectName("excelDir")
         self.verticalLayout.addWidget(self.excelDir, 0, QtCore.Qt.AlignmentFlag.AlignBottom)
         self.horizontalLayout_3.addWidget(self.frame_2)
@@ -112,7 +121,7 @@ class Ui_BundleOptimizer(object):
         self.fileBrowse.setObjectName("fileBrowse")
         self.horizontalLayout_3.addWidget(self.fileBrowse, 0, QtCore.Qt.AlignmentFlag.AlignBottom)
         self.verticalLayout_2.addWidget(self.frame)
-        self.frame_10 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame_10 = QtWidgets.QFrame(parent=self.controlsFrame)
         self.frame_10.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
         self.frame_10.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
         self.frame_10.setObjectName("frame_10")
@@ -133,18 +142,18 @@ class Ui_BundleOptimizer(object):
         self.appendDir = QtWidgets.QLineEdit(parent=self.frame_11)
         self.appendDir.setMinimumSize(QtCore.QSize(0, 30))
         self.appendDir.setStyleSheet("background-color: rgb(234, 234, 234);\n"
-"color: rgb(0, 0, 0);")
+"    color: rgb(0, 0, 0);")
         self.appendDir.setObjectName("appendDir")
         self.verticalLayout_7.addWidget(self.appendDir)
         self.horizontalLayout_2.addWidget(self.frame_11)
         self.appendBrowse = QtWidgets.QPushButton(parent=self.frame_10)
         self.appendBrowse.setMinimumSize(QtCore.QSize(150, 30))
         self.appendBrowse.setStyleSheet("background-color: rgb(234, 234, 234);\n"
-"color: rgb(9, 9, 9);")
+"    color: rgb(9, 9, 9);")
         self.appendBrowse.setObjectName("appendBrowse")
         self.horizontalLayout_2.addWidget(self.appendBrowse, 0, QtCore.Qt.AlignmentFlag.AlignBottom)
         self.verticalLayout_2.addWidget(self.frame_10, 0, QtCore.Qt.AlignmentFlag.AlignTop)
-        self.frame_13 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame_13 = QtWidgets.QFrame(parent=self.controlsFrame)
         self.frame_13.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
         self.frame_13.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
         self.frame_13.setLineWidth(0)
@@ -181,17 +190,53 @@ class Ui_BundleOptimizer(object):
         font.setBold(True)
         self.imperialButton.setFont(font)
         self.imperialButton.setStyleSheet("background-color: rgb(39, 39, 39);\n"
-"color: rgb(127, 127, 127);")
+"    color: rgb(127, 127, 127);")
         self.imperialButton.setObjectName("imperialButton")
         self.horizontalLayout_5.addWidget(self.imperialButton)
         self.verticalLayout_9.addWidget(self.frame_14, 0, QtCore.Qt.AlignmentFlag.AlignHCenter)
+        self.exportFrame = QtWidgets.QFrame(parent=self.frame_13)
+        self.exportFrame.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
+        self.exportFrame.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
+        self.exportFrame.setLineWidth(0)
+        self.exportFrame.setObjectName("exportFrame")
+        self.horizontalLayout_exportFormats = QtWidgets.QHBoxLayout(self.exportFrame)
+        self.horizontalLayout_exportFormats.setContentsMargins(0, 6, 0, 0)
+        self.horizontalLayout_exportFormats.setSpacing(18)
+        self.horizontalLayout_exportFormats.setObjectName("horizontalLayout_exportFormats")
+        self.exportLabel = QtWidgets.QLabel(parent=self.exportFrame)
+        self.exportLabel.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportLabel.setObjectName("exportLabel")
+        self.horizontalLayout_exportFormats.addWidget(self.exportLabel)
+        self.exportXlsx = QtWidgets.QCheckBox(parent=self.exportFrame)
+        self.exportXlsx.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportXlsx.setChecked(True)
+        self.exportXlsx.setObjectName("exportXlsx")
+        self.horizontalLayout_exportFormats.addWidget(self.exportXlsx)
+        self.exportCsv = QtWidgets.QCheckBox(parent=self.exportFrame)
+        self.exportCsv.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportCsv.setObjectName("exportCsv")
+        self.horizontalLayout_exportFormats.addWidget(self.exportCsv)
+        self.exportParquet = QtWidgets.QCheckBox(parent=self.exportFrame)
+        self.exportParquet.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportParquet.setObjectName("exportParquet")
+        self.horizontalLayout_exportFormats.addWidget(self.exportParquet)
+        self.exportJsonl = QtWidgets.QCheckBox(parent=self.exportFrame)
+        self.exportJsonl.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportJsonl.setObjectName("exportJsonl")
+        self.horizontalLayout_exportFormats.addWidget(self.exportJsonl)
+        self.exportImages = QtWidgets.QCheckBox(parent=self.exportFrame)
+        self.exportImages.setStyleSheet("color: rgb(255, 255, 255);")
+        self.exportImages.setChecked(True)
+        self.exportImages.setObjectName("exportImages")
+        self.horizontalLayout_exportFormats.addWidget(self.exportImages)
+        self.verticalLayout_9.addWidget(self.exportFrame, 0, QtCore.Qt.AlignmentFlag.AlignHCenter)
         self.verticalLayout_2.addWidget(self.frame_13)
-        self.line_3 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.line_3 = QtWidgets.QFrame(parent=self.controlsFrame)
         self.line_3.setFrameShape(QtWidgets.QFrame.Shape.HLine)
         self.line_3.setFrameShadow(QtWidgets.QFrame.Shadow.Sunken)
         self.line_3.setObjectName("line_3")
         self.verticalLayout_2.addWidget(self.line_3)
-        self.frame_12 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame_12 = QtWidgets.QFrame(parent=self.controlsFrame)
         self.frame_12.setMinimumSize(QtCore.QSize(676, 144))
         self.frame_12.setMaximumSize(QtCore.QSize(16777215, 144))
         self.frame_12.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
@@ -199,11 +244,27 @@ class Ui_BundleOptimizer(object):
         self.frame_12.setObjectName("frame_12")
         self.verticalLayout_8 = QtWidgets.QVBoxLayout(self.frame_12)
         self.verticalLayout_8.setObjectName("verticalLayout_8")
-        self.optimizeBundles = QtWidgets.QPushButton(parent=self.frame_12)
+        self.optimizeFrame = QtWidgets.QFrame(parent=self.frame_12)
+        self.optimizeFrame.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
+        self.optimizeFrame.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
+        self.optimizeFrame.setLineWidth(0)
+        self.optimizeFrame.setObjectName("optimizeFrame")
+        self.horizontalLayout_optimize = QtWidgets.QHBoxLayout(self.optimizeFrame)
+        self.horizontalLayout_optimize.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_optimize.setObjectName("horizontalLayout_optimize")
+        self.optimizeBundles = QtWidgets.QPushButton(parent=self.optimizeFrame)
         self.optimizeBundles.setMinimumSize(QtCore.QSize(0, 50))
         self.optimizeBundles.setStyleSheet("background-color: rgb(234, 234, 234); color: rgb(9, 9, 9);")
         self.optimizeBundles.setObjectName("optimizeBundles")
-        self.verticalLayout_8.addWidget(self.optimizeBundles)
+        self.horizontalLayout_optimize.addWidget(self.optimizeBundles)
+        self.cancelOptimization = QtWidgets.QPushButton(parent=self.optimizeFrame)
+        self.cancelOptimization.setEnabled(False)
+        self.cancelOptimization.setMinimumSize(QtCore.QSize(100, 50))
+        self.cancelOptimization.setMaximumSize(QtCore.QSize(100, 16777215))
+        self.cancelOptimization.setStyleSheet("background-color: rgb(234, 234, 234); color: rgb(9, 9, 9);")
+        self.cancelOptimization.setObjectName("cancelOptimization")
+        self.horizontalLayout_optimize.addWidget(self.cancelOptimization)
+        self.verticalLayout_8.addWidget(self.optimizeFrame)
         self.frame_7 = QtWidgets.QFrame(parent=self.frame_12)
         self.frame_7.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
         self.frame_7.setFrameShadow(QtWidgets.QFrame.Shadow.Plain)
@@ -215,8 +276,8 @@ class Ui_BundleOptimizer(object):
         self.progressBar = QtWidgets.QProgressBar(parent=self.frame_7)
         self.progressBar.setMinimumSize(QtCore.QSize(0, 30))
         self.progressBar.setStyleSheet("color: rgb(255, 255, 255);\n"
-"selection-background-color: rgb(0, 170, 255);\n"
-"background-color: rgb(58, 58, 58);")
+"    selection-background-color: rgb(0, 170, 255);\n"
+"    background-color: rgb(58, 58, 58);")
         self.progressBar.setProperty("value", 0)
         self.progressBar.setObjectName("progressBar")
         self.verticalLayout_4.addWidget(self.progressBar)
@@ -228,7 +289,7 @@ class Ui_BundleOptimizer(object):
         self.verticalLayout_4.addWidget(self.progressLabel)
         self.verticalLayout_8.addWidget(self.frame_7)
         self.verticalLayout_2.addWidget(self.frame_12, 0, QtCore.Qt.AlignmentFlag.AlignTop)
-        self.frame_3 = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.frame_3 = QtWidgets.QFrame(parent=self.controlsFrame)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Expanding)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
@@ -290,6 +351,44 @@ class Ui_BundleOptimizer(object):
         self.horizontalLayout_4.addWidget(self.frame_9)
         self.verticalLayout_3.addWidget(self.frame_6, 0, QtCore.Qt.AlignmentFlag.AlignBottom)
         self.verticalLayout_2.addWidget(self.frame_3, 0, QtCore.Qt.AlignmentFlag.AlignTop)
+        self.horizontalLayout_main.addWidget(self.controlsFrame)
+        self.previewFrame = QtWidgets.QFrame(parent=BundleOptimizer)
+        self.previewFrame.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
+        self.previewFrame.setObjectName("previewFrame")
+        self.verticalLayout_preview = QtWidgets.QVBoxLayout(self.previewFrame)
+        self.verticalLayout_preview.setContentsMargins(0, 12, 12, 9)
+        self.verticalLayout_preview.setObjectName("verticalLayout_preview")
+        self.previewHeader = QtWidgets.QFrame(parent=self.previewFrame)
+        self.previewHeader.setFrameShape(QtWidgets.QFrame.Shape.NoFrame)
+        self.previewHeader.setObjectName("previewHeader")
+        self.horizontalLayout_previewHeader = QtWidgets.QHBoxLayout(self.previewHeader)
+        self.horizontalLayout_previewHeader.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_previewHeader.setObjectName("horizontalLayout_previewHeader")
+        self.previewLabel = QtWidgets.QLabel(parent=self.previewHeader)
+        self.previewLabel.setStyleSheet("color: rgb(255, 255, 255);")
+        self.previewLabel.setObjectName("previewLabel")
+        self.horizontalLayout_previewHeader.addWidget(self.previewLabel)
+        self.previewOrder = QtWidgets.QComboBox(parent=self.previewHeader)
+        self.previewOrder.setMinimumSize(QtCore.QSize(150, 0))
+        self.previewOrder.setStyleSheet("background-color: rgb(234, 234, 234); color: rgb(9, 9, 9);")
+        self.previewOrder.setObjectName("previewOrder")
+        self.horizontalLayout_previewHeader.addWidget(self.previewOrder)
+        self.previewHint = QtWidgets.QLabel(parent=self.previewHeader)
+        self.previewHint.setStyleSheet("color: rgb(180, 180, 180);")
+        self.previewHint.setAlignment(QtCore.Qt.AlignmentFlag.AlignRight|QtCore.Qt.AlignmentFlag.AlignVCenter)
+        self.previewHint.setObjectName("previewHint")
+        self.horizontalLayout_previewHeader.addWidget(self.previewHint)
+        self.verticalLayout_preview.addWidget(self.previewHeader)
+        self.previewWidget = BundlePreview(parent=self.previewFrame)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding)
+        sizePolicy.setHorizontalStretch(1)
+        sizePolicy.setVerticalStretch(1)
+        sizePolicy.setHeightForWidth(self.previewWidget.sizePolicy().hasHeightForWidth())
+        self.previewWidget.setSizePolicy(sizePolicy)
+        self.previewWidget.setMinimumSize(QtCore.QSize(400, 400))
+        self.previewWidget.setObjectName("previewWidget")
+        self.verticalLayout_preview.addWidget(self.previewWidget)
+        self.horizontalLayout_main.addWidget(self.previewFrame)
 
         self.retranslateUi(BundleOptimizer)
         QtCore.QMetaObject.connectSlotsByName(BundleOptimizer)
@@ -306,9 +405,19 @@ class Ui_BundleOptimizer(object):
         self.label_6.setText(_translate("BundleOptimizer", "Unit of Measurement for Output:"))
         self.metricButton.setText(_translate("BundleOptimizer", "Metric"))
         self.imperialButton.setText(_translate("BundleOptimizer", "Imperial"))
+        self.exportLabel.setText(_translate("BundleOptimizer", "Output Files:"))
+        self.exportXlsx.setText(_translate("BundleOptimizer", "Excel (.xlsx)"))
+        self.exportCsv.setText(_translate("BundleOptimizer", "CSV"))
+        self.exportParquet.setText(_translate("BundleOptimizer", "Parquet"))
+        self.exportJsonl.setText(_translate("BundleOptimizer", "JSON Lines"))
+        self.exportImages.setText(_translate("BundleOptimizer", "Images"))
         self.optimizeBundles.setText(_translate("BundleOptimizer", "Perform Bundle Optimization"))
+        self.cancelOptimization.setText(_translate("BundleOptimizer", "Cancel"))
         self.progressLabel.setText(_translate("BundleOptimizer", "<html><head/><body><p align=\"center\"><br/></p></body></html>"))
         self.label_3.setText(_translate("BundleOptimizer", "<html><head/><body><p align=\"center\">View packing visualizations created by the tool</p></body></html>"))
         self.openImages.setText(_translate("BundleOptimizer", "Open Images Folder"))
         self.label_4.setText(_translate("BundleOptimizer", "<html><head/><body><p align=\"center\">Open file with all bundle and SKU information</p></body></html>"))
         self.openExcel.setText(_translate("BundleOptimizer", "Open Resultant Excel File"))
+        self.previewLabel.setText(_translate("BundleOptimizer", "Preview Order:"))
+        self.previewHint.setText(_translate("BundleOptimizer", "Scroll to zoom, double-click to reset"))
+from bundle_preview import BundlePreview
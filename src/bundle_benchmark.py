@@ -0,0 +1,162 @@
+# bundle_benchmark.py
+import argparse
+import copy
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+"""
+Benchmarks of the program, run from the source or from the built executable:
+
+    python startupBundleOptimizer.py benchmark startup [--runs 5] [--json results.json]
+    python startupBundleOptimizer.py benchmark engines "SO-PackExport Data.xlsx" [--engine pattern --engine skyline]
+        [--orders N] [--json results.json]
+
+startup: time to window, i.e. from starting the program (including unpacking a frozen build and importing its
+modules) until its window is shown, as the median over several cold starts. Each run also lists the slow-to-import
+modules that were loaded before the window appeared; there should be none, as they are imported on first use.
+
+engines: packs the orders of SO-PackExport workbooks with each packing engine (see bundle_pipeline.ENGINES) and
+compares their packing time, bundle count and removed SKUs, in total and for the orders where the engines differ.
+"""
+
+STARTUP_REPORT_ENV = "BUNDLE_STARTUP_REPORT"  # set for a program started by the benchmark
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'matplotlib', 'tkinter', 'cProfile']
+
+def window_shown(report_path: str, app) -> None:
+    """
+    Called by a program started by the startup benchmark once its window is shown:
+    record the time and the loaded modules, then exit
+    """
+    report = {
+        'shown': time.time(),
+        'modules': [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+    with open(report_path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh)
+    app.quit()
+
+def program_command() -> List[str]:
+    """Command that starts the program: the executable of a frozen build, or python with the startup script"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startupBundleOptimizer.py')]
+
+def time_to_window(runs: int = 5, timeout: float = 60.0) -> List[dict]:
+    """
+    Start the program runs times, returning each run's time to window (seconds) and the slow modules it loaded
+    """
+    results = []
+    for _ in range(runs):
+        fd, report_path = tempfile.mkstemp(suffix='.json', prefix='startup_')
+        os.close(fd)
+        try:
+            env = dict(os.environ, **{STARTUP_REPORT_ENV: report_path})
+            start = time.time()
+            subprocess.run(program_command(), env=env, timeout=timeout, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            with open(report_path, encoding='utf-8') as fh:
+                report = json.load(fh)
+        finally:
+            os.remove(report_path)
+        results.append({'seconds': round(report['shown'] - start, 3), 'modules': report['modules']})
+    return results
+
+def compare_engines(orders: dict, mach1_skus: List[str], config, engines: List[str]) -> List[dict]:
+    """
+    Pack each order with each engine (on a copy of its SKUs); returns per order and engine the packing time (seconds),
+    bundle count (None if the order cannot be packed) and removed SKUs
+    """
+    from dataclasses import replace
+    from bundle_pipeline import pack_order
+    results = []
+    for order, skus in orders.items():
+        result = {'order': order, 'skus': len(skus)}
+        for engine in engines:
+            start = time.perf_counter()
+            bundles, removed_skus, _ = pack_order(copy.deepcopy(skus), mach1_skus, replace(config, packing_engine=engine))
+            result[engine] = {
+                'seconds': round(time.perf_counter() - start, 3),
+                'bundles': None if bundles == -1 else len(bundles),
+                'removed': len(removed_skus),
+            }
+        results.append(result)
+    return results
+
+def _startup(args) -> int:
+    runs = time_to_window(max(1, args.runs))
+    seconds = [run['seconds'] for run in runs]
+    summary = {
+        'benchmark': 'startup',
+        'runs': runs,
+        'median_seconds': round(statistics.median(seconds), 3),
+        'min_seconds': min(seconds),
+        'max_seconds': max(seconds),
+    }
+    for index, run in enumerate(runs, start=1):
+        print(f"run {index}: {run['seconds']:.3f}s to window; slow modules loaded: {', '.join(run['modules']) or 'none'}")
+    print(f"time to window: median {summary['median_seconds']:.3f}s "
+          f"(min {summary['min_seconds']:.3f}s, max {summary['max_seconds']:.3f}s) over {len(runs)} runs")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump(summary, fh, indent=1)
+    return 0
+
+def _engines(args) -> int:
+    from bundle_classes import create_packaging_classes
+    from bundle_config import PACKING_ENGINES
+    from bundle_daemon import HeadlessOptimizer
+    from bundle_tuner import load_orders
+    engines = args.engine or list(PACKING_ENGINES)
+    optimizer = HeadlessOptimizer(export_formats=[], draw_images=False)
+    optimizer.mach1_skus, optimizer.missingDataSKUs = [], []
+    try:
+        config = optimizer.get_packing_config()
+    except (OSError, ValueError) as e:
+        print(f"Unable to read the packing limits from variables.json: {e}")
+        return 1
+    orders = load_orders(args.workbooks, None, optimizer, args.orders)
+    if not orders:
+        print("No orders found in the workbooks.")
+        return 1
+    create_packaging_classes(optimizer.get_packaging_data())
+
+    results = compare_engines(orders, optimizer.mach1_skus, config, engines)
+    totals = {engine: {
+        'seconds': round(sum(result[engine]['seconds'] for result in results), 3),
+        'bundles': sum(result[engine]['bundles'] or 0 for result in results),
+        'removed': sum(result[engine]['removed'] for result in results),
+        'unpacked_orders': sum(result[engine]['bundles'] is None for result in results),
+    } for engine in engines}
+    for result in results:
+        counts = {engine: result[engine]['bundles'] for engine in engines}
+        if len(set(counts.values())) > 1:
+            print(f"order {result['order']} ({result['skus']} SKUs): "
+                  + ", ".join(f"{engine} {count if count is not None else '-'} bundles" for engine, count in counts.items()))
+    for engine, total in totals.items():
+        print(f"{engine}: {total['seconds']:.3f}s, {total['bundles']} bundles, {total['removed']} removed SKUs, "
+              f"{total['unpacked_orders']} orders not packed")
+    print(f"over {len(results)} orders, {sum(result['skus'] for result in results)} SKUs")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump({'benchmark': 'engines', 'orders': results, 'totals': totals}, fh, indent=1)
+    return 0
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="startupBundleOptimizer benchmark", description="Benchmark the program.")
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+    startup = benchmarks.add_parser('startup', help="time from starting the program to its window being shown")
+    startup.add_argument("--runs", type=int, default=5, help="cold starts to time (default: 5)")
+    startup.add_argument("--json", help="also write the results to this file")
+    engines = benchmarks.add_parser('engines', help="packing time and bundles of each packing engine on past orders")
+    engines.add_argument("workbooks", nargs='+', help="SO-PackExport workbooks with the orders to pack")
+    engines.add_argument("--engine", action='append', help="engine to compare (repeat; default: all)")
+    engines.add_argument("--orders", type=int, help="only pack the first N orders")
+    engines.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    return _startup(args) if args.benchmark == 'startup' else _engines(args)
@@ -26,7 +26,8 @@ PACK_MST_BNDL_WRP_7340 = None
 FILLER_44 = None
 FILLER_62 = None
 
-@dataclass
+# SKUs are slotted: an order creates (and the packer copies) many of them, so they have no per-instance __dict__
+@dataclass(slots=True)
 class SKU:
     id: str
     bundleqty: int = 1  # Number of SKUs in a bundle
@@ -38,7 +39,7 @@ class SKU:
     can_be_bottom: bool = False  # Can this SKU be placed at the bottom of a bundle
     data : dict = None  # Additional data for SKU that will not be changed
 
-@dataclass
+@dataclass(slots=True)
 class PlacedSKU(SKU):
     x: int = 0
     y: int = 0
@@ -0,0 +1,139 @@
+# bundle_config.py
+from dataclasses import MISSING, asdict, dataclass, fields
+from pathlib import Path
+from typing import Optional, Union
+
+import getJSONdata
+
+"""
+Packing limits (bundle size and weight, coverage and stacking tolerances) as an immutable, validated object
+that is passed to pack_skus, rather than constants fixed when the packing module is imported.
+
+A configuration is read from variables.json when an optimization starts, so edited limits apply to the next run
+without restarting the program or its worker processes, and several configurations (e.g. per customer or per
+machine) can be used side by side in one process.
+
+The configuration also holds the packing effort (PACKING_EFFORT): how hard the packer searches for a placement,
+trading packing time for fewer bundles. "fast" gives a quick estimate (e.g. for quoting), "balanced" is the
+program's long-standing behaviour, and "thorough" spends more time on production runs.
+
+The configuration also names the packing engine (PACKING_ENGINE, see bundle_pipeline.ENGINES): "pattern", the
+program's row-by-row packer with its shape and merge search, or "skyline", a faster single-pass packer.
+
+Orders that would keep the packer searching for a long time are bounded by a time budget (ORDER_TIME_BUDGET) and
+an iteration budget (ORDER_ITERATION_BUDGET): once either is used up, the packer stops shrinking and merging bundles
+and completes the order with the bundles found so far. A hard limit (ORDER_TIME_LIMIT) stops the packing process
+of an order that runs past it, when orders are packed in worker processes.
+
+Orders of at most EXACT_MAX_SKUS SKUs are also searched exactly for their fewest bundles, for at most
+EXACT_TIME_LIMIT and within the order's time budget (see bundle_exact), except with the "fast" effort.
+"""
+
+@dataclass(frozen=True)
+class PackingEffort:
+    name: str
+    filler_grid: int  # mm, spacing of the points tried when adding filler material
+    greedy_grid: int  # mm, spacing of the points tried when filling the gaps of a bundle
+    component_grid: int  # mm, spacing of the points tried when placing component SKUs on other bundles
+    row_grid: int  # mm, spacing of the points tried when filling a row
+    shrink_step: int  # mm, how much a bundle's width or height is reduced when repacking it for a better shape
+    max_merge_attempts: Optional[int]  # pairs of bundles the packer tries to merge per merge pass (None: all)
+    exact_search: bool  # small orders are searched exactly for fewer bundles (see PackingConfig.exact_max_skus)
+
+EFFORT_LEVELS = {
+    'fast': PackingEffort('fast', filler_grid=10, greedy_grid=50, component_grid=25, row_grid=100, shrink_step=40,
+                          max_merge_attempts=25, exact_search=False),
+    'balanced': PackingEffort('balanced', filler_grid=5, greedy_grid=25, component_grid=10, row_grid=50, shrink_step=20,
+                              max_merge_attempts=None, exact_search=True),
+    'thorough': PackingEffort('thorough', filler_grid=5, greedy_grid=10, component_grid=5, row_grid=25, shrink_step=10,
+                              max_merge_attempts=None, exact_search=True),
+}
+DEFAULT_EFFORT = 'balanced'
+
+PACKING_ENGINES = ('pattern', 'skyline')  # implemented by bundle_pipeline.ENGINES
+DEFAULT_ENGINE = 'pattern'
+
+@dataclass(frozen=True)
+class PackingConfig:
+    max_width: int  # mm, bundle width (excludes packaging)
+    max_height: int  # mm, bundle height (excludes packaging)
+    max_weight: int  # kg
+    min_height_width_ratio: float  # minimum height-to-width ratio of a bundle
+    min_ceiling_coverage: float  # fraction of the top of a bundle that must be covered
+    max_dist_from_ceiling: int  # mm, how far below the top a SKU still counts towards ceiling coverage
+    stacking_max_diff: int  # mm, maximum width and height difference of SKUs stacked lengthwise
+    sku_max_height_diff: int  # mm, maximum height difference of SKUs in a row
+    base_coverage_threshold: float  # fraction of the base of a SKU that must be supported
+    sku_coverage_height_buffer: int  # mm, how far below a SKU another one still supports it
+    packing_effort: str = DEFAULT_EFFORT  # one of EFFORT_LEVELS
+    packing_engine: str = DEFAULT_ENGINE  # one of PACKING_ENGINES
+    order_time_budget: float = 0  # s, search time of an order before the packer settles for its best bundles (0: none)
+    order_iteration_budget: int = 0  # shrink and merge steps of an order before the packer settles (0: none)
+    order_time_limit: float = 0  # s, an order still packing after this is stopped by the watchdog (0: none)
+    exact_max_skus: int = 0  # orders of at most this many SKUs are searched for their fewest bundles (0: none)
+    exact_time_limit: float = 0  # s, time of that search before the engine's bundles are kept
+
+    def __post_init__(self):
+        problems = []
+        if self.packing_effort not in EFFORT_LEVELS:
+            problems.append(f"PACKING_EFFORT must be one of {', '.join(EFFORT_LEVELS)} (got {self.packing_effort!r})")
+        if self.packing_engine not in PACKING_ENGINES:
+            problems.append(f"PACKING_ENGINE must be one of {', '.join(PACKING_ENGINES)} (got {self.packing_engine!r})")
+        for f in fields(self):
+            if f.type is str:
+                continue
+            value = getattr(self, f.name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                problems.append(f"{f.name.upper()} must be a number (got {value!r})")
+        if problems:
+            raise ValueError("Invalid packing configuration: " + "; ".join(problems))
+
+        for name in ('max_width', 'max_height', 'max_weight'):
+            if getattr(self, name) <= 0:
+                problems.append(f"{name.upper()} must be greater than 0")
+        for name in ('max_dist_from_ceiling', 'stacking_max_diff', 'sku_max_height_diff', 'sku_coverage_height_buffer',
+                     'order_time_budget', 'order_iteration_budget', 'order_time_limit', 'exact_max_skus',
+                     'exact_time_limit'):
+            if getattr(self, name) < 0:
+                problems.append(f"{name.upper()} cannot be negative")
+        for name in ('min_height_width_ratio', 'min_ceiling_coverage', 'base_coverage_threshold'):
+            if not 0 <= getattr(self, name) <= 1:
+                problems.append(f"{name.upper()} must be between 0 and 1")
+        if problems:
+            raise ValueError("Invalid packing configuration: " + "; ".join(problems))
+
+    @property
+    def effort(self) -> PackingEffort:
+        """The search settings of the packing effort"""
+        return EFFORT_LEVELS[self.packing_effort]
+
+    @classmethod
+    def from_variables(cls, variables: dict) -> "PackingConfig":
+        """
+        Build a configuration from the keys of variables.json (MAX_WIDTH, MAX_WEIGHT, ...);
+        lengths and weights are rounded to whole mm and kg, as the packing has always used them;
+        PACKING_EFFORT, PACKING_ENGINE, the order budgets and the exact search limits are optional
+        """
+        missing = [f.name.upper() for f in fields(cls) if f.name.upper() not in variables and f.default is MISSING]
+        if missing:
+            raise ValueError(f"Invalid packing configuration: missing {', '.join(missing)}")
+        values = {}
+        for f in fields(cls):
+            if f.name.upper() not in variables:
+                continue
+            value = variables[f.name.upper()]
+            if f.type is int and isinstance(value, float):
+                value = round(value)
+            values[f.name] = value
+        return cls(**values)
+
+    def to_variables(self) -> dict:
+        """The configuration as variables.json keys (e.g. to record what a run was packed with)"""
+        return {name.upper(): value for name, value in asdict(self).items()}
+
+def load_packing_config(path: Union[str, Path, None] = None) -> PackingConfig:
+    """
+    Read and validate the packing configuration from variables.json (by default the program's own),
+    raising ValueError if it is invalid and OSError if it cannot be read
+    """
+    return PackingConfig.from_variables(getJSONdata.read(path))
@@ -0,0 +1,310 @@
+# bundle_daemon.py
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+from BundleGUI import ProgramGUI
+from bundle_config import EFFORT_LEVELS, PACKING_ENGINES
+from bundle_export import EXPORT_FORMATS
+from bundle_pipeline import pack_executor
+from bundle_render import RenderPool, render_executor
+from getJSONdata import VARIABLES
+
+"""
+Watch-folder mode: optimizes SO-PackExport workbooks as they are dropped into a directory (e.g. by the ERP).
+
+A file is picked up once its size and modification time have stopped changing for a settle time and it can be
+opened (so files that are still being written are skipped), and is optimized with the same steps as the GUI.
+Results go to a subfolder of the output directory named after the file, or into an append workbook
+(and its results store) if one is given.
+
+The program stays running between files: the reference data (sub-bundle and packaging data) stays loaded until
+its files change, and the packing and image processes are kept warm, so each file takes seconds rather than
+a full application start. Processed files are recorded in the output directory, so they are not optimized again
+after a restart unless they change.
+
+Usage: startupBundleOptimizer.exe watch <directory> [--output DIR] [--append WORKBOOK] [--unit metric|imperial]
+"""
+
+DEFAULT_PATTERN = "SO-PackExport*.xlsx"
+STATE_NAME = "processed_files.json"
+
+logger = logging.getLogger("bundle_daemon")
+
+class FolderWatcher:
+    """
+    Polls a directory for new or changed files, reporting each one once it has settled
+    """
+    def __init__(self, directory: str, pattern: str = DEFAULT_PATTERN, settle: float = 5.0, state_path: str = None):
+        self.directory = directory
+        self.pattern = pattern
+        self.settle = settle
+        self.state_path = state_path
+        self.pending = {}  # path -> (size, mtime, time first seen with that size and mtime)
+        self.processed = self._load_state()  # file name -> [size, mtime, status]
+
+    def _load_state(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as fh:
+                json.dump(self.processed, fh, indent=1)
+        except OSError as e:
+            logger.warning("Unable to save the processed files list: %s", e)
+
+    def _signature(self, path: str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None  # removed or renamed since it was listed
+        return stat.st_size, stat.st_mtime
+
+    def ready_files(self, now: float = None) -> List[str]:
+        """
+        Get the files that are new or changed and have not changed for the settle time, oldest first
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning("Unable to list %s: %s", self.directory, e)
+            return ready
+        for name in names:
+            # Excel's lock files (~$Book.xlsx) match the pattern while a workbook is open
+            if name.startswith("~$") or not fnmatch.fnmatch(name, self.pattern):
+                continue
+            path = os.path.join(self.directory, name)
+            signature = self._signature(path)
+            if signature is None or signature == tuple(self.processed.get(name, [None, None])[:2]):
+                self.pending.pop(path, None)
+                continue
+            size, mtime, first_seen = self.pending.get(path, (None, None, now))
+            if (size, mtime) != signature:
+                self.pending[path] = (*signature, now)  # still being written; restart the settle time
+                continue
+            if now - first_seen >= self.settle and signature[0] > 0 and self._can_open(path):
+                ready.append(path)
+        return sorted(ready, key=lambda path: self.pending[path][1])
+
+    def _can_open(self, path: str) -> bool:
+        """The writer may still hold the file open (on Windows it cannot be opened until it is closed)"""
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+    def mark(self, path: str, status: str) -> None:
+        """Record a file as processed ('done' or 'failed'); it is only picked up again if it changes"""
+        size, mtime, _ = self.pending.pop(path)
+        self.processed[os.path.basename(path)] = [size, mtime, status]
+        self._save_state()
+
+class HeadlessOptimizer(ProgramGUI):
+    """
+    Runs the GUI's optimization steps without a window: progress and alerts are logged, reference data
+    is loaded once (and reloaded when its files change), and the worker processes are reused between runs
+    """
+    def __init__(self, unit: str = 'imperial', export_formats: List[str] = ('xlsx',), draw_images: bool = True,
+                 effort: str = None, engine: str = None):
+        # no widgets, so ProgramGUI.__init__ is not called
+        self.worker = None
+        self.renderPool = None
+        self.packPool = None
+        self.cancel_requested = False
+        self.unit = self.set_unit = unit
+        self.export_formats = list(export_formats)
+        self.draw_images = draw_images
+        self.alerts = []  # (title, message, type) of the current run
+        self.last_text = None
+        self.catalog = None  # version of the loaded reference data
+        self.sub_bundle_sheets = None
+        self.packaging_data = None
+        self.packing_config = None
+        self.effort = effort  # packing effort instead of PACKING_EFFORT in variables.json
+        self.engine = engine  # packing engine instead of PACKING_ENGINE in variables.json
+        self.warm_pack_pool = None
+        self.warm_pack_workers = 0
+        self.warm_render_pool = None
+
+    def optimize_file(self, input_path: str, working_dir: str, append_path: str = '') -> bool:
+        """
+        Optimize one input workbook, writing the results to working_dir (or the append workbook).
+        Returns False if the run reported an error
+        """
+        os.makedirs(working_dir, exist_ok=True)
+        self.input_path = input_path
+        self.append_path = append_path
+        self.workingDir = working_dir
+        self.cancel_requested = False
+        self.alerts = []
+        self.run_optimization()
+        return not any(alert_type == "error" for _, _, alert_type in self.alerts)
+
+    def close(self) -> None:
+        """Stop the warm worker processes"""
+        for executor in (self.warm_pack_pool, self.warm_render_pool):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.warm_pack_pool = self.warm_render_pool = None
+
+## Reference data, kept loaded between runs
+
+    def reload_catalog(self) -> None:
+        packing_config = ProgramGUI.get_packing_config(self)
+        catalog = self.get_catalog_version(packing_config)
+        if catalog != self.catalog:
+            if self.catalog is not None:
+                logger.info("Reference data changed; reloading")
+            self.sub_bundle_sheets = ProgramGUI.get_sub_bundle_data_sheets(self)
+            self.packaging_data = ProgramGUI.get_packaging_data(self)
+            self.packing_config = packing_config
+            self.catalog = catalog
+            # the packing processes hold the previous packaging data
+            if self.warm_pack_pool is not None:
+                self.warm_pack_pool.shutdown(cancel_futures=True)
+                self.warm_pack_pool = None
+
+    def get_sub_bundle_data_sheets(self):
+        self.reload_catalog()
+        return self.sub_bundle_sheets
+
+    def get_packaging_data(self):
+        self.reload_catalog()
+        return self.packaging_data
+
+    def get_packing_config(self):
+        self.reload_catalog()
+        overrides = {'packing_effort': self.effort, 'packing_engine': self.engine}
+        return replace(self.packing_config, **{name: value for name, value in overrides.items() if value})
+
+## Warm worker processes
+
+    def start_pack_pool(self, packaging_data: dict, workers: int):
+        if workers <= 1:
+            self.packPool = None
+            return
+        if self.warm_pack_pool is None or self.warm_pack_workers != workers:
+            if self.warm_pack_pool is not None:
+                self.warm_pack_pool.shutdown(cancel_futures=True)
+            self.warm_pack_pool = pack_executor(packaging_data, workers)
+            self.warm_pack_workers = workers
+        self.packPool = self.warm_pack_pool
+
+    def stop_pack_pool(self):
+        self.packPool = None  # kept warm for the next file
+
+    def start_render_pool(self) -> RenderPool:
+        if not self.draw_images:
+            return None
+        if self.warm_render_pool is None:
+            self.warm_render_pool = render_executor()
+        self.images_dir = f"{self.workingDir}/images"
+        os.makedirs(self.images_dir, exist_ok=True)
+        return RenderPool(self.images_dir, self.set_unit, self.packaging_height, self.packaging_width, self.lumber_height,
+                          VARIABLES.get('IMAGE_RENDERER', 'matplotlib'), executor=self.warm_render_pool)
+
+## Progress and alerts are logged
+
+    def set_progress(self, value=None, text=None) -> None:
+        if text and text != self.last_text:
+            logger.info(text)
+            self.last_text = text
+
+    def show_alert(self, title, message, type="warning") -> None:
+        self.alerts.append((title, message, type))
+        level = logging.ERROR if type == "error" else logging.WARNING if type == "warning" else logging.INFO
+        logger.log(level, "%s: %s", title, " ".join(message.split()))
+
+def output_dir_for(output_dir: str, input_path: str) -> str:
+    """Results directory of an input file: a subfolder named after the file"""
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0])
+
+def watch(watch_dir: str, output_dir: str, append_path: str = '', optimizer: HeadlessOptimizer = None,
+          pattern: str = DEFAULT_PATTERN, settle: float = 5.0, poll: float = 2.0, once: bool = False) -> Dict[str, str]:
+    """
+    Optimize the files that land in watch_dir until interrupted (or, with once, the files already there).
+    Returns the status of each file processed
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    optimizer = optimizer or HeadlessOptimizer()
+    watcher = FolderWatcher(watch_dir, pattern, settle, os.path.join(output_dir, STATE_NAME))
+    results = {}
+    logger.info("Watching %s for %s (results in %s)", watch_dir, pattern, append_path or output_dir)
+    try:
+        while True:
+            ready = watcher.ready_files()
+            for path in ready:
+                logger.info("Optimizing %s", os.path.basename(path))
+                start = time.perf_counter()
+                try:
+                    ok = optimizer.optimize_file(path, output_dir_for(output_dir, path), append_path)
+                except Exception as e:
+                    logger.exception("Error optimizing %s: %s", os.path.basename(path), e)
+                    ok = False
+                status = 'done' if ok else 'failed'
+                watcher.mark(path, status)
+                results[path] = status
+                logger.info("%s %s in %.1fs", os.path.basename(path), status, time.perf_counter() - start)
+            if once and not ready and not watcher.pending:
+                break
+            time.sleep(poll)
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    finally:
+        optimizer.close()
+    return results
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="startupBundleOptimizer watch",
+                                     description="Optimize SO-PackExport files as they are added to a directory.")
+    parser.add_argument("directory", help="directory to watch")
+    parser.add_argument("--output", help="directory for the results (default: an 'Optimized' subfolder of the watched directory)")
+    parser.add_argument("--append", default='', help="workbook to append every file's optimized orders to")
+    parser.add_argument("--unit", choices=['metric', 'imperial'], default='imperial')
+    parser.add_argument("--formats", default='xlsx', help=f"comma-separated output files: xlsx, {', '.join(EXPORT_FORMATS)}")
+    parser.add_argument("--no-images", action='store_true', help="do not draw bundle images")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"file name pattern (default: {DEFAULT_PATTERN})")
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds a file must be unchanged before it is read")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between directory scans")
+    parser.add_argument("--pack-workers", type=int, help="orders packed at the same time (default: PACK_WORKERS in variables.json)")
+    parser.add_argument("--effort", choices=list(EFFORT_LEVELS), help="packing effort (default: PACKING_EFFORT in variables.json)")
+    parser.add_argument("--engine", choices=list(PACKING_ENGINES), help="packing engine (default: PACKING_ENGINE in variables.json)")
+    parser.add_argument("--once", action='store_true', help="optimize the files already in the directory, then exit")
+    parser.add_argument("--log", help="log file (default: bundle_daemon.log in the output directory)")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt != 'xlsx' and fmt not in EXPORT_FORMATS]
+    if not formats or unknown:
+        parser.error(f"unknown output file type: {', '.join(unknown) or '(none)'}")
+    output_dir = args.output or os.path.join(args.directory, "Optimized")
+    os.makedirs(output_dir, exist_ok=True)
+    if args.pack_workers is not None:
+        VARIABLES['PACK_WORKERS'] = args.pack_workers
+
+    handlers = [logging.FileHandler(args.log or os.path.join(output_dir, "bundle_daemon.log"), encoding='utf-8')]
+    if getattr(sys, 'stderr', None) is not None:  # a windowed executable has no console
+        handlers.append(logging.StreamHandler())
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", handlers=handlers)
+
+    optimizer = HeadlessOptimizer(args.unit, formats, not args.no_images, args.effort, args.engine)
+    results = watch(args.directory, output_dir, os.path.abspath(args.append) if args.append else '', optimizer,
+                    args.pattern, args.settle, args.poll, args.once)
+    return 1 if any(status == 'failed' for status in results.values()) else 0
@@ -0,0 +1,188 @@
+# bundle_exact.py
+import copy
+import math
+import time
+from typing import Callable, List, Tuple
+
+import bundle_classes
+from bundle_classes import SKU, Bundle
+from bundle_config import PackingConfig
+from bundle_packing import PackingRun, _add_filler_material, _group_skus_by_color, _pack_skus_with_pattern
+
+"""
+Exact packing of small orders: for orders of at most EXACT_MAX_SKUS SKUs, a branch-and-bound search over the
+assignments of SKUs to bundles finds the fewest bundles the order can be packed in, instead of relying on the
+heuristic's merging of bundles.
+
+The search starts from the packing engine's result (its bundle count is the bound to beat) and stops as soon as
+it reaches a lower bound on the bundle count, which is the largest of:
+
+    - the order's weight over MAX_WEIGHT
+    - the order's volume over the volume of the largest bundle
+    - the SKUs of which no two fit in one bundle together (a greedy clique of the "cannot share" pairs)
+
+Whether a set of SKUs fits in one bundle is decided by the pattern engine's layout (so the bundles follow the
+same rules), and is remembered for each set of SKU types, as identical SKUs are interchangeable. The search also
+stops at EXACT_TIME_LIMIT, or when the order's time budget (ORDER_TIME_BUDGET, counted from the start of the
+engine's packing) runs out; the engine's bundles are kept unless the search found fewer.
+Orders with bundle overrides, or SKUs the engine could not fit, are left to the engine.
+"""
+
+LONG_LENGTH = 7340  # mm, the longest bundle
+
+def _sku_type(sku: SKU) -> tuple:
+    """SKUs of the same type are interchangeable in a bundle"""
+    component = bool(sku.data and sku.data.get('Component'))
+    return (sku.id, sku.width, sku.height, sku.length, sku.weight, sku.can_be_bottom, component)
+
+def _allow_bottom(skus: List[SKU]) -> None:
+    """
+    As in the pattern engine, which packs each colour (and the components) on its own before merging bundles:
+    all SKUs of a group without a full-length bottom SKU may be at the bottom
+    """
+    components = [sku for sku in skus if sku.data and sku.data.get('Component')]
+    groups = list(_group_skus_by_color([sku for sku in skus if sku not in components]).values()) + [components]
+    for group in groups:
+        if not group:
+            continue
+        max_length = 3680 if max(sku.length for sku in group) < 3700 else 7340
+        if not any(sku.can_be_bottom and abs(sku.length - max_length) <= 100 for sku in group):
+            for sku in group:
+                sku.can_be_bottom = True
+
+class _Search:
+    """Branch-and-bound over the bundles of an order's SKUs, with memoised one-bundle layouts"""
+    def __init__(self, skus: List[SKU], mach1_skus: List[str], config: PackingConfig, deadline: float):
+        self.config = config
+        self.mach1_skus = mach1_skus
+        self.deadline = deadline
+        self.timed_out = False
+        _allow_bottom(skus)
+        # largest first, so the bundles fill up early and identical SKUs are next to each other
+        self.skus = sorted(skus, key=lambda sku: (sku.width * sku.height * sku.length, _sku_type(sku)), reverse=True)
+        self.types = [_sku_type(sku) for sku in self.skus]
+        self.layouts = {}  # sorted SKU types -> the bundle they fit in, or None
+        self.best_count = None
+        self.best_bins = None
+
+    def _out_of_time(self) -> bool:
+        if time.monotonic() > self.deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    def layout(self, indices: List[int]):
+        """The bundle the SKUs fit in (packed by the pattern engine), or None if they need more than one"""
+        key = tuple(sorted(self.types[index] for index in indices))
+        if key not in self.layouts:
+            skus = [copy.deepcopy(self.skus[index]) for index in indices]
+            run = PackingRun(self.config, copy.copy(bundle_classes.FILLER_44), copy.copy(bundle_classes.FILLER_62))
+            colors = {sku.id.split('.')[-1].replace('_Partial', '')[-3:] in self.mach1_skus for sku in skus}
+            machine = 'MIXED' if len(colors) > 1 else ('MACH1' if True in colors else 'MACH5')
+            bundles = _pack_skus_with_pattern(run, skus, self.config.max_width, self.config.max_height,
+                                              merging=True, machine=machine)
+            fits = (len(bundles) == 1 and not run.removed_skus
+                    and sum(not sku.id.startswith('Pack_') for sku in bundles[0].skus) >= len(indices))
+            self.layouts[key] = bundles[0] if fits else None
+        return self.layouts[key]
+
+    def lower_bound(self) -> int:
+        """A bundle count the order cannot be packed in fewer than (see the module docstring)"""
+        config = self.config
+        weight = math.ceil(sum(sku.weight for sku in self.skus) / config.max_weight - 1e-9)
+        volume = math.ceil(sum(sku.width * sku.height * sku.length for sku in self.skus)
+                           / (config.max_width * config.max_height * LONG_LENGTH) - 1e-9)
+        # SKUs that cannot share a bundle with each other, largest first
+        clique = []
+        for index in range(len(self.skus)):
+            if self._out_of_time():
+                break
+            if all(self.layout([other, index]) is None for other in clique):
+                clique.append(index)
+        return max(weight, volume, len(clique), 1)
+
+    def search(self, upper_bound: int, lower_bound: int) -> None:
+        """Look for an assignment of the SKUs to fewer than upper_bound bundles, stopping at lower_bound"""
+        self.best_count = upper_bound
+        self.lower = lower_bound
+        self.remaining_weight = [sum(sku.weight for sku in self.skus[index:]) for index in range(len(self.skus) + 1)]
+        self._branch(0, [], [])
+
+    def _branch(self, index: int, bins: List[List[int]], bin_of: List[int]) -> None:
+        if self.best_count <= self.lower or self._out_of_time():
+            return
+        if index == len(self.skus):
+            self.best_count = len(bins)
+            self.best_bins = [list(members) for members in bins]
+            return
+        # the SKUs left need at least the weight the open bundles cannot take
+        max_weight = self.config.max_weight
+        spare = sum(max_weight - sum(self.skus[member].weight for member in members) for members in bins)
+        extra = max(0, math.ceil((self.remaining_weight[index] - spare) / max_weight - 1e-9))
+        if len(bins) + extra >= self.best_count:
+            return
+
+        sku = self.skus[index]
+        # an identical SKU goes in the same bundle as the one before it or a later one
+        first = bin_of[-1] if index and self.types[index] == self.types[index - 1] else 0
+        tried = set()
+        for bin_index in range(first, len(bins)):
+            members = bins[bin_index]
+            contents = tuple(sorted(self.types[member] for member in members))
+            if contents in tried:
+                continue  # the same as a bundle already tried
+            tried.add(contents)
+            if sum(self.skus[member].weight for member in members) + sku.weight > max_weight:
+                continue
+            if self.layout(members + [index]) is None:
+                continue
+            members.append(index)
+            bin_of.append(bin_index)
+            self._branch(index + 1, bins, bin_of)
+            bin_of.pop()
+            members.pop()
+        if len(bins) + 1 < self.best_count:
+            bins.append([index])
+            bin_of.append(len(bins) - 1)
+            self._branch(index + 1, bins, bin_of)
+            bin_of.pop()
+            bins.pop()
+
+    def bundles(self, run: PackingRun) -> List[Bundle]:
+        """The bundles of the best assignment found, with filler material and packaging"""
+        bundles = []
+        for members in self.best_bins:
+            bundle = copy.deepcopy(self.layout(members))
+            _add_filler_material(run, bundle)
+            bundle.add_packaging()
+            bundles.append(bundle)
+        return bundles
+
+def pack_skus(skus: List[SKU], mach1_skus: List[str], config: PackingConfig,
+              engine: Callable) -> Tuple[List[Bundle], List[SKU], bool]:
+    """
+    Pack a small order with the engine, then search for fewer bundles (see the module docstring).
+    Returns what the engine returns
+    """
+    if any(sku.data and sku.data.get('Bdl_Override') for sku in skus):
+        return engine(skus, mach1_skus, config)
+    start = time.monotonic()
+    order_skus = copy.deepcopy(skus)  # the engine changes its SKUs
+    bundles, removed_skus, budget_limited = engine(skus, mach1_skus, config)
+    if bundles == -1 or removed_skus or len(bundles) <= 1 or budget_limited:
+        return bundles, removed_skus, budget_limited
+
+    deadline = time.monotonic() + config.exact_time_limit
+    budget_deadline = start + config.order_time_budget if config.order_time_budget else None
+    if budget_deadline is not None and budget_deadline < deadline:
+        deadline = budget_deadline
+    search = _Search(order_skus, mach1_skus, config, deadline)
+
+    lower_bound = search.lower_bound()
+    if len(bundles) > lower_bound:
+        search.search(len(bundles), lower_bound)
+    # the order's budget ran out before the search could finish
+    budget_limited = search.timed_out and deadline == budget_deadline
+    if search.best_bins is None:
+        return bundles, removed_skus, budget_limited
+    run = PackingRun(config, copy.copy(bundle_classes.FILLER_44), copy.copy(bundle_classes.FILLER_62))
+    return search.bundles(run), removed_skus, budget_limited
@@ -0,0 +1,180 @@
+# bundle_export.py
+import os
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+from bundle_classes import Bundle, SKU
+
+"""
+Flat, typed exports of optimized bundles for downstream systems (WMS, BI).
+
+Every placed sub-bundle (and every packaging SKU) becomes one record carrying its bundle and order
+information plus its placement in the bundle cross-section (X_mm, Y_mm, Rotated), which the Excel output drops.
+SKUs excluded for missing data are written under BundleNbr 0 without a placement.
+Each record also names the packing engine and effort (fast, balanced or thorough) the order was packed with, and whether
+the order's packing budget ran out (BudgetLimited: its bundles are the best found within the budget).
+There are no summary or blank rows, and all values are metric (mm, kg) regardless of the unit selected
+for the Excel output, so files from different runs can be concatenated directly.
+"""
+
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'jsonl': '.jsonl',
+}
+
+# Column names and dtypes of an export record, in output order
+COLUMNS = {
+    'OrderNbr': 'string',
+    'OrderType': 'string',
+    'BundleNbr': 'Int64',
+    'Machine': 'string',
+    'Bdl_Override': 'string',
+    'BundleWidth_mm': 'Float64',
+    'BundleHeight_mm': 'Float64',
+    'BundleLength_mm': 'Float64',
+    'BundleWeight_kg': 'Float64',
+    'InventoryID': 'string',
+    'IsPackaging': 'boolean',
+    'Description': 'string',
+    'UOM': 'string',
+    'Pcs': 'Float64',
+    'Width_mm': 'Float64',
+    'Height_mm': 'Float64',
+    'Length_mm': 'Float64',
+    'Weight_kg': 'Float64',
+    'X_mm': 'Float64',
+    'Y_mm': 'Float64',
+    'Rotated': 'boolean',
+    'ShipTo': 'string',
+    'AddressLine1': 'string',
+    'AddressLine2': 'string',
+    'City': 'string',
+    'State': 'string',
+    'Country': 'string',
+    'Status': 'string',
+    'OrderDate': 'datetime64[ns]',
+    'ProdReleaseDate': 'datetime64[ns]',
+    'SchedShipDate': 'datetime64[ns]',
+    'TargetArrival': 'string',
+    'NotBefore': 'string',
+    'ShipVia': 'string',
+    'LastModifiedOn': 'datetime64[ns]',
+    'OptimizedOn': 'datetime64[ns]',
+    'PackingEngine': 'string',
+    'PackingEffort': 'string',
+    'BudgetLimited': 'boolean',
+}
+
+_ORDER_INFO_KEYS = ['ShipTo', 'AddressLine1', 'AddressLine2', 'City', 'State', 'Country', 'Status', 'OrderDate',
+                    'ProdReleaseDate', 'SchedShipDate', 'TargetArrival', 'NotBefore', 'ShipVia', 'LastModifiedOn']
+
+def is_packaging(sku: SKU) -> bool:
+    """Packaging SKUs (but not fillers) are added by the program rather than ordered"""
+    return sku.id.startswith('Pack_') and 'Filler' not in sku.id
+
+def _sku_record(order, bundle_nbr: int, sku: SKU, data: dict, bundle_cells: dict, optimized_on: datetime,
+                packing: dict) -> dict:
+    """Build the record of one SKU unit"""
+    record = {
+        'OrderNbr': order,
+        'OrderType': data.get('OrderType'),
+        'BundleNbr': bundle_nbr,
+        'Bdl_Override': data.get('Bdl_Override'),
+        'InventoryID': sku.id,
+        'IsPackaging': is_packaging(sku),
+        'Description': sku.desc,
+        'UOM': '' if sku.data is None else data.get('UOM'),
+        'Pcs': sku.bundleqty,
+        'Width_mm': sku.width,
+        'Height_mm': sku.height,
+        'Length_mm': 3680 if sku.length == 3650 else sku.length,  # same length correction as the Excel output
+        'Weight_kg': sku.weight,
+        'X_mm': getattr(sku, 'x', None),
+        'Y_mm': getattr(sku, 'y', None),
+        'Rotated': getattr(sku, 'rotated', None),
+        'OptimizedOn': optimized_on,
+    }
+    record.update(bundle_cells)
+    record.update(packing)
+    for key in _ORDER_INFO_KEYS:
+        record[key] = data.get(key)
+    return record
+
+def bundle_records(order_bundles: Dict[object, List[Bundle]], missing_skus: List[SKU], packaging_width: float,
+                   packaging_height: float, lumber_height: float, packing_engine: str = None, packing_effort: str = None,
+                   budget_limited: bool = None) -> List[dict]:
+    """
+    Flatten packed orders into export records, one per SKU unit
+    """
+    optimized_on = datetime.now().replace(microsecond=0)
+    packing = {'PackingEngine': packing_engine, 'PackingEffort': packing_effort, 'BudgetLimited': budget_limited}
+    records = []
+    for order, bundles in order_bundles.items():
+        for sku in missing_skus:
+            if sku.data['OrderNbr'] == order:
+                records.append(_sku_record(order, 0, sku, sku.data, {}, optimized_on, packing))
+
+        for bundle_index, bundle in enumerate(bundles):
+            # packaging SKUs have no order data; use the data of the bundle's first ordered SKU
+            order_data = next((sku.data for sku in bundle.skus if sku.data is not None), {})
+            actual_width, actual_height, _ = bundle.get_actual_dimensions(visual=True)
+            lumber = lumber_height if all(sku.rotated is False for sku in bundle.skus) else 0
+            bundle_cells = {
+                'Machine': bundle.packing_machine,
+                'BundleWidth_mm': actual_width + packaging_width,
+                'BundleHeight_mm': actual_height + packaging_height + lumber,
+                'BundleLength_mm': bundle.max_length,
+                'BundleWeight_kg': bundle.get_total_weight(),
+            }
+            for sku in bundle.skus:
+                records.append(_sku_record(order, bundle_index + 1, sku, sku.data or order_data, bundle_cells, optimized_on,
+                                           packing))
+    return records
+
+def records_frame(records: List[dict]) -> pd.DataFrame:
+    """Build a typed DataFrame (see COLUMNS) from export records"""
+    df = pd.DataFrame.from_records(records, columns=list(COLUMNS))
+    for column, dtype in COLUMNS.items():
+        if dtype.startswith('datetime'):
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif dtype == 'string':
+            df[column] = df[column].map(lambda value: None if value is None or value != value else str(value)).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def write_records(records: List[dict], base_path: str, formats: List[str]) -> List[str]:
+    """
+    Write the records to base_path + the extension of each requested format, returning the written paths.
+    Parquet needs pyarrow (or fastparquet); an ImportError is raised if neither is installed
+    """
+    df = records_frame(records)
+    written = []
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Expected one of: {', '.join(EXPORT_FORMATS)}")
+        path = base_path + EXPORT_FORMATS[fmt]
+        if fmt == 'csv':
+            df.to_csv(path, index=False)
+        elif fmt == 'jsonl':
+            df.to_json(path, orient='records', lines=True, date_format='iso')
+        elif fmt == 'parquet':
+            try:
+                df.to_parquet(path, index=False)
+            except ImportError as e:
+                raise ImportError("Parquet export requires the 'pyarrow' package (pip install pyarrow).") from e
+        written.append(path)
+    return written
+
+def export_base_path(directory: str, append_path: str = None) -> str:
+    """
+    Get the export path (without extension). Exports of an append run get a timestamped name next to the
+    append workbook, so each run adds a file instead of replacing the previous run's records
+    """
+    if append_path:
+        stem = os.path.splitext(append_path)[0]
+        return f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return os.path.join(directory, "Optimized_Bundles")
@@ -0,0 +1,101 @@
+# bundle_fingerprint.py
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from typing import List
+
+from bundle_classes import Bundle, SKU
+
+"""
+Content fingerprints used to decide whether an order needs to be re-optimized, or its image redrawn.
+
+An order's fingerprint covers its normalised line items (dimensions, weights, quantities, bundle overrides
+and order information) plus the version of the reference catalogs and the packing limits of variables.json
+(so a change to its other settings, such as the export formats, does not re-pack every order), but not the
+LastModifiedOn stamp, so orders touched by the ERP without changing their lines are not re-packed.
+"""
+
+# Bump when a change to the packing algorithm should invalidate every stored fingerprint
+FINGERPRINT_VERSION = 1
+
+# Order data that changes without changing what gets packed
+_IGNORED_DATA_KEYS = {'LastModifiedOn'}
+
+def _normalise(value):
+    """Normalise a value so equal data always hashes the same way"""
+    if isinstance(value, (datetime, date)):
+        if value != value:  # NaT (a missing date in pandas)
+            return None
+        return value.strftime("%Y-%m-%d")
+    if hasattr(value, 'item'):  # numpy scalars
+        value = value.item()
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            return int(value)
+        return round(value, 6)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 of a file's contents, or an empty string if it does not exist"""
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def catalog_version(paths: List[str], variables: dict = None) -> str:
+    """
+    Return a version string for the reference catalogs (sub-bundle data, packaging data) and the packing variables
+    (PackingConfig.to_variables())
+    """
+    digest = hashlib.sha256(str(FINGERPRINT_VERSION).encode())
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_digest(path).encode())
+    if variables is not None:
+        digest.update(json.dumps(variables, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def sku_line(sku: SKU) -> tuple:
+    """Normalised line item for one SKU unit"""
+    data = sku.data or {}
+    return (
+        sku.id,
+        _normalise(sku.bundleqty),
+        _normalise(sku.width),
+        _normalise(sku.height),
+        _normalise(sku.length),
+        _normalise(sku.weight),
+        _normalise(sku.desc),
+        bool(sku.can_be_bottom),
+        tuple(sorted((key, _normalise(val)) for key, val in data.items() if key not in _IGNORED_DATA_KEYS)),
+    )
+
+def pack_fingerprint(bundles: List[Bundle], options: dict) -> str:
+    """
+    Fingerprint an order's pack result (bundle sizes and SKU placements) together with the options it is drawn with
+    """
+    payload = json.dumps([
+        options,
+        [[_normalise(bundle.width), _normalise(bundle.height), _normalise(bundle.max_length), bundle.packing_machine,
+          [[sku.id, _normalise(sku.bundleqty), _normalise(sku.width), _normalise(sku.height), _normalise(sku.length),
+            _normalise(sku.weight), _normalise(sku.x), _normalise(sku.y), bool(sku.rotated)] for sku in bundle.skus]]
+         for bundle in bundles],
+    ], default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def order_fingerprint(skus: List[SKU], catalog: str) -> str:
+    """
+    Fingerprint an order's SKUs (as created from the input rows, before packing) together with the catalog version
+    """
+    # sort serialised lines, as a line can mix None and values in the same position
+    lines = sorted(json.dumps(sku_line(sku), default=str, separators=(',', ':')) for sku in skus)
+    payload = json.dumps([catalog, lines], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
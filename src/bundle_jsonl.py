@@ -0,0 +1,102 @@
+# bundle_jsonl.py
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, TextIO
+
+from bundle_config import EFFORT_LEVELS, PACKING_ENGINES
+from bundle_orders import UNITS, init_worker, pack_request
+
+"""
+JSON Lines packing filter for scripting and bulk what-if runs: reads one JSON order per line (see bundle_orders)
+on stdin and writes one result per line on stdout, without building any Excel files.
+
+Each result line holds the input line number, the order's bundles (size, weight, machine and placed SKUs),
+its missing and removed SKUs, and the packing time; an order that cannot be packed gives {"line", "order", "error"}.
+Orders are packed concurrently by worker processes, but results are written in input order,
+so the output can be joined line by line with the input.
+
+Usage: python startupBundleOptimizer.py filter [--workers N] [--unit metric|imperial] [--effort fast|balanced|thorough]
+       [--engine pattern|skyline] < orders.jsonl > results.jsonl
+"""
+
+def _parse(line_nbr: int, line: str):
+    """Parse an input line, returning the order or an error result"""
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, {'line': line_nbr, 'order': None, 'error': f"Invalid JSON: {e}"}
+
+def _result(line_nbr: int, order: dict, pack) -> dict:
+    """Run pack() for an order, timing it and turning errors into an error result"""
+    start = time.perf_counter()
+    try:
+        result = pack()
+    except Exception as e:
+        return {'line': line_nbr, 'order': order.get('order') if isinstance(order, dict) else None,
+                'error': str(e) or type(e).__name__}
+    return {'line': line_nbr, **result, 'seconds': round(time.perf_counter() - start, 3)}
+
+def pack_lines(lines: Iterable[str], workers: int = 1, unit: str = 'metric', svg: bool = False,
+               window: int = None, effort: str = None, engine: str = None) -> Iterator[dict]:
+    """
+    Pack the JSON order on each line, yielding the results in input order.
+    With several workers, up to window orders (default: twice the workers) are packed or waiting at once
+    """
+    numbered = ((line_nbr, line) for line_nbr, line in enumerate(lines, start=1) if line.strip())
+    if workers <= 1:
+        for line_nbr, line in numbered:
+            order, error = _parse(line_nbr, line)
+            yield error or _result(line_nbr, order, lambda: pack_request(order, unit, svg, effort, engine))
+        return
+
+    window = max(1, window or 2 * workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        pending = deque()  # (line number, order, submitted time, future or error result), in input order
+        for line_nbr, line in numbered:
+            order, error = _parse(line_nbr, line)
+            future = None if error else executor.submit(pack_request, order, unit, svg, effort, engine)
+            pending.append((line_nbr, order, time.perf_counter(), future or error))
+            while len(pending) >= window:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
+
+def _collect(line_nbr: int, order: dict, submitted: float, future) -> dict:
+    """Wait for a queued order's result"""
+    if isinstance(future, dict):
+        return future  # the line could not be parsed
+    result = _result(line_nbr, order, future.result)
+    if 'seconds' in result:
+        result['seconds'] = round(time.perf_counter() - submitted, 3)  # including the time waiting for a worker
+    return result
+
+def run(stdin: TextIO, stdout: TextIO, workers: int = 1, unit: str = 'metric', svg: bool = False,
+        effort: str = None, engine: str = None) -> int:
+    """Filter stdin to stdout, returning the number of orders that could not be packed"""
+    failed = 0
+    for result in pack_lines(stdin, workers, unit, svg, effort=effort, engine=engine):
+        failed += 'error' in result
+        stdout.write(json.dumps(result, separators=(',', ':'), default=str) + "\n")
+        stdout.flush()  # results are available to the next command as soon as they are ready
+    return failed
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="startupBundleOptimizer filter",
+                                     description="Pack JSON orders from stdin (one per line) and write JSON results to stdout.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="packing processes (default: one less than the number of cores; 1 packs in this process)")
+    parser.add_argument("--unit", choices=list(UNITS), default='metric')
+    parser.add_argument("--svg", action='store_true', help="include an SVG drawing of each order's bundles")
+    parser.add_argument("--effort", choices=list(EFFORT_LEVELS), help="packing effort (default: PACKING_EFFORT in variables.json)")
+    parser.add_argument("--engine", choices=list(PACKING_ENGINES),
+                        help="packing engine of orders without their own \"engine\" (default: PACKING_ENGINE in variables.json)")
+    args = parser.parse_args(argv)
+    if sys.stdin is None or sys.stdout is None:
+        return 2  # a windowed executable has no standard streams; run the filter with python
+    failed = run(sys.stdin, sys.stdout, args.workers, args.unit, args.svg, args.effort, args.engine)
+    return 1 if failed else 0
@@ -0,0 +1,203 @@
+# bundle_orders.py
+import time
+from dataclasses import replace
+from typing import List
+
+import pandas as pd
+
+from bundle_classes import Bundle, create_packaging_classes
+from bundle_daemon import HeadlessOptimizer
+from bundle_pipeline import pack_order
+from bundle_svg import bundle_svg
+
+"""
+Packs orders given as JSON rather than as an SO-PackExport workbook, for the packing service (bundle_service)
+and the JSON Lines filter (bundle_jsonl).
+
+An order is an object with the order number and its lines; quantities are in pieces, as in the BaseOrderQty column
+of the export, and each line's dimensions come from the sub-bundle data like in the GUI:
+
+    {"order": "1013538", "order_type": "SO",
+     "lines": [{"InventoryID": "6PSP.145.C0070D", "Quantity": 8, "Bdl_Override": null, "UOM": "BOX8", "Description": "..."}]}
+
+Other order fields of the export (ShipTo, City, ...) may be given at the order level, and "engine" packs the order
+with another packing engine than the request's (see bundle_pipeline.ENGINES).
+The result lists each bundle's size (with packaging), weight, machine and placed SKUs, the SKUs excluded for
+missing data and the SKUs removed while packing, in metric (mm, kg) or imperial (in, lbs) units, the packing
+engine and effort used (PACKING_ENGINE and PACKING_EFFORT in variables.json unless the request or order asks for
+others), and whether the order's packing
+budget ran out ("budget_limited": the bundles are then the best found within the budget). A request may shorten
+the budget (ORDER_TIME_BUDGET) for its order, e.g. to answer within a caller's timeout.
+"""
+
+ORDER_INFO_FIELDS = ['ShipTo', 'AddressLine1', 'AddressLine2', 'City', 'State', 'Country', 'Status', 'OrderDate',
+                     'ProdReleaseDate', 'SchedShipDate', 'TargetArrival', 'NotBefore', 'ShipVia', 'LastModifiedOn']
+UNITS = {
+    'metric': (1, 1),  # length divisor, weight multiplier
+    'imperial': (25.4, 2.20462),
+}
+
+class OrderPacker:
+    """
+    Packs JSON orders with the reference data and packing limits loaded once (and reloaded when their files change).
+    The packaging SKUs are module globals, so a packer must only be used by one thread at a time
+    """
+    def __init__(self):
+        self.optimizer = HeadlessOptimizer(export_formats=[], draw_images=False)
+        self.packaging_data = None
+        self.sub_bundle_sheets = None
+        self.sub_bundle_rows = None
+        self.config = None
+
+    def load_packaging(self) -> None:
+        """
+        Create the packaging SKUs and read the sub-bundle rows (again if the reference data was reloaded),
+        and get the packing limits
+        """
+        data = self.optimizer.get_packaging_data()
+        if data is not self.packaging_data:
+            self.packaging_height, self.packaging_width, self.lumber_height = create_packaging_classes(data)
+            self.packaging_data = data
+        sheets = self.optimizer.get_sub_bundle_data_sheets()
+        if sheets is not self.sub_bundle_sheets:
+            self.sub_bundle_rows = self.optimizer.get_sub_bundle_rows()
+            self.sub_bundle_sheets = sheets
+        self.config = self.optimizer.get_packing_config()
+
+    def order_frame(self, order: dict) -> pd.DataFrame:
+        """Build the "SO-PackExportData" rows of a JSON order"""
+        if not isinstance(order, dict):
+            raise ValueError("An order must be a JSON object.")
+        order_nbr = order.get('order')
+        lines = order.get('lines')
+        if order_nbr in (None, ''):
+            raise ValueError("The order has no 'order' number.")
+        if not isinstance(lines, list) or not lines:
+            raise ValueError(f"Order {order_nbr} has no 'lines'.")
+        rows = []
+        for line in lines:
+            if not isinstance(line, dict) or not line.get('InventoryID'):
+                raise ValueError(f"Order {order_nbr} has a line without an 'InventoryID'.")
+            try:
+                quantity = float(line.get('Quantity'))
+            except (TypeError, ValueError):
+                raise ValueError(f"Line {line['InventoryID']} of order {order_nbr} has no valid 'Quantity'.") from None
+            rows.append({
+                'OrderType': order.get('order_type', 'SO'),
+                'OrderNbr': order_nbr,
+                'InventoryID': str(line['InventoryID']),
+                'BaseOrderQty': quantity,
+                'UOM': line.get('UOM'),
+                'Bdl_Override': line.get('Bdl_Override') or None,
+                'Description': line.get('Description'),
+                **{field: order.get(field) for field in ORDER_INFO_FIELDS},
+            })
+        return pd.DataFrame(rows)
+
+    def order_skus(self, order: dict):
+        """
+        Get the SKUs to pack for a JSON order, and the SKUs excluded for missing data
+        """
+        df = self.order_frame(order)
+        optimizer = self.optimizer
+        optimizer.mach1_skus = []
+        optimizer.missingDataSKUs = []
+        optimizer.alerts = []
+        df = optimizer.prepare_order_data(df, self.sub_bundle_rows)
+        errors = [message for _, message, alert_type in optimizer.alerts if alert_type == "error"]
+        if errors or df.empty:
+            raise ValueError(errors[0] if errors else "The order has no lines to pack.")
+        order_nbr = order['order']
+        skus = optimizer.remove_invalids(optimizer.create_sku_objects({order_nbr: df}))[order_nbr]
+        return skus, list(optimizer.missingDataSKUs)
+
+    def pack(self, order: dict, unit: str = 'metric', svg: bool = False, effort: str = None, engine: str = None,
+             budget: float = None) -> dict:
+        """
+        Pack a JSON order, returning its result (see order_result). A budget (s) for the whole request replaces
+        ORDER_TIME_BUDGET if what is left of it after reading the order is shorter
+        """
+        if unit not in UNITS:
+            raise ValueError(f"Unknown unit '{unit}'. Expected one of: {', '.join(UNITS)}")
+        self.load_packaging()
+        if isinstance(order, dict) and order.get('engine'):
+            engine = order['engine']
+        overrides = {'packing_effort': effort, 'packing_engine': engine}
+        config = replace(self.config, **{name: value for name, value in overrides.items() if value})
+        start = time.perf_counter()
+        skus, missing_skus = self.order_skus(order)
+        if budget:
+            # at least a moment, as a budget of 0 means none
+            remaining = max(budget - (time.perf_counter() - start), 0.001)
+            config = replace(config, order_time_budget=min(remaining, config.order_time_budget or remaining))
+        bundles, removed_skus, budget_limited = pack_order(skus, self.optimizer.mach1_skus, config) if skus else ([], [], False)
+        if bundles == -1:
+            raise ValueError("Cannot mix MACH1 and MACH5 SKUs in the same bundle override.")
+        seconds = time.perf_counter() - start
+        result = order_result(order['order'], bundles, self.packaging_height, self.packaging_width, self.lumber_height, unit)
+        result['missing_skus'] = sorted({sku.id for sku in missing_skus})
+        result['removed_skus'] = [sku.id for sku in removed_skus]
+        result['pack_seconds'] = round(seconds, 3)
+        result['engine'] = config.packing_engine
+        result['effort'] = config.packing_effort
+        result['budget_limited'] = budget_limited
+        if svg:
+            result['svg'] = bundle_svg(bundles, unit, self.packaging_height, self.packaging_width, self.lumber_height)
+        return result
+
+def _round(value, digits: int) -> float:
+    """Round a (possibly numpy) number to a JSON-compatible float"""
+    return round(float(value), digits)
+
+def order_result(order, bundles: List[Bundle], packaging_height: float, packaging_width: float, lumber_height: float,
+                 unit: str = 'metric') -> dict:
+    """
+    JSON-compatible result of a packed order: each bundle's size (with packaging) and weight, and its SKUs
+    """
+    length_divisor, weight_multiplier = UNITS[unit]
+    length_unit, weight_unit = ('mm', 'kg') if unit == 'metric' else ('in', 'lbs')
+    bundle_results = []
+    for bundle_index, bundle in enumerate(bundles):
+        actual_width, actual_height, _ = bundle.get_actual_dimensions(visual=True)
+        lumber = lumber_height if all(sku.rotated is False for sku in bundle.skus) else 0
+        bundle_results.append({
+            'bundle': bundle_index + 1,
+            'machine': bundle.packing_machine,
+            'width': _round((actual_width + packaging_width) / length_divisor, 1),
+            'height': _round((actual_height + packaging_height + lumber) / length_divisor, 1),
+            'length': _round(bundle.max_length / length_divisor, 1),
+            'weight': _round(bundle.get_total_weight() * weight_multiplier, 2),
+            'skus': [{
+                'id': sku.id,
+                'x': _round(sku.x / length_divisor, 2),
+                'y': _round(sku.y / length_divisor, 2),
+                'width': _round(sku.width / length_divisor, 2),
+                'height': _round(sku.height / length_divisor, 2),
+                'rotated': bool(sku.rotated),
+                'packaging': sku.id.startswith('Pack_') and 'Filler' not in sku.id,
+            } for sku in bundle.skus],
+        })
+    return {
+        'order': order,
+        'unit': unit,
+        'length_unit': length_unit,
+        'weight_unit': weight_unit,
+        'bundle_count': len(bundle_results),
+        'total_weight': _round(sum(bundle['weight'] for bundle in bundle_results), 2),
+        'bundles': bundle_results,
+    }
+
+_packer = None
+
+def init_worker() -> None:
+    """Load the reference data in a worker process, so its first order is packed without the loading time"""
+    global _packer
+    _packer = OrderPacker()
+    _packer.load_packaging()
+
+def pack_request(order: dict, unit: str = 'metric', svg: bool = False, effort: str = None, engine: str = None,
+                 budget: float = None) -> dict:
+    """Pack an order with this process's packer (used by the worker pools of the service and the filter)"""
+    if _packer is None:
+        init_worker()
+    return _packer.pack(order, unit, svg, effort, engine, budget)
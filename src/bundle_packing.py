@@ -1,35 +1,62 @@
 import copy
+import time
+from dataclasses import dataclass, field
 from typing import List, Tuple
-from bundle_classes import SKU, Bundle, FILLER_44, FILLER_62
-from getJSONdata import VARIABLES
+import bundle_classes
+from bundle_classes import SKU, Bundle
+from bundle_config import PackingConfig
 from collections import Counter
 
 MAX_LENGTH = 3680 # mm
-MAX_WEIGHT = round(VARIABLES['MAX_WEIGHT'])  # kg
-MIN_HEIGHT_WIDTH_RATIO = VARIABLES['MIN_HEIGHT_WIDTH_RATIO']  # Minimum height-to-width ratio for bundles
-BOTTOM_ROW_LENGTH = 0
-REMOVED_SKUS = []
-
-MIN_CEILING_COVERAGE = VARIABLES['MIN_CEILING_COVERAGE']  # Minimum ceiling coverage required (%)
-MAX_DIST_FROM_CEILING = round(VARIABLES['MAX_DIST_FROM_CEILING'])  # mm, maximum distance from ceiling to be considered sufficient coverage
-STACKING_MAX_DIFF = round(VARIABLES['STACKING_MAX_DIFF'])  # mm, maximum difference in width and height for lengthwise stacking SKUs
-SKU_MAX_HEIGHT_DIFF = round(VARIABLES['SKU_MAX_HEIGHT_DIFF'])  # mm, maximum height difference for SKUs to be considered compatible in a row
-BASE_COVERAGE_THRESHOLD = VARIABLES['BASE_COVERAGE_THRESHOLD']  # Base coverage threshold for support checks (%)
-SKU_COVERAGE_HEIGHT_BUFFER = round(VARIABLES['SKU_COVERAGE_HEIGHT_BUFFER'])  # mm, buffer for how far below a SKU can be to be considered coverage
-
-def pack_skus(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus: List[str]) -> List[Bundle]:
-    """Main entry point for packing SKUs into bundles"""
-    global FILLER_62, FILLER_44
-    from bundle_classes import FILLER_44, FILLER_62
+
+@dataclass
+class PackingRun:
+    """
+    State of one pack_skus call, passed to the packing functions: the limits it packs with,
+    the SKUs it could not fit, its own copies of the filler SKUs (which are resized while packing)
+    and the budget it has used
+    """
+    config: PackingConfig
+    filler_44: SKU
+    filler_62: SKU
+    removed_skus: List[SKU] = field(default_factory=list)
+    bottom_row_length: int = 0  # mm, width of the current bundle's bottom row
+    deadline: float = None  # time.monotonic() at which the time budget runs out
+    iterations: int = 0  # shrink and merge steps taken
+    budget_limited: bool = False  # a budget ran out, so the search was cut short
+
+    def out_of_budget(self) -> bool:
+        """
+        Count a search step (repacking a bundle to improve its shape, or trying to merge two bundles);
+        True once the order's time or iteration budget is used up, so the packer should settle for what it has
+        """
+        self.iterations += 1
+        if not self.budget_limited:
+            iteration_budget = self.config.order_iteration_budget
+            self.budget_limited = ((iteration_budget and self.iterations > iteration_budget)
+                                   or (self.deadline is not None and time.monotonic() > self.deadline))
+        return self.budget_limited
+
+def pack_skus(skus: List[SKU], mach1_skus: List[str], config: PackingConfig) -> Tuple[List[Bundle], List[SKU], bool]:
+    """
+    Main entry point for packing SKUs into bundles of at most config.max_width x config.max_height,
+    searching as hard as config.packing_effort asks, within the order's time and iteration budgets.
+    Returns the bundles (-1 if MACH1 and MACH5 SKUs share a bundle override), the SKUs that could not be fitted,
+    and whether a budget ran out (the bundles are then the best found in the budget)
+    """
+    run = PackingRun(config, copy.copy(bundle_classes.FILLER_44), copy.copy(bundle_classes.FILLER_62))
+    if config.order_time_budget:
+        run.deadline = time.monotonic() + config.order_time_budget
+    bundle_width, bundle_height = config.max_width, config.max_height
     # Separate SKUs with bundle override
     override_skus = [sku for sku in skus if sku.data and sku.data.get('Bdl_Override')]
     component_skus = [sku for sku in skus if sku.data and sku.data.get('Component') and not sku.data.get('Bdl_Override')]
     regular_skus = [sku for sku in skus if (sku not in override_skus and sku not in component_skus)]
 
     # Process override bundles first
-    override_bundles = _process_override_bundles(override_skus, bundle_width, bundle_height, mach1_skus)
+    override_bundles = _process_override_bundles(run, override_skus, bundle_width, bundle_height, mach1_skus)
     if override_bundles == -1:
-        return -1, REMOVED_SKUS
+        return -1, run.removed_skus, run.budget_limited
 
     # Pack component SKUs into their own bundles
     # Find the machine that the SKUs belong to; if both, use "MIXED"
@@ -40,7 +67,7 @@ def pack_skus(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus
         machine = 'MACH1'
     else:
         machine = 'MIXED'
-    component_bundles = _pack_skus_with_pattern(component_skus, bundle_width, bundle_height, machine=machine)
+    component_bundles = _pack_skus_with_pattern(run, component_skus, bundle_width, bundle_height, machine=machine)
 
     # Group SKUs by color
     color_groups = _group_skus_by_color(regular_skus)
@@ -55,10 +82,10 @@ def pack_skus(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus
         color_skus.sort(key=lambda x: max(x.width, x.height), reverse=True)
 
         if color[-3:] in mach1_skus:
-            base_bundles = _pack_skus_with_pattern(color_skus, bundle_width, bundle_height, machine='MACH1')
+            base_bundles = _pack_skus_with_pattern(run, color_skus, bundle_width, bundle_height, machine='MACH1')
             can_try_merge_bundles_mach1.extend(base_bundles)
         else:
-            base_bundles = _pack_skus_with_pattern(color_skus, bundle_width, bundle_height, machine='MACH5')
+            base_bundles = _pack_skus_with_pattern(run, color_skus, bundle_width, bundle_height, machine='MACH5')
             can_try_merge_bundles_mach5.extend(base_bundles)
 
     # try to merge bundles if they can all fit in one
@@ -67,12 +94,12 @@ def pack_skus(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus
             can_try_merge_bundles_mach1.append(bundle)
         else:
             can_try_merge_bundles_mach5.append(bundle)
-    merged_bundles_mach1 = _try_merge_bundles(can_try_merge_bundles_mach1, bundle_width, bundle_height, machine='MACH1')
-    merged_bundles_mach5 = _try_merge_bundles(can_try_merge_bundles_mach5, bundle_width, bundle_height, machine='MACH5')
+    merged_bundles_mach1 = _try_merge_bundles(run, can_try_merge_bundles_mach1, bundle_width, bundle_height, machine='MACH1')
+    merged_bundles_mach5 = _try_merge_bundles(run, can_try_merge_bundles_mach5, bundle_width, bundle_height, machine='MACH5')
     merged_machine_bundles = merged_bundles_mach1 + merged_bundles_mach5
 
-    final_bundles = _try_merge_bundles(merged_machine_bundles, bundle_width, bundle_height, machine='MACH5', diff_machines=True) # mach5 as placeholder
-    final_bundles = _fill_bundles_with_components(final_bundles, bundle_width, bundle_height)
+    final_bundles = _try_merge_bundles(run, merged_machine_bundles, bundle_width, bundle_height, machine='MACH5', diff_machines=True) # mach5 as placeholder
+    final_bundles = _fill_bundles_with_components(run, final_bundles, bundle_width, bundle_height)
 
     # remove any empty bundles
     final_bundles = [bundle for bundle in final_bundles if (bundle.width > 0 and bundle.height > 0)]
@@ -81,13 +108,12 @@ def pack_skus(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus
     for bundle in override_bundles:
         bundle.add_packaging()
 
-    return override_bundles + final_bundles, REMOVED_SKUS
+    return override_bundles + final_bundles, run.removed_skus, run.budget_limited
 
-def _fill_bundles_with_components(target_bundles: List[Bundle], bundle_width: int, bundle_height: int) -> List[Bundle]:
+def _fill_bundles_with_components(run: PackingRun, target_bundles: List[Bundle], bundle_width: int, bundle_height: int) -> List[Bundle]:
     """Place as many component SKUs on top of other SKUs in target bundles as possible"""
-    global BOTTOM_ROW_LENGTH
-    temp_bottom_row_length = BOTTOM_ROW_LENGTH
-    BOTTOM_ROW_LENGTH = bundle_width
+    temp_bottom_row_length = run.bottom_row_length
+    run.bottom_row_length = bundle_width
     component_skus = []
 
     for _, bundle in reversed(list(enumerate(target_bundles))):
@@ -102,7 +128,7 @@ def _fill_bundles_with_components(target_bundles: List[Bundle], bundle_width: in
         target_bundles.append(empty_bundle)
 
     if not component_skus:
-        BOTTOM_ROW_LENGTH = temp_bottom_row_length
+        run.bottom_row_length = temp_bottom_row_length
         return target_bundles
 
     # Sort SKUs by size (largest dimension) to optimize packing
@@ -119,17 +145,17 @@ def _fill_bundles_with_components(target_bundles: List[Bundle], bundle_width: in
 
         # If empty bundle, pack a row first to create a base
         if not bundle.skus:
-            _ = _pack_row(bundle, component_skus, 0, is_vertical_row=False, max_length=bundle.max_length)
+            _ = _pack_row(run, bundle, component_skus, 0, is_vertical_row=False, max_length=bundle.max_length)
 
         while True:
             new_max_height = max(sku.y + sku.height for sku in bundle.skus) + 10
-            row_height = _pack_row(bundle, component_skus, new_max_height, is_vertical_row=False, max_length=bundle.max_length)
+            row_height = _pack_row(run, bundle, component_skus, new_max_height, is_vertical_row=False, max_length=bundle.max_length)
             if row_height == 0:
                 break
 
         # Attempt to fill remaining space with component SKUs
         # fill_remaining_greedy returns the SKUs that could not be placed
-        component_skus = fill_remaining_greedy(bundle, component_skus, grid_size=10)
+        component_skus = fill_remaining_greedy(run, bundle, component_skus, grid_size=run.config.effort.component_grid)
 
         # Resize bundle back to fit the content tightly
         if not bundle.skus:
@@ -138,13 +164,13 @@ def _fill_bundles_with_components(target_bundles: List[Bundle], bundle_width: in
         bundle.resize_to_content()
 
     # If there are still component SKUs left, pack them into new bundles
-    BOTTOM_ROW_LENGTH = temp_bottom_row_length
+    run.bottom_row_length = temp_bottom_row_length
     if component_skus:
-        return target_bundles + _pack_skus_with_pattern(component_skus, bundle_width, bundle_height)
+        return target_bundles + _pack_skus_with_pattern(run, component_skus, bundle_width, bundle_height)
 
     return target_bundles
 
-def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height: int, machine: str, diff_machines: bool = False) -> List[Bundle]:
+def _try_merge_bundles(run: PackingRun, bundles: List[Bundle], bundle_width: int, bundle_height: int, machine: str, diff_machines: bool = False) -> List[Bundle]:
     """Attempt to merge bundles if they can all fit in one bundle"""
     attempted_merged_bundles = []
     best_bundles = []
@@ -163,6 +189,8 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
     # sort bundles by size
     bundles = best_bundles + mid_bundles + bad_bundles
 
+    # the packing effort may limit how many pairs are tried, as each try packs both bundles again
+    max_attempts = run.config.effort.max_merge_attempts
     merging_able = True
     while merging_able:
          # pick two bundles and try to merge them
@@ -178,6 +206,8 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
                     # flag to merge across machines is true, don't check when machine is the same (since they have already been done)
                     or (diff_machines and bundle1.packing_machine == bundle2.packing_machine)):
                     continue
+                elif max_attempts is not None and len(attempted_merged_bundles) >= max_attempts:
+                    break
                 else:
                     attempted_merged_bundles.append([id(bundle1), id(bundle2)])
 
@@ -190,10 +220,12 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
                 bundle1_area = bundle1.width * bundle1.height
                 bundle2_area = bundle2.width * bundle2.height
                 if (bundle1_area + bundle2_area > bundle_width * bundle_height
-                    or (bundle1.get_total_weight() + bundle2.get_total_weight() > MAX_WEIGHT)):
+                    or (bundle1.get_total_weight() + bundle2.get_total_weight() > run.config.max_weight)):
                     continue
+                if run.out_of_budget():
+                    break  # keep the bundles merged so far
                 # try to pack them into a new bundle
-                merged_bundles = _pack_skus_with_pattern(all_skus, bundle_width, bundle_height, machine=machine, merging=True)
+                merged_bundles = _pack_skus_with_pattern(run, all_skus, bundle_width, bundle_height, machine=machine, merging=True)
                 if len(merged_bundles) == 1:
                     # if they fit into one bundle, remove the original bundles
                     bundles.pop(j)
@@ -203,7 +235,7 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
                     bundles.append(merged_bundles[0])
                     merging_able = True
                     break
-            if merging_able:
+            if merging_able or run.budget_limited:
                 break
     # After merging, create combined bundles if they are laid flat
     sku_groups = {}
@@ -218,9 +250,9 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
                 sku_groups[f"{bundle_idx}_{sku.y}"].append(sku)
             bundles.remove(bundle)
         else:
-            _add_filler_material(bundle)
+            _add_filler_material(run, bundle)
     if len(flat_count) == 1:
-        _add_filler_material(flat_count[0])
+        _add_filler_material(run, flat_count[0])
         bundles.append(flat_count[0])
         sku_groups = {}
 
@@ -228,13 +260,12 @@ def _try_merge_bundles(bundles: List[Bundle], bundle_width: int, bundle_height:
     if sku_groups:
         for group_key, group_skus in sku_groups.items():
             flat_bundle.skus.extend(group_skus)
-        bundles.extend(_stack_skus_flat(flat_bundle, sku_groups))
+        bundles.extend(_stack_skus_flat(run, flat_bundle, sku_groups))
 
     return bundles
 
-def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: int, merging: bool = False, machine: str = 'MACH5') -> List[Bundle]:
+def _pack_skus_with_pattern(run: PackingRun, skus: List[SKU], bundle_width: int, bundle_height: int, merging: bool = False, machine: str = 'MACH5') -> List[Bundle]:
     """Pack SKUs into bundles using pattern-based algorithm"""
-    global REMOVED_SKUS
     if not skus:
         return []
     skus.sort(key=lambda x: max(x.height, x.width), reverse=True)
@@ -266,33 +297,37 @@ def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: i
                 new_bundle = False
             else:
                 bundle = Bundle(temp_width, temp_height, MAX_LENGTH, machine)
-                remaining_skus = _pack_single_bundle(skus_copy, bundle)
+                remaining_skus = _pack_single_bundle(run, skus_copy, bundle)
 
             # If height is 0.3x width or lower, reduce width and try again
-            if (bundle.height / bundle.width < MIN_HEIGHT_WIDTH_RATIO and len(bundle.skus) > 2):
-                temp_width = round(bundle.width - 20)
+            if (bundle.height / bundle.width < run.config.min_height_width_ratio and len(bundle.skus) > 2):
+                if run.out_of_budget():
+                    break  # settle for this bundle
+                temp_width = round(bundle.width - run.config.effort.shrink_step)
                 continue
-            if (not _has_sufficient_ceiling_coverage(bundle) or bundle.height > bundle.width):
+            if (not _has_sufficient_ceiling_coverage(run, bundle) or bundle.height > bundle.width):
                 any_sku_not_bottom = False
                 for sku in reversed(bundle.skus):
                     if sku.y != 0:
                         any_sku_not_bottom = True
                         break
                 if any_sku_not_bottom:
+                    if run.out_of_budget():
+                        break  # settle for this bundle
                     # try repacking with both reduced height and reduced width, see which one gets better coverage
                     # reduce height
                     max_sku = max(bundle.skus, key=lambda s: s.y + s.height, default=None)
-                    temp_temp_height = round(bundle.height - min(max_sku.height + 1, 20))
+                    temp_temp_height = round(bundle.height - min(max_sku.height + 1, run.config.effort.shrink_step))
                     bundle_reduced_height = Bundle(temp_width, temp_temp_height, MAX_LENGTH, packing_machine=machine)
-                    rs1 = _pack_single_bundle(skus_copy, bundle_reduced_height)
-                    height_ceiling_coverage = _has_sufficient_ceiling_coverage(bundle_reduced_height, get_value=True)
+                    rs1 = _pack_single_bundle(run, skus_copy, bundle_reduced_height)
+                    height_ceiling_coverage = _has_sufficient_ceiling_coverage(run, bundle_reduced_height, get_value=True)
 
                     # reduce width
                     max_sku = max(bundle.skus, key=lambda s: s.x + s.width, default=None)
-                    temp_temp_width = round(bundle.width - min(max_sku.width + 1, 20))
+                    temp_temp_width = round(bundle.width - min(max_sku.width + 1, run.config.effort.shrink_step))
                     bundle_reduced_width = Bundle(temp_temp_width, temp_height, MAX_LENGTH, packing_machine=machine)
-                    rs2 = _pack_single_bundle(skus_copy, bundle_reduced_width)
-                    width_ceiling_coverage = _has_sufficient_ceiling_coverage(bundle_reduced_width, get_value=True)
+                    rs2 = _pack_single_bundle(run, skus_copy, bundle_reduced_width)
+                    width_ceiling_coverage = _has_sufficient_ceiling_coverage(run, bundle_reduced_width, get_value=True)
 
                     # compare (if one has more skus packed, pick that one; if same, pick one with better ceiling coverage)
                     if len(rs1) < len(rs2):
@@ -334,9 +369,9 @@ def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: i
                 if bundle.height < 100:
                     break
                 elif bundle.height < 150:
-                    filler = FILLER_44
+                    filler = run.filler_44
                 else:
-                    filler = FILLER_62
+                    filler = run.filler_62
                     filler.width, filler.height = _get_sku_dimensions(filler, True)
 
                 middle_sku_idx = len(unique_skus) // 2
@@ -355,15 +390,15 @@ def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: i
             break
         # if height still larger than width, remove filler and lay flat and add board
         if bundle.height > bundle.width and bundle.skus:
-            bundles.extend(_stack_skus_flat(bundle, {}))
+            bundles.extend(_stack_skus_flat(run, bundle, {}))
         elif bundle.skus:
             bundles.append(bundle)
 
         # If no progress, skip largest SKU
         if len(remaining_skus) == before_count and remaining_skus:
             largest_sku = max(remaining_skus, key=lambda x: x.width * x.height)
-            if largest_sku.id not in [sku.id for sku in REMOVED_SKUS]:
-                REMOVED_SKUS.append(largest_sku)
+            if largest_sku.id not in [sku.id for sku in run.removed_skus]:
+                run.removed_skus.append(largest_sku)
             # remaining_skus.remove(largest_sku)
             # Create bundle with largest SKU only
             bundle_length = 3680 if (largest_sku.length < 3700) else 7340
@@ -372,7 +407,7 @@ def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: i
             new_bundle.add_sku(largest_sku, 0, 0, False)  # Place SKU without rotation
             # find any stackable SKUs
             remaining_skus.remove(largest_sku)
-            stackable_skus = _find_stackable_skus(largest_sku, remaining_skus, set(), -1, new_bundle.max_length, False)
+            stackable_skus = _find_stackable_skus(run.config, largest_sku, remaining_skus, set(), -1, new_bundle.max_length, False)
             for sku in stackable_skus:
                 new_bundle.add_sku(sku, 0, 0, False)
                 remaining_skus.remove(sku)
@@ -380,7 +415,7 @@ def _pack_skus_with_pattern(skus: List[SKU], bundle_width: int, bundle_height: i
 
     return bundles
 
-def _stack_skus_flat(bundle: Bundle, sku_groups: dict = {}) -> None:
+def _stack_skus_flat(run: PackingRun, bundle: Bundle, sku_groups: dict = {}) -> None:
     """Lay SKUs horizontally, keeping SKU stackings and sorting by width"""
     if not sku_groups:
         # group SKUs by x position, stacks
@@ -408,7 +443,7 @@ def _stack_skus_flat(bundle: Bundle, sku_groups: dict = {}) -> None:
         empty_groups = []
         # try to find stackable SKUs for each single group
         for i, sku in enumerate(stack_eligible_skus):
-            stackable_skus = _find_stackable_skus(sku, stack_eligible_skus, set(), i, new_bundle.max_length, False)
+            stackable_skus = _find_stackable_skus(run.config, sku, stack_eligible_skus, set(), i, new_bundle.max_length, False)
             # select the largest stackable SKU and add it to the group
             if stackable_skus:
                 largest_stackable = max(stackable_skus, key=lambda s: s.length)
@@ -428,7 +463,7 @@ def _stack_skus_flat(bundle: Bundle, sku_groups: dict = {}) -> None:
         for x, group in reversed(sorted_groups):
             max_height = max(sku.height for sku in group)
             total_weight = sum(sku.weight for sku in group)
-            if (current_y + max_height > max_width or new_bundle.get_total_weight() + total_weight > MAX_WEIGHT) and new_bundle.skus:
+            if (current_y + max_height > max_width or new_bundle.get_total_weight() + total_weight > run.config.max_weight) and new_bundle.skus:
                 # If adding this group exceeds bundle width or weight, stop packing and create new bundle
                 new_bundle.resize_to_content()
                 bundles.append(new_bundle)
@@ -438,7 +473,7 @@ def _stack_skus_flat(bundle: Bundle, sku_groups: dict = {}) -> None:
                 new_bundle = Bundle(max_width, max_width, MAX_LENGTH, packing_machine=bundle.packing_machine)
 
             for sku in reversed(group):
-                if current_y == 0 or _has_sufficient_support(0, current_y, sku.width, new_bundle):
+                if current_y == 0 or _has_sufficient_support(run.config, 0, current_y, sku.width, new_bundle):
                     new_bundle.add_sku(sku, 0, current_y, False)  # Place SKU without rotation
                     sku_groups[x].remove(sku)
             current_y += max_height
@@ -450,7 +485,7 @@ def _stack_skus_flat(bundle: Bundle, sku_groups: dict = {}) -> None:
 
     return bundles
 
-def _pack_single_bundle(skus: List[SKU], bundle: Bundle) -> List[SKU]:
+def _pack_single_bundle(run: PackingRun, skus: List[SKU], bundle: Bundle) -> List[SKU]:
     """Pack a single bundle using vertical/horizontal pattern"""
     remaining_skus = skus.copy()
     current_y = 0
@@ -466,7 +501,7 @@ def _pack_single_bundle(skus: List[SKU], bundle: Bundle) -> List[SKU]:
     ]
     if len(bottom_eligible_skus) > 0:
         # Pack bottom row first if eligible SKUs exist
-        row_height = _place_bottom_row(bundle, bottom_eligible_skus, remaining_skus, True)
+        row_height = _place_bottom_row(run, bundle, bottom_eligible_skus, remaining_skus, True)
         current_y += row_height
 
     # turn all SKUs horizontal
@@ -479,18 +514,18 @@ def _pack_single_bundle(skus: List[SKU], bundle: Bundle) -> List[SKU]:
     while remaining_skus and current_y < bundle.height:
         # Pack regular row
         if len(remaining_skus) <= 2 and bundle.skus:
-            remaining_skus = fill_row_greedy(bundle, remaining_skus, current_y + remaining_skus[0].height-5)
+            remaining_skus = fill_row_greedy(run, bundle, remaining_skus, current_y + remaining_skus[0].height-5)
             if not remaining_skus:
                 break
-        row_height = _pack_row(bundle, remaining_skus, current_y, bool(current_y == 0), bundle.max_length)
+        row_height = _pack_row(run, bundle, remaining_skus, current_y, bool(current_y == 0), bundle.max_length)
 
         if row_height == 0:
             break
 
         current_y += row_height
-        remaining_skus = fill_row_greedy(bundle, remaining_skus, current_y)
+        remaining_skus = fill_row_greedy(run, bundle, remaining_skus, current_y)
 
-    remaining_skus = fill_remaining_greedy(bundle, remaining_skus)
+    remaining_skus = fill_remaining_greedy(run, bundle, remaining_skus)
 
     # sort short skus
     short_skus.sort(key=lambda x: (x.width * x.height), reverse=False)
@@ -499,7 +534,7 @@ def _pack_single_bundle(skus: List[SKU], bundle: Bundle) -> List[SKU]:
     original_width = bundle.width
     original_height = bundle.height
     bundle.resize_to_content()
-    _add_filler_material(bundle)
+    _add_filler_material(run, bundle)
     for sku in reversed(short_skus):
         if _place_short_sku_in_filler(bundle, sku, in_bundle=False):
             short_skus.remove(sku)
@@ -515,29 +550,28 @@ def _pack_single_bundle(skus: List[SKU], bundle: Bundle) -> List[SKU]:
     if short_skus and current_y < bundle.height:
         while short_skus and current_y < bundle.height:
             # Pack short SKUs in a greedy manner
-            row_height = _pack_row(bundle, short_skus, current_y, bool(current_y == 0), bundle.max_length)
+            row_height = _pack_row(run, bundle, short_skus, current_y, bool(current_y == 0), bundle.max_length)
             if row_height == 0:
                 break
 
             current_y += row_height
-            short_skus = fill_row_greedy(bundle, short_skus, current_y)
+            short_skus = fill_row_greedy(run, bundle, short_skus, current_y)
 
         # Fill remaining gaps after initial packing
-        short_remaining_skus = fill_remaining_greedy(bundle, short_skus)
+        short_remaining_skus = fill_remaining_greedy(run, bundle, short_skus)
         remaining_skus += short_remaining_skus
 
     # Add filler and shrink bundle to content
     bundle.resize_to_content()
-    _add_filler_material(bundle)
+    _add_filler_material(run, bundle)
     # 2nd pass, move any short SKUs into filler if possible
     for sku in bundle.skus:
         _place_short_sku_in_filler(bundle, sku, in_bundle = True)
 
     return remaining_skus
 
-def _place_bottom_row(bundle: Bundle, bottom_eligible_skus: List[SKU], remaining_skus: List[SKU], is_vertical_row: bool) -> int:
+def _place_bottom_row(run: PackingRun, bundle: Bundle, bottom_eligible_skus: List[SKU], remaining_skus: List[SKU], is_vertical_row: bool) -> int:
     """Place eligible bottom SKUs horizontally in the first row"""
-    global BOTTOM_ROW_LENGTH
     for sku in bottom_eligible_skus:
         sku.width, sku.height = _get_sku_dimensions(sku, is_vertical_row)
     freq = Counter(sku.id for sku in bottom_eligible_skus)
@@ -557,9 +591,9 @@ def _place_bottom_row(bundle: Bundle, bottom_eligible_skus: List[SKU], remaining
 
         if (current_x + sku.width <= bundle.width and
             (row_height == 0 or sku.height <= row_height) and
-            _can_fit_in_bundle(sku, current_x, 0, is_vertical_row, bundle) and
-            _sku_within_height_range(sku, row_skus) and
-            sum(s[1].weight for s in row_skus) + sku.weight <= MAX_WEIGHT):
+            _can_fit_in_bundle(run.config, sku, current_x, 0, is_vertical_row, bundle) and
+            _sku_within_height_range(run.config, sku, row_skus) and
+            sum(s[1].weight for s in row_skus) + sku.weight <= run.config.max_weight):
 
             row_skus.append((i, sku, current_x, 0, is_vertical_row))
             if sku.length == 3650:
@@ -572,7 +606,7 @@ def _place_bottom_row(bundle: Bundle, bottom_eligible_skus: List[SKU], remaining
             row_height = max(row_height, sku.height)
             bottom_eligible_skus.remove(sku)
             remaining_skus.remove(sku)
-            BOTTOM_ROW_LENGTH = current_x
+            run.bottom_row_length = current_x
 
     # Place the row
     for i, sku, x, y, rotated in row_skus:
@@ -580,7 +614,7 @@ def _place_bottom_row(bundle: Bundle, bottom_eligible_skus: List[SKU], remaining
 
     return row_height
 
-def _pack_row(bundle: Bundle, remaining_skus: List[SKU], current_y: int, is_vertical_row: bool, max_length: int) -> int:
+def _pack_row(run: PackingRun, bundle: Bundle, remaining_skus: List[SKU], current_y: int, is_vertical_row: bool, max_length: int) -> int:
     """Pack a single row of SKUs"""
     row_skus = []
     current_x = 0
@@ -611,27 +645,27 @@ def _pack_row(bundle: Bundle, remaining_skus: List[SKU], current_y: int, is_vert
             # sku doesn't have valid dimensions
             width <= 0 or height <= 0 or
             # sku is outside +-25mm height of other SKUs in the row
-            not _sku_within_height_range(sku, row_skus)
+            not _sku_within_height_range(run.config, sku, row_skus)
         ):
             continue
 
         if (current_x + width <= bundle.width and
-            current_y + height <= bundle.height and (current_y == 0 or current_y + height <= BOTTOM_ROW_LENGTH) and
-            _can_fit_in_bundle(sku, current_x, current_y, is_vertical_row, bundle) and
+            current_y + height <= bundle.height and (current_y == 0 or current_y + height <= run.bottom_row_length) and
+            _can_fit_in_bundle(run.config, sku, current_x, current_y, is_vertical_row, bundle) and
             # Check if adding this SKU would exceed bundle weight limit
-            bundle_weight <= MAX_WEIGHT):
+            bundle_weight <= run.config.max_weight):
 
             # Check support for non-bottom rows
-            if current_y != 0 and not _has_sufficient_support(current_x, current_y, width, bundle):
+            if current_y != 0 and not _has_sufficient_support(run.config, current_x, current_y, width, bundle):
                 continue
 
             # Find stackable SKUs
-            stackable_skus = _find_stackable_skus(sku, remaining_skus, considered_skus, i, max_length, is_vertical_row)
+            stackable_skus = _find_stackable_skus(run.config, sku, remaining_skus, considered_skus, i, max_length, is_vertical_row)
 
             # Mark all SKUs in this stack as considered
             considered_skus.add(id(sku))
             for stackable_sku in reversed(stackable_skus):
-                if stackable_sku.weight + bundle_weight <= MAX_WEIGHT:
+                if stackable_sku.weight + bundle_weight <= run.config.max_weight:
                     considered_skus.add(id(stackable_sku))
                 else:
                     stackable_skus.remove(stackable_sku)
@@ -682,12 +716,12 @@ def _pack_row(bundle: Bundle, remaining_skus: List[SKU], current_y: int, is_vert
 
     return row_height
 
-def _add_filler_material(bundle: Bundle) -> None:
+def _add_filler_material(run: PackingRun, bundle: Bundle) -> None:
     """Add filler material to empty spaces, avoiding edges when possible"""
     if not bundle.skus:
         return
     
-    fillers = [FILLER_62, FILLER_44]
+    fillers = [run.filler_62, run.filler_44]
     
     placed_any = True
     while placed_any:
@@ -700,7 +734,7 @@ def _add_filler_material(bundle: Bundle) -> None:
             candidate_points.add((placed_sku.x, placed_sku.y + placed_sku.height))
 
         # Add grid points for comprehensive coverage
-        grid_size = 5
+        grid_size = run.config.effort.filler_grid
         for x in range(0, int(bundle.width), grid_size):
             for y in range(0, int(bundle.height), grid_size):
                 candidate_points.add((x, y))
@@ -732,7 +766,7 @@ def _add_filler_material(bundle: Bundle) -> None:
             if y == 0:
                 continue
 
-            best_filler, best_config = _find_best_filler(x, y, fillers, bundle)
+            best_filler, best_config = _find_best_filler(run.config, x, y, fillers, bundle)
 
             if best_filler and best_config:
                 width, height, rotated = best_config
@@ -783,10 +817,11 @@ def _place_short_sku_in_filler(bundle: Bundle, sku, in_bundle: bool) -> None:
 
 # Helper functions
 
-def fill_remaining_greedy(bundle: Bundle, remaining_skus: List[SKU], grid_size: int = 25) -> List[SKU]:
+def fill_remaining_greedy(run: PackingRun, bundle: Bundle, remaining_skus: List[SKU], grid_size: int = None) -> List[SKU]:
     """Fill remaining gaps in bundle with greedy placement approach, avoiding filler on edges"""
     if not remaining_skus:
         return remaining_skus
+    grid_size = grid_size or run.config.effort.greedy_grid
 
     placed_any = True
     while placed_any and remaining_skus:
@@ -821,19 +856,19 @@ def fill_remaining_greedy(bundle: Bundle, remaining_skus: List[SKU], grid_size:
                     continue
 
                 for (x, y) in candidate_points:
-                    if x + sku.width > bundle.width or y + sku.height > bundle.height or y + sku.height > BOTTOM_ROW_LENGTH:
+                    if x + sku.width > bundle.width or y + sku.height > bundle.height or y + sku.height > run.bottom_row_length:
                         continue
 
-                    if _can_place_sku_at_position(sku, x, y, sku.width, sku.height, bundle):
+                    if _can_place_sku_at_position(run.config, sku, x, y, sku.width, sku.height, bundle):
                         # Check support if not on bottom
-                        if ((y > 0 and not _has_sufficient_support(x, y, sku.width, bundle)) or
+                        if ((y > 0 and not _has_sufficient_support(run.config, x, y, sku.width, bundle)) or
                             (y == 0 and (abs(sku.length - bundle.max_length) > 100 or not sku.can_be_bottom)) or
                             (y == 0 and not rotated) or
                             (rotated and (y + sku.height > 10 + max([sku.y + sku.height for sku in bundle.skus])))):
                             continue
 
                         # Find stackable SKUs
-                        stackable_skus = _find_stackable_skus(sku, remaining_skus, considered_skus, i, bundle.max_length, rotated)
+                        stackable_skus = _find_stackable_skus(run.config, sku, remaining_skus, considered_skus, i, bundle.max_length, rotated)
 
                         # Mark all SKUs in this stack as considered
                         considered_skus.add(id(sku))
@@ -862,7 +897,7 @@ def fill_remaining_greedy(bundle: Bundle, remaining_skus: List[SKU], grid_size:
                 
     return remaining_skus
 
-def fill_row_greedy(bundle: Bundle,
+def fill_row_greedy(run: PackingRun, bundle: Bundle,
                     remaining_skus: List[SKU],
                     y_limit: int) -> List[SKU]:
     """
@@ -881,8 +916,8 @@ def fill_row_greedy(bundle: Bundle,
             candidate_points.add((sku.x + sku.width, sku.y))
             candidate_points.add((sku.x, sku.y + sku.height))
         # grid
-        for gx in range(0, bundle.width, 50):
-            for gy in range(0, round(y_limit + y_buffer), 50):
+        for gx in range(0, bundle.width, run.config.effort.row_grid):
+            for gy in range(0, round(y_limit + y_buffer), run.config.effort.row_grid):
                 if (gy <= y_limit or
                     (gy > y_limit and gx >= bundle.width * x_minimum_for_buffer)):
                     candidate_points.add((gx, gy))
@@ -907,20 +942,20 @@ def fill_row_greedy(bundle: Bundle,
                         # (rot and (y + h > bundle.height))
                     ):
                         continue
-                    if _can_place_sku_at_position(sku, x, y, w, h, bundle) and \
-                        ((y == 0 and sku.can_be_bottom) or _has_sufficient_support(x, y, w, bundle)):
+                    if _can_place_sku_at_position(run.config, sku, x, y, w, h, bundle) and \
+                        ((y == 0 and sku.can_be_bottom) or _has_sufficient_support(run.config, x, y, w, bundle)):
 
                         x_shift = x
                         # Move x position left as much as possible
                         if y == 0 and x > 0:
                             while (x_shift > 0 and
-                                   _can_place_sku_at_position(sku, x_shift - 5, y, w, h, bundle)):
+                                   _can_place_sku_at_position(run.config, sku, x_shift - 5, y, w, h, bundle)):
                                 x_shift -= 5
                             x = x_shift
 
                         # Find stackable SKUs
                         original_index = remaining_skus.index(sku)
-                        stackable_skus = _find_stackable_skus(sku, remaining_skus, considered_skus, original_index, bundle.max_length, rot)
+                        stackable_skus = _find_stackable_skus(run.config, sku, remaining_skus, considered_skus, original_index, bundle.max_length, rot)
 
                         # Mark all SKUs in this stack as considered
                         considered_skus.add(id(sku))
@@ -965,7 +1000,7 @@ def _group_skus_by_color(skus: List[SKU]) -> dict:
         color_groups[color].append(sku)
     return color_groups
 
-def _process_override_bundles(skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus: List[SKU]) -> List[Bundle]:
+def _process_override_bundles(run: PackingRun, skus: List[SKU], bundle_width: int, bundle_height: int, mach1_skus: List[SKU]) -> List[Bundle]:
     """Process SKUs with bundle override"""
     if not skus:
         return []
@@ -986,9 +1021,9 @@ def _process_override_bundles(skus: List[SKU], bundle_width: int, bundle_height:
         machine = "MACH1" if any(sku.id[-3:] in mach1_skus for sku in override_skus) else "MACH5"
         override_skus.sort(key=lambda x: max(x.height, x.width), reverse=True)
 
-        current_bundles = _pack_skus_with_pattern(override_skus, bundle_width, bundle_height, machine=machine)
+        current_bundles = _pack_skus_with_pattern(run, override_skus, bundle_width, bundle_height, machine=machine)
         # attempt to merge in case of any missed space
-        merged_bundles = _try_merge_bundles(current_bundles, bundle_width, bundle_height, machine=machine)
+        merged_bundles = _try_merge_bundles(run, current_bundles, bundle_width, bundle_height, machine=machine)
         for bundle in merged_bundles:
             if bundle.skus:
                 bundles.append(bundle)
@@ -1005,9 +1040,9 @@ def _can_any_sku_fit(skus: List[SKU], bundle_width: int, bundle_height: int) ->
             return True
     return False
 
-def _can_place_sku_at_position(sku: SKU, x: int, y: int, width: int, height: int, bundle: Bundle) -> bool:
+def _can_place_sku_at_position(config: PackingConfig, sku: SKU, x: int, y: int, width: int, height: int, bundle: Bundle) -> bool:
     """Check if SKU can be placed at specific position with given dimensions"""
-    if x + width > bundle.width or y + height > bundle.height or sku.weight + bundle.get_total_weight() > MAX_WEIGHT:
+    if x + width > bundle.width or y + height > bundle.height or sku.weight + bundle.get_total_weight() > config.max_weight:
         return False
     if y == 0 and (not sku.can_be_bottom):# or (bundle.max_length == 7340 and sku.length < 3700)):
         return False
@@ -1020,13 +1055,13 @@ def _can_place_sku_at_position(sku: SKU, x: int, y: int, width: int, height: int
             return False
     return True
 
-def _has_sufficient_ceiling_coverage(bundle: Bundle, get_value: bool = False) -> bool:
+def _has_sufficient_ceiling_coverage(run: PackingRun, bundle: Bundle, get_value: bool = False) -> bool:
     """Check if the bundle has sufficient coverage along the top of the bundle"""
     copy_bundle = copy.deepcopy(bundle)
     copy_bundle.resize_to_content()
-    _add_filler_material(copy_bundle)
-    buffer = MAX_DIST_FROM_CEILING
-    required_coverage = MIN_CEILING_COVERAGE # % coverage required
+    _add_filler_material(run, copy_bundle)
+    buffer = run.config.max_dist_from_ceiling
+    required_coverage = run.config.min_ceiling_coverage # % coverage required
 
     if not copy_bundle.skus:
         return False
@@ -1043,10 +1078,10 @@ def _has_sufficient_ceiling_coverage(bundle: Bundle, get_value: bool = False) ->
         return total_coverage / (copy_bundle.width)
     return total_coverage >= copy_bundle.width * required_coverage
 
-def _has_sufficient_support(x: int, y: int, width: int, bundle: Bundle, get_value: bool = False) -> bool:
+def _has_sufficient_support(config: PackingConfig, x: int, y: int, width: int, bundle: Bundle, get_value: bool = False) -> bool:
     """Check if position has sufficient support from SKUs below"""
-    threshold = BASE_COVERAGE_THRESHOLD
-    buffer = SKU_COVERAGE_HEIGHT_BUFFER
+    threshold = config.base_coverage_threshold
+    buffer = config.sku_coverage_height_buffer
     support_segments = []
     # Loop through SKUs to find overlaps
     for sku in bundle.skus:
@@ -1072,10 +1107,10 @@ def _get_sku_dimensions(sku: SKU, vertical: bool) -> Tuple[int, int]:
     else:
         return max(sku.width, sku.height), min(sku.width, sku.height)
 
-def _can_fit_in_bundle(sku: SKU, x: int, y: int, vertical: bool, bundle: Bundle) -> bool:
+def _can_fit_in_bundle(config: PackingConfig, sku: SKU, x: int, y: int, vertical: bool, bundle: Bundle) -> bool:
     """Check if SKU can fit at position with given orientation"""
     width, height = _get_sku_dimensions(sku, vertical)
-    return _can_place_sku_at_position(sku, x, y, width, height, bundle)
+    return _can_place_sku_at_position(config, sku, x, y, width, height, bundle)
 
 def _should_rotate_sku(sku: SKU, is_vertical_row: bool) -> bool:
     """Determine if SKU should be rotated based on row orientation"""
@@ -1098,7 +1133,7 @@ def _calculate_potential_area(x: int, y: int, bundle: Bundle) -> int:
     
     return max_width * max_height
 
-def _find_best_filler(x: int, y: int, fillers: List[SKU], bundle: Bundle) -> Tuple[SKU, Tuple[int, int, bool]]:
+def _find_best_filler(config: PackingConfig, x: int, y: int, fillers: List[SKU], bundle: Bundle) -> Tuple[SKU, Tuple[int, int, bool]]:
     """Find best filler for a position, avoiding edges when possible"""
     best_filler = None
     best_config = None
@@ -1112,10 +1147,10 @@ def _find_best_filler(x: int, y: int, fillers: List[SKU], bundle: Bundle) -> Tup
         ]
         
         for width, height, rotated in orientations:
-            if not _can_place_sku_at_position(filler, x, y, width, height, bundle):
+            if not _can_place_sku_at_position(config, filler, x, y, width, height, bundle):
                 continue
                 
-            if y != 0 and not _has_sufficient_support(x, y, width, bundle):
+            if y != 0 and not _has_sufficient_support(config, x, y, width, bundle):
                 continue
             
             # Calculate distance to nearest edge
@@ -1136,7 +1171,7 @@ def _find_best_filler(x: int, y: int, fillers: List[SKU], bundle: Bundle) -> Tup
     
     return best_filler, best_config
 
-def _find_stackable_skus(target_sku: SKU, remaining_skus: List[SKU], unavailable_skus: set, target_index: int, max_length: int, rotated: bool) -> List[SKU]:
+def _find_stackable_skus(config: PackingConfig, target_sku: SKU, remaining_skus: List[SKU], unavailable_skus: set, target_index: int, max_length: int, rotated: bool) -> List[SKU]:
     """Find SKUs that can be stacked with target SKU based on combined length"""
     stackable = []
     current_total_length = target_sku.length
@@ -1147,7 +1182,7 @@ def _find_stackable_skus(target_sku: SKU, remaining_skus: List[SKU], unavailable
         if id(sku) in unavailable_skus:
             continue
         sku.width, sku.height = _get_sku_dimensions(sku, rotated)
-        if i != target_index and _skus_compatible_for_stacking(sku, target_sku):
+        if i != target_index and _skus_compatible_for_stacking(config, sku, target_sku):
             candidates.append((sku, i))
     
     # Sort candidates by length (descending) to place larger SKUs in back
@@ -1164,15 +1199,15 @@ def _find_stackable_skus(target_sku: SKU, remaining_skus: List[SKU], unavailable
     
     return stackable
 
-def _skus_compatible_for_stacking(sku1: SKU, sku2: SKU) -> bool:
+def _skus_compatible_for_stacking(config: PackingConfig, sku1: SKU, sku2: SKU) -> bool:
     """Check if two SKUs are compatible for stacking based on dimensions and properties"""
     # Check if candidate sku is within 13mm of target sku width and height
-    return (abs(sku1.width - sku2.width) <= STACKING_MAX_DIFF and
-            abs(sku1.height - sku2.height) <= STACKING_MAX_DIFF)
+    return (abs(sku1.width - sku2.width) <= config.stacking_max_diff and
+            abs(sku1.height - sku2.height) <= config.stacking_max_diff)
 
-def _sku_within_height_range(sku: SKU, row_skus: List) -> bool:
+def _sku_within_height_range(config: PackingConfig, sku: SKU, row_skus: List) -> bool:
     """Check if SKU is within height tolerance of previous SKU"""
-    height_tol = SKU_MAX_HEIGHT_DIFF # mm tolerance for height matching
+    height_tol = config.sku_max_height_diff # mm tolerance for height matching
     if not row_skus:
         return True
     last_sku_height = row_skus[-1][1].height
@@ -0,0 +1,220 @@
+# bundle_pipeline.py
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Iterable, List
+
+import bundle_exact
+import bundle_packing
+import bundle_skyline
+from bundle_classes import create_packaging_classes
+from bundle_config import PackingConfig
+
+"""
+Staged runner for the optimization: orders flow from a source (ingest) through processing stages
+(e.g. packing) to result sinks (image rendering, export records, Excel rows, pack result).
+
+Stages are connected by bounded queues and each stage runs its own number of worker threads, so packing the
+next orders overlaps with rendering and writing the finished ones, and only a few orders are in flight at once.
+Sinks run in the calling thread, in source order (so the outputs do not depend on which worker finished first),
+and an order is released as soon as every sink has consumed it. The ingest stage takes an order only while fewer
+than the queue size plus the workers are in flight, so orders that finish early while an earlier one is still
+being packed wait in a buffer of at most that many.
+
+Orders are packed by the engine their configuration names (PACKING_ENGINE). An engine is a function
+(skus, mach1_skus, config) -> (bundles or -1, removed SKUs, budget limited) that packs one order's SKUs with the
+packaging SKUs of bundle_classes (set up by create_packaging_classes), like bundle_packing.pack_skus.
+Small orders (EXACT_MAX_SKUS) are then searched exactly for fewer bundles (see bundle_exact), unless the packing
+effort is "fast".
+
+Orders packed in worker processes are watched: an order still packing at its hard time limit (ORDER_TIME_LIMIT)
+has its process stopped and is reported as a PackingTimeout, and the other orders carry on in a fresh pool.
+"""
+
+_DONE = object()  # end-of-stream marker
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[object, object], object]  # (key, value) -> new value, or None to drop the item
+    workers: int = 1
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], sinks: List[Callable[[object, object], None]], queue_size: int = 4,
+                 should_stop: Callable[[], bool] = None):
+        self.stages = stages
+        self.sinks = sinks
+        self.queue_size = max(1, queue_size)
+        self.should_stop = should_stop or (lambda: False)
+        self.stopping = threading.Event()
+        self.errors = []  # (stage name, exception) of the workers that failed
+        self.consumed = 0  # items passed to the sinks
+        # items taken from the source and not yet released by the sinks
+        self.in_flight = threading.Semaphore(self.queue_size + sum(max(1, stage.workers) for stage in stages))
+
+    def _feed(self, source: Iterable, out_queue: queue.Queue) -> None:
+        """Ingest stage: number the source items and queue them, stopping early if requested"""
+        try:
+            for index, (key, value) in enumerate(source):
+                if self.stopping.is_set() or self.should_stop():
+                    break
+                self.in_flight.acquire()  # released when the item leaves the sinks
+                out_queue.put((index, key, value))
+        except Exception as e:
+            self.errors.append(("ingest", e))
+            self.stopping.set()
+        finally:
+            out_queue.put(_DONE)
+
+    def _work(self, stage: Stage, in_queue: queue.Queue, out_queue: queue.Queue, remaining: list, lock: threading.Lock) -> None:
+        """Worker of a processing stage; the last worker to finish passes the end marker on"""
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                in_queue.put(_DONE)  # for the other workers of this stage
+                break
+            index, key, value = item
+            if self.stopping.is_set():
+                out_queue.put((index, key, None))  # drain without doing the work
+                continue
+            try:
+                value = stage.func(key, value)
+            except Exception as e:
+                self.errors.append((stage.name, e))
+                self.stopping.set()
+                value = None
+            out_queue.put((index, key, value))
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                out_queue.put(_DONE)
+
+    def run(self, source: Iterable) -> int:
+        """
+        Run every item of the source, an iterable of (key, value), through the stages and sinks.
+        Raises the first error of a stage or sink (after stopping the other workers); returns the number of items
+        passed to the sinks
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0]), name="pipeline-ingest", daemon=True)]
+        for stage, in_queue, out_queue in zip(self.stages, queues, queues[1:]):
+            workers = max(1, stage.workers)
+            remaining, lock = [workers], threading.Lock()
+            threads.extend(threading.Thread(target=self._work, args=(stage, in_queue, out_queue, remaining, lock),
+                                            name=f"pipeline-{stage.name}-{i}", daemon=True) for i in range(workers))
+        for thread in threads:
+            thread.start()
+
+        # sink the items in source order; items that finish early wait in a buffer, bounded by in_flight
+        pending, next_index = {}, 0
+        results = queues[-1]
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            index, key, value = item
+            pending[index] = (key, value)
+            while next_index in pending:
+                key, value = pending.pop(next_index)
+                next_index += 1
+                try:
+                    if value is None or self.stopping.is_set():
+                        continue
+                    for sink in self.sinks:
+                        sink(key, value)
+                    self.consumed += 1
+                except Exception as e:
+                    self.errors.append(("sink", e))
+                    self.stopping.set()
+                finally:
+                    self.in_flight.release()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0][1]
+        return self.consumed
+
+def _init_packer(packaging_data: dict) -> None:
+    """Set up the packaging SKUs in a packing process"""
+    create_packaging_classes(packaging_data)
+
+# packing engines by PACKING_ENGINE name (see bundle_config.PACKING_ENGINES)
+ENGINES = {
+    'pattern': bundle_packing.pack_skus,
+    'skyline': bundle_skyline.pack_skus,
+}
+
+def pack_order(skus: list, mach1_skus: List[str], config: PackingConfig):
+    """
+    Pack one order's SKUs with the given limits and engine; returns its bundles (-1 if the order cannot be packed),
+    the SKUs removed while packing it and whether its packing budget ran out
+    """
+    engine = ENGINES[config.packing_engine]
+    if 1 < len(skus) <= config.exact_max_skus and config.exact_time_limit and config.effort.exact_search:
+        return bundle_exact.pack_skus(skus, mach1_skus, config, engine)
+    return engine(skus, mach1_skus, config)
+
+class PackingTimeout(Exception):
+    """An order was still packing at its hard time limit, so its packing process was stopped"""
+
+class PackPool:
+    """
+    Packing processes with a watchdog: pack() waits for an order at most the configuration's ORDER_TIME_LIMIT,
+    then stops the pool's processes and starts new ones. Orders that were packing in the other processes
+    are packed again, so only the order that ran too long is lost
+    """
+    RETRIES = 2  # times an order is packed again after its pool was stopped for another order
+
+    def __init__(self, packaging_data: dict, workers: int):
+        self.packaging_data = packaging_data
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_packer, initargs=(self.packaging_data,))
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Stop the processes of executor (unless it was already replaced) and start a new pool"""
+        with self.lock:
+            if executor is not self.executor:
+                return
+            # shutdown() waits for the running orders, so the processes are killed first
+            # (ProcessPoolExecutor has no public way to do this before Python 3.14)
+            for process in list((executor._processes or {}).values()):
+                process.kill()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._start()
+
+    def pack(self, skus: list, mach1_skus: List[str], config: PackingConfig):
+        """Pack an order in a worker process (see pack_order); raises PackingTimeout if it runs past its limit"""
+        for attempt in range(self.RETRIES + 1):
+            with self.lock:
+                executor = self.executor
+                future = executor.submit(pack_order, skus, mach1_skus, config)
+            try:
+                return future.result(timeout=config.order_time_limit or None)
+            except FuturesTimeout:
+                self._restart(executor)
+                raise PackingTimeout(f"Packing was stopped after the time limit of {config.order_time_limit:g}s.") from None
+            except BrokenProcessPool:
+                # stopped by the watchdog for another order (or a process crashed)
+                if attempt == self.RETRIES:
+                    raise
+                self._restart(executor)
+
+    def shutdown(self, cancel_futures: bool = False) -> None:
+        with self.lock:
+            self.executor.shutdown(cancel_futures=cancel_futures)
+
+def pack_executor(packaging_data: dict, workers: int):
+    """
+    Process pool for packing orders in parallel (see PackPool), or None to pack in the pipeline's own thread
+    (workers <= 1). Each process sets up its own packaging SKUs (module globals of bundle_classes); the packing limits
+    are sent with each order
+    """
+    if workers <= 1:
+        return None
+    return PackPool(packaging_data, workers)
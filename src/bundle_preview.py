@@ -0,0 +1,244 @@
+# bundle_preview.py
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from PyQt6 import QtCore, QtGui
+from PyQt6.QtWidgets import QFileDialog, QMenu, QWidget
+
+from bundle_classes import Bundle
+from bundle_svg import sku_color
+
+"""
+In-app preview of an order's bundles, drawn directly with QPainter.
+
+The drawing shows the same information as the bundle images (SKU rectangles, hatched fillers,
+SKU labels with stacked quantities, and each bundle's dimensions and weight), but needs no image file,
+so an order can be previewed as soon as it is packed. Zooming and switching units only repaint the widget.
+
+preview_panels takes a snapshot of the geometry of packed bundles (in mm and kg), so the widget never reads
+Bundle objects that the optimization thread may still be changing.
+"""
+
+MARGIN = 36  # px around each bundle, for its title and axis labels
+MIN_ZOOM = 0.25
+MAX_ZOOM = 8.0
+
+@dataclass(frozen=True)
+class PreviewPanel:
+    """Geometry of one bundle, in mm and kg"""
+    width: float  # drawn width (SKUs only)
+    height: float  # drawn height (SKUs only)
+    display_width: float  # with packaging
+    display_height: float  # with packaging and lumber
+    max_length: float
+    weight: float
+    small: bool  # bundle at most 400mm wide and high (finer ticks)
+    skus: Tuple[Tuple[str, float, float, float, float], ...]  # (id, x, y, width, height), largest first
+
+def preview_panels(bundles: List[Bundle], packaging_height: float = 0, packaging_width: float = 0,
+                   lumber_height: float = 0) -> List[PreviewPanel]:
+    """
+    Snapshot the bundles of an order for the preview (same geometry as visualize_bundles)
+    """
+    panels = []
+    for bundle in bundles:
+        # packaging SKUs are not drawn (fillers are)
+        skus = [sku for sku in bundle.skus if not sku.id.startswith("Pack_") or "Filler" in sku.id]
+        if not skus:
+            continue
+        actual_width = max(sku.x + sku.width for sku in skus)
+        actual_height = max(sku.y + sku.height for sku in skus)
+        lumber = lumber_height if all(sku.rotated is False for sku in skus) else 0
+        panels.append(PreviewPanel(
+            width=actual_width,
+            height=actual_height,
+            display_width=actual_width + packaging_width,
+            display_height=actual_height + packaging_height + lumber,
+            max_length=3680 if max((sku.length for sku in skus if sku.length), default=0) < 3700 else 7340,
+            weight=bundle.get_total_weight(),
+            small=not (bundle.height > 400 or bundle.width > 400),
+            skus=tuple((sku.id, sku.x, sku.y, sku.width, sku.height)
+                       for sku in sorted(skus, key=lambda sku: sku.width * sku.height, reverse=True)),
+        ))
+    return panels
+
+class BundlePreview(QWidget):
+    """
+    Draws the bundles of one order side by side. Scroll to zoom, drag to pan, double-click to reset the view
+    and right-click to save the preview as an image
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.panels = []
+        self.unit = 'metric'
+        self.message = "Packed orders are previewed here."
+        self.zoom = 1.0
+        self.offset = QtCore.QPointF(0, 0)
+        self.drag_start = None
+        self.colors = {}  # SKU id -> QColor
+
+    def set_panels(self, panels: List[PreviewPanel]) -> None:
+        """Show an order's bundles (from preview_panels), resetting the view"""
+        self.panels = panels
+        self.message = "No bundles to preview." if not panels else ""
+        self.reset_view()
+
+    def set_unit(self, unit: str) -> None:
+        """Show dimensions and weights in 'metric' or 'imperial' units"""
+        self.unit = unit
+        self.update()
+
+    def clear(self, message: str = "") -> None:
+        self.panels = []
+        self.message = message
+        self.reset_view()
+
+    def reset_view(self) -> None:
+        self.zoom = 1.0
+        self.offset = QtCore.QPointF(0, 0)
+        self.update()
+
+    def get_color(self, sku_id: str) -> QtGui.QColor:
+        if sku_id not in self.colors:
+            self.colors[sku_id] = QtGui.QColor(sku_color(sku_id))
+        return self.colors[sku_id]
+
+## Events
+
+    def wheelEvent(self, event):
+        # zoom around the cursor
+        factor = 1.15 if event.angleDelta().y() > 0 else 1 / 1.15
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        cursor = event.position()
+        self.offset = cursor - (cursor - self.offset) * (zoom / self.zoom)
+        self.zoom = zoom
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self.drag_start = event.position() - self.offset
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is not None:
+            self.offset = event.position() - self.drag_start
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_start = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_view()
+
+    def contextMenuEvent(self, event):
+        if not self.panels:
+            return
+        menu = QMenu(self)
+        save_action = menu.addAction("Save Image...")
+        if menu.exec(event.globalPos()) == save_action:
+            path, _ = QFileDialog.getSaveFileName(self, "Save preview image", "", "PNG image (*.png)")
+            if path:
+                self.grab().save(path, "PNG")
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), QtGui.QColor("white"))
+        if not self.panels:
+            painter.setPen(QtGui.QColor(120, 120, 120))
+            painter.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, self.message)
+            return
+
+        # fit every bundle side by side in a square panel, then apply the zoom and pan
+        panel_size = max(50.0, min(self.width() / len(self.panels), self.height()) - 2 * MARGIN)
+        painter.translate(self.offset)
+        painter.scale(self.zoom, self.zoom)
+        for idx, panel in enumerate(self.panels):
+            self.draw_panel(painter, panel, idx + 1, idx * (panel_size + 2 * MARGIN) + MARGIN, MARGIN, panel_size)
+        painter.end()
+
+## Drawing
+
+    def draw_panel(self, painter: QtGui.QPainter, panel: PreviewPanel, number: int, left: float, top: float,
+                   panel_size: float) -> None:
+        """Draw one bundle with its top-left corner at (left, top)"""
+        if self.unit == 'imperial':
+            divisor, weight_multiplier, length_unit, weight_unit, ticks = 25.4, 2.20462, 'in', 'lbs', 2
+        else:
+            divisor, weight_multiplier, length_unit, weight_unit, ticks = 1, 1, 'mm', 'kg', 50
+        if panel.small:
+            ticks /= 2
+        scale = panel_size / max(panel.width, panel.height)  # px per mm
+        width, height = panel.width * scale, panel.height * scale
+        bottom = top + height
+
+        font = painter.font()
+        font.setPointSizeF(8)
+        painter.setFont(font)
+        painter.setPen(QtGui.QColor("black"))
+        title = (f"Bundle {number}\n({panel.display_width / divisor:.0f}x{panel.display_height / divisor:.0f}"
+                 f"x{panel.max_length / divisor:.0f}{length_unit}, {panel.weight * weight_multiplier:.2f}{weight_unit})")
+        painter.drawText(QtCore.QRectF(left - MARGIN, 0, width + 2 * MARGIN, top - 2),
+                         QtCore.Qt.AlignmentFlag.AlignHCenter | QtCore.Qt.AlignmentFlag.AlignBottom, title)
+
+        # axes with ticks in the selected unit
+        painter.drawRect(QtCore.QRectF(left, top, width, height))
+        font.setPointSizeF(6)
+        painter.setFont(font)
+        tick = 0.0
+        while tick < panel.width / divisor:
+            x = left + tick * divisor * scale
+            painter.drawLine(QtCore.QPointF(x, bottom), QtCore.QPointF(x, bottom + 3))
+            painter.drawText(QtCore.QRectF(x - 20, bottom + 3, 40, 12), QtCore.Qt.AlignmentFlag.AlignHCenter, f"{tick:g}")
+            tick += ticks
+        tick = 0.0
+        while tick < panel.height / divisor:
+            y = bottom - tick * divisor * scale
+            painter.drawLine(QtCore.QPointF(left - 3, y), QtCore.QPointF(left, y))
+            painter.drawText(QtCore.QRectF(left - MARGIN, y - 6, MARGIN - 5, 12),
+                             QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter, f"{tick:g}")
+            tick += ticks
+
+        # SKUs, largest first so smaller ones stay visible
+        filler_pen = QtGui.QPen(QtGui.QColor("red"), 1.5, QtCore.Qt.PenStyle.DashLine)
+        filler_brush = QtGui.QBrush(QtGui.QColor(179, 179, 179), QtCore.Qt.BrushStyle.BDiagPattern)
+        sku_pen = QtGui.QPen(QtGui.QColor("black"), 0.8)
+        sku_locations = {}
+        for sku_id, x, y, sku_width, sku_height in panel.skus:
+            rect = QtCore.QRectF(left + x * scale, bottom - (y + sku_height) * scale, sku_width * scale, sku_height * scale)
+            if "Filler" in sku_id:
+                painter.setPen(filler_pen)
+                painter.setBrush(filler_brush)
+            else:
+                painter.setPen(sku_pen)
+                painter.setBrush(self.get_color(sku_id))
+            painter.drawRect(rect)
+            sku_locations.setdefault((x, y), []).append((sku_id, sku_width, sku_height, rect))
+
+        # label each position with its SKUs and stacked quantities
+        font.setPointSizeF(5)
+        font.setBold(True)
+        painter.setFont(font)
+        metrics = QtGui.QFontMetricsF(font)
+        for location_skus in sku_locations.values():
+            counts = {}
+            for sku_id, sku_width, sku_height, _ in location_skus:
+                if sku_width and sku_height:
+                    counts[sku_id] = counts.get(sku_id, 0) + 1
+            lines = []
+            for sku_id, quantity in counts.items():
+                lines.extend(sku_id.replace("_Partial", "\n(Partial)").split("\n"))
+                if quantity > 1:
+                    lines.append(f"(x{quantity})")
+            if not lines:
+                continue
+            center = max(location_skus, key=lambda s: s[1] * s[2])[3].center()
+            text = "\n".join(lines)
+            box = metrics.boundingRect(QtCore.QRectF(), QtCore.Qt.AlignmentFlag.AlignCenter, text).adjusted(-2, -1, 2, 1)
+            box.moveCenter(center)
+            painter.setPen(QtCore.Qt.PenStyle.NoPen)
+            painter.setBrush(QtGui.QColor(255, 255, 255, 204))
+            painter.drawRoundedRect(box, 2, 2)
+            painter.setPen(QtGui.QColor("black"))
+            painter.drawText(box, QtCore.Qt.AlignmentFlag.AlignCenter, text)
+        font.setBold(False)
+        painter.setFont(font)
@@ -0,0 +1,147 @@
+# bundle_render.py
+import json
+import os
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+from bundle_classes import Bundle
+from bundle_fingerprint import pack_fingerprint
+
+"""
+Renders bundle images in a pool of worker processes, so drawing runs alongside packing and Excel writing
+instead of after each order on the critical path.
+
+Orders are submitted as soon as they are packed. A failed image is reported for its order
+without stopping the other images or the run.
+The "svg" renderer (bundle_svg) draws SVG files without importing matplotlib; the "matplotlib" renderer
+(bundle_visualize) draws PNG files.
+
+A manifest in the images directory records the fingerprint of each image's pack result and render options,
+so the images of orders whose result has not changed are reused instead of redrawn.
+"""
+
+MANIFEST_NAME = "image_manifest.json"
+# Bump when a renderer change should redraw every image
+RENDER_VERSION = 2
+
+RENDERERS = {
+    'matplotlib': '.png',
+    'svg': '.svg',
+}
+
+def _render_order(renderer: str, payload: bytes, save_path: str, unit: str, packaging_height: float,
+                  packaging_width: float, lumber_height: float) -> None:
+    """Draw one order's bundles (runs in a worker process)"""
+    # imported here, so a worker only loads the renderer it uses
+    if renderer == 'svg':
+        from bundle_svg import write_bundle_svg as draw
+    else:
+        from bundle_visualize import visualize_bundles as draw
+    draw(pickle.loads(payload), save_path, unit, packaging_height, packaging_width, lumber_height)
+
+def render_executor(max_workers: int = None) -> ProcessPoolExecutor:
+    """Worker processes for drawing images"""
+    # leave a core for packing
+    return ProcessPoolExecutor(max_workers=max_workers or max(1, (os.cpu_count() or 2) - 1))
+
+class RenderPool:
+    def __init__(self, images_dir: str, unit: str, packaging_height: float, packaging_width: float,
+                 lumber_height: float, renderer: str = 'matplotlib', max_workers: int = None, executor: Executor = None):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown image renderer '{renderer}'. Expected one of: {', '.join(RENDERERS)}")
+        self.renderer = renderer
+        self.images_dir = images_dir
+        self.unit = unit
+        self.packaging_height = packaging_height
+        self.packaging_width = packaging_width
+        self.lumber_height = lumber_height
+        # an executor that is passed in (e.g. kept warm between runs) is not shut down with the pool
+        self.owns_executor = executor is None
+        self.executor = executor or render_executor(max_workers)
+        self.futures = {}
+        self.orders = []  # every order queued, in order
+        self.reused = []  # orders whose existing image was kept
+        self.fingerprints = {}  # order -> fingerprint of the image being drawn
+        self.manifest_path = os.path.join(images_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        with open(self.manifest_path, 'w', encoding='utf-8') as fh:
+            json.dump(self.manifest, fh, indent=1)
+
+    def render_options(self) -> dict:
+        return {
+            'version': RENDER_VERSION,
+            'renderer': self.renderer,
+            'unit': self.unit,
+            'packaging_height': self.packaging_height,
+            'packaging_width': self.packaging_width,
+            'lumber_height': self.lumber_height,
+        }
+
+    def image_path(self, order) -> str:
+        return f"{self.images_dir}/Order_{order}{RENDERERS[self.renderer]}"
+
+    def submit(self, order, bundles: List[Bundle]) -> None:
+        """
+        Queue an order's image, unless the existing image was drawn from the same pack result and options.
+        The bundles are serialised now, so later changes to them (e.g. while writing Excel) do not affect the image
+        """
+        if not bundles:
+            return
+        self.orders.append(order)
+        fingerprint = pack_fingerprint(bundles, self.render_options())
+        key = str(order)
+        if self.manifest.get(key) == fingerprint and os.path.exists(self.image_path(order)):
+            self.reused.append(order)
+            return
+        self.manifest.pop(key, None)  # the old image no longer matches
+        self.fingerprints[order] = fingerprint
+        payload = pickle.dumps(bundles, protocol=pickle.HIGHEST_PROTOCOL)
+        future = self.executor.submit(_render_order, self.renderer, payload, self.image_path(order), self.unit,
+                                      self.packaging_height, self.packaging_width, self.lumber_height)
+        self.futures[future] = order
+
+    def wait(self, on_progress: Callable[[int, int], None] = None) -> Dict[object, str]:
+        """
+        Wait for the queued images, calling on_progress(done, total) as each finishes, and record the drawn
+        images in the manifest. Returns the error of each order whose image failed
+        """
+        failures = {}
+        total = len(self.futures)
+        for done, future in enumerate(as_completed(self.futures), start=1):
+            order = self.futures[future]
+            if future.cancelled():
+                pass
+            elif future.exception() is not None:
+                failures[order] = str(future.exception()) or type(future.exception()).__name__
+            else:
+                self.manifest[str(order)] = self.fingerprints[order]
+            if on_progress:
+                on_progress(done, total)
+        self.futures = {}
+        try:
+            self._save_manifest()
+        except OSError:
+            pass  # images are redrawn next time
+        return failures
+
+    def cancel_pending(self) -> None:
+        """Drop the queued images that have not started"""
+        for future in self.futures:
+            future.cancel()
+
+    def shutdown(self, cancel: bool = False) -> None:
+        """Stop the worker processes (if the pool started them), dropping images that have not started if cancel is set"""
+        if cancel:
+            self.cancel_pending()
+        if self.owns_executor:
+            self.executor.shutdown(wait=True, cancel_futures=cancel)
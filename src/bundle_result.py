@@ -0,0 +1,192 @@
+# bundle_result.py
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List
+
+from bundle_classes import Bundle, PlacedSKU, SKU
+
+"""
+Versioned on-disk format for pack results, so images and Excel/export files can be regenerated
+(e.g. in other units) without re-packing.
+
+A pack result file is gzipped JSON holding:
+- "skus": a table of unique SKU specs (id, quantity, dimensions, weight, description, order data)
+- "orders": each order's bundles (size, machine and placements as [spec, x, y, rotated]) and its SKUs excluded for missing data
+- "removed": SKUs removed during packing
+- the packaging dimensions, unit and run parameters, and each order's content fingerprint
+Identical SKUs share one spec, so a file is a fraction of the size of the objects it describes.
+"""
+
+FORMAT_NAME = "bundle-pack-result"
+FORMAT_VERSION = 1
+PACK_RESULT_EXTENSION = ".pack.json.gz"
+
+@dataclass
+class PackResult:
+    order_bundles: Dict[object, List[Bundle]]
+    missing_skus: List[SKU] = field(default_factory=list)
+    removed_skus: List[SKU] = field(default_factory=list)
+    packaging_height: float = 0
+    packaging_width: float = 0
+    lumber_height: float = 0
+    unit: str = 'metric'  # unit selected when the orders were packed
+    params: dict = field(default_factory=dict)  # run parameters (bundle limits, variables, input headers)
+    fingerprints: dict = field(default_factory=dict)  # order -> content fingerprint
+    created_on: str = ''
+
+def is_pack_result_file(path: str) -> bool:
+    """Return True if the path names a pack result file"""
+    return path.lower().endswith(PACK_RESULT_EXTENSION)
+
+def _encode(value):
+    """Encode a value as JSON-compatible data, tagging dates so they load back as datetimes"""
+    if isinstance(value, (datetime, date)):
+        if value != value:  # NaT
+            return None
+        return {'$dt': value.isoformat()}
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    if isinstance(value, dict):
+        return {key: _encode(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(val) for val in value]
+    return value
+
+def _decode(value):
+    """Reverse _encode"""
+    if isinstance(value, dict):
+        if set(value) == {'$dt'}:
+            return datetime.fromisoformat(value['$dt'])
+        return {key: _decode(val) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_decode(val) for val in value]
+    return value
+
+class _SpecTable:
+    """Deduplicating table of SKU specs"""
+    def __init__(self):
+        self.specs = []
+        self.index = {}
+
+    def add(self, sku: SKU) -> int:
+        spec = _encode([sku.id, sku.bundleqty, sku.width, sku.height, sku.length, sku.weight, sku.desc,
+                        bool(sku.can_be_bottom), sku.data])
+        key = json.dumps(spec, sort_keys=True, default=str)
+        if key not in self.index:
+            self.index[key] = len(self.specs)
+            self.specs.append(spec)
+        return self.index[key]
+
+def _sku_kwargs(spec: list) -> dict:
+    """Keyword arguments for an SKU built from a spec (each SKU gets its own copy of the order data)"""
+    sku_id, bundleqty, width, height, length, weight, desc, can_be_bottom, data = spec
+    return {
+        'id': sku_id,
+        'bundleqty': bundleqty,
+        'width': width,
+        'height': height,
+        'length': length,
+        'weight': weight,
+        'desc': desc,
+        'can_be_bottom': can_be_bottom,
+        'data': _decode(data) if data is not None else None,
+    }
+
+class PackResultWriter:
+    """
+    Builds a pack result file one order at a time, so packed orders can be released as soon as they are added
+    """
+    def __init__(self):
+        self.specs = _SpecTable()
+        self.orders = []
+
+    def add_order(self, order, bundles: List[Bundle], missing_skus: List[SKU] = (), fingerprint: str = None) -> None:
+        """Add an order's bundles and its SKUs excluded for missing data"""
+        self.orders.append({
+            'order': _encode(order),
+            'fingerprint': fingerprint,
+            'bundles': [{
+                'width': bundle.width,
+                'height': bundle.height,
+                'max_length': bundle.max_length,
+                'machine': bundle.packing_machine,
+                'skus': [[self.specs.add(sku), sku.x, sku.y, bool(sku.rotated)] for sku in bundle.skus],
+            } for bundle in bundles],
+            'missing': [self.specs.add(sku) for sku in missing_skus if sku.data and sku.data.get('OrderNbr') == order],
+        })
+
+    def save(self, path: str, result: PackResult) -> None:
+        """Write the added orders, with the removed SKUs, packaging and parameters of result (its order_bundles are ignored)"""
+        removed = [self.specs.add(sku) for sku in result.removed_skus]
+        payload = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'created_on': result.created_on or datetime.now().isoformat(timespec='seconds'),
+            'unit': result.unit,
+            'packaging': {
+                'height': result.packaging_height,
+                'width': result.packaging_width,
+                'lumber_height': result.lumber_height,
+            },
+            'params': _encode(result.params),
+            'skus': self.specs.specs,
+            'orders': self.orders,
+            'removed': removed,
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as fh:
+            json.dump(payload, fh, separators=(',', ':'), default=str)
+
+def save_pack_result(path: str, result: PackResult) -> None:
+    """
+    Write a pack result file
+    """
+    writer = PackResultWriter()
+    for order, bundles in result.order_bundles.items():
+        writer.add_order(order, bundles, result.missing_skus, result.fingerprints.get(order))
+    writer.save(path, result)
+
+def load_pack_result(path: str) -> PackResult:
+    """
+    Read a pack result file into Bundle/PlacedSKU objects that can be passed to visualize_bundles
+    and the Excel/export writers
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        payload = json.load(fh)
+    if payload.get('format') != FORMAT_NAME:
+        raise ValueError(f"{path} is not a pack result file.")
+    version = payload.get('version')
+    if isinstance(version, int) and version > FORMAT_VERSION:
+        raise ValueError(f"Pack result version {version} is newer than this program supports ({FORMAT_VERSION}).")
+    if not isinstance(version, int) or version < 1:
+        raise ValueError(f"{path} has an unknown pack result version ({version!r}).")
+
+    specs = payload['skus']
+    order_bundles, missing_skus, fingerprints = {}, [], {}
+    for entry in payload['orders']:
+        order = _decode(entry['order'])
+        bundles = []
+        for bundle_data in entry['bundles']:
+            bundle = Bundle(bundle_data['width'], bundle_data['height'], bundle_data['max_length'], bundle_data['machine'])
+            for spec_idx, x, y, rotated in bundle_data['skus']:
+                bundle.skus.append(PlacedSKU(**_sku_kwargs(specs[spec_idx]), x=x, y=y, rotated=rotated))
+            bundles.append(bundle)
+        order_bundles[order] = bundles
+        missing_skus.extend(SKU(**_sku_kwargs(specs[spec_idx])) for spec_idx in entry['missing'])
+        if entry.get('fingerprint'):
+            fingerprints[order] = entry['fingerprint']
+
+    packaging = payload['packaging']
+    return PackResult(
+        order_bundles=order_bundles,
+        missing_skus=missing_skus,
+        removed_skus=[SKU(**_sku_kwargs(specs[spec_idx])) for spec_idx in payload['removed']],
+        packaging_height=packaging['height'],
+        packaging_width=packaging['width'],
+        lumber_height=packaging['lumber_height'],
+        unit=payload['unit'],
+        params=_decode(payload['params']),
+        fingerprints=fingerprints,
+        created_on=payload['created_on'],
+    )
@@ -0,0 +1,202 @@
+# bundle_service.py
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+
+from bundle_config import EFFORT_LEVELS, PACKING_ENGINES
+from bundle_orders import UNITS, init_worker, pack_request
+
+"""
+Local HTTP/JSON packing service, so other tools (quoting, order entry) can get bundle counts, sizes and weights
+of an order without the GUI.
+
+    POST /pack?unit=metric&svg=1&budget=10&effort=fast&engine=skyline   body: a JSON order (see bundle_orders)
+    GET  /health
+
+The response is the order's result from bundle_orders (plus "svg" if requested). Orders are packed by a pool of
+worker processes that keep the reference data loaded. Identical requests (with the same options and budget) that
+arrive while one is being packed share its result instead of packing the order again. Each request has a time
+budget (the "budget" parameter, in seconds, or the service default), which is also the order's packing budget if it
+is shorter than ORDER_TIME_BUDGET: the packer then settles for the best bundles found near the deadline. A request
+still waiting when its budget runs out gets a 504 response; an order no request is waiting on any more is not
+started if it is still queued. The "effort" parameter (fast, balanced or thorough) overrides PACKING_EFFORT
+of variables.json, e.g. for an instant estimate while quoting, and "engine" (pattern or skyline) PACKING_ENGINE.
+
+The service only listens on the local machine unless another host is given.
+Usage: startupBundleOptimizer.exe serve [--port 8765] [--workers N] [--budget 30]
+"""
+
+DEFAULT_PORT = 8765
+MAX_BODY = 1024 * 1024  # bytes
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error", 504: "Gateway Timeout"}
+
+logger = logging.getLogger("bundle_service")
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class PackingService:
+    def __init__(self, workers: int = None, budget: float = 30.0):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.budget = budget
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        self.in_flight = {}  # request key -> future of the order being packed
+        self.waiters = {}  # request key -> number of requests waiting on it
+        self.stats = {'requests': 0, 'packed': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+
+    def warm_up(self) -> None:
+        """Start every worker process now, so they load the reference data before the first request"""
+        for future in [self.executor.submit(init_worker) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def request_key(order: dict, unit: str, svg: bool, effort: str = None, engine: str = None,
+                    budget: float = None) -> str:
+        """Identical orders (with the same options) have the same key"""
+        canonical = json.dumps([order, unit, svg, effort, engine, budget], sort_keys=True, separators=(',', ':'),
+                               default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def pack(self, order: dict, unit: str, svg: bool, budget: float, effort: str = None, engine: str = None) -> dict:
+        """
+        Pack an order in the worker pool, sharing the work with an identical request in progress
+        """
+        key = self.request_key(order, unit, svg, effort, engine, budget)
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, pack_request, order, unit, svg, effort, engine, budget)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.stats['packed'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            # shielded, so a request that gives up does not cancel the work other requests are waiting on
+            return await asyncio.wait_for(asyncio.shield(future), budget)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            if self.waiters[key] == 1:
+                future.cancel()  # no one else is waiting: drop the order if it has not started packing
+            raise HttpError(504, f"Order not packed within the time budget of {budget:g}s.") from None
+        except ValueError as e:
+            raise HttpError(400, str(e)) from None
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+    async def route(self, method: str, target: str, body: bytes):
+        """Get the status and JSON response of a request"""
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/health":
+            if method != "GET":
+                raise HttpError(405, "Use GET.")
+            return 200, {'status': 'ok', 'workers': self.workers, 'in_flight': len(self.in_flight), **self.stats}
+        if url.path != "/pack":
+            raise HttpError(404, f"No such endpoint: {url.path}")
+        if method != "POST":
+            raise HttpError(405, "Use POST with a JSON order.")
+        try:
+            order = json.loads(body or b'null')
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {e}") from None
+        unit = params.get('unit', 'metric')
+        if unit not in UNITS:
+            raise HttpError(400, f"Unknown unit '{unit}'. Expected one of: {', '.join(UNITS)}")
+        svg = params.get('svg', '0').lower() in ('1', 'true', 'yes')
+        try:
+            budget = float(params.get('budget', self.budget))
+        except ValueError:
+            raise HttpError(400, "The budget must be a number of seconds.") from None
+        if budget <= 0:
+            raise HttpError(400, "The budget must be positive.")
+        effort = params.get('effort')
+        if effort is not None and effort not in EFFORT_LEVELS:
+            raise HttpError(400, f"Unknown effort '{effort}'. Expected one of: {', '.join(EFFORT_LEVELS)}")
+        engine = params.get('engine')
+        if engine is not None and engine not in PACKING_ENGINES:
+            raise HttpError(400, f"Unknown engine '{engine}'. Expected one of: {', '.join(PACKING_ENGINES)}")
+        return 200, await self.pack(order, unit, svg, budget, effort, engine)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP/1.1 request (the connection is closed after the response)"""
+        self.stats['requests'] += 1
+        try:
+            try:
+                request_line = (await reader.readline()).decode('latin-1').split()
+                if len(request_line) != 3:
+                    raise HttpError(400, "Malformed request line.")
+                method, target, _ = request_line
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1')
+                    if line in ('\r\n', '\n', ''):
+                        break
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    raise HttpError(413, f"The request body is limited to {MAX_BODY} bytes.")
+                body = await reader.readexactly(length) if length else b''
+                status, response = await self.route(method.upper(), target, body)
+            except HttpError as e:
+                status, response = e.status, {'error': str(e)}
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                status, response = 400, {'error': f"Malformed request: {e}"}
+            except Exception as e:
+                logger.exception("Error handling a request")
+                status, response = 500, {'error': str(e) or type(e).__name__}
+            if status >= 400:
+                self.stats['errors'] += 1
+            payload = json.dumps(response, default=str).encode()
+            writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode('latin-1') + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass  # the client went away
+        finally:
+            writer.close()
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = None, budget: float = 30.0,
+                started: asyncio.Event = None) -> None:
+    """Run the service until cancelled"""
+    service = PackingService(workers, budget)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, service.warm_up)
+        server = await asyncio.start_server(service.handle, host, port)
+        logger.info("Packing service on http://%s:%d with %d workers", host, port, service.workers)
+        if started is not None:
+            started.set()
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="startupBundleOptimizer serve", description="Run the local packing service.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: this machine only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, help="packing processes (default: one less than the number of cores)")
+    parser.add_argument("--budget", type=float, default=30.0, help="default time budget of a request, in seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.budget))
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,233 @@
+# bundle_skyline.py
+import copy
+from typing import List, Tuple
+
+import bundle_classes
+from bundle_classes import SKU, Bundle
+from bundle_config import PackingConfig
+from bundle_packing import (PackingRun, _add_filler_material, _get_sku_dimensions, _group_skus_by_color,
+                            _has_sufficient_support, _skus_compatible_for_stacking)
+
+"""
+Skyline packing engine: a second implementation of the packing engine interface (see bundle_pipeline.ENGINES),
+selected with PACKING_ENGINE = "skyline".
+
+The SKUs of an order are first combined into lengthwise stacks, once: SKUs are bucketed by cross-section (within
+STACKING_MAX_DIFF of the bucket's largest SKU) and each bucket's lengths are packed first-fit decreasing against
+the bundle length. Each bundle cross-section then keeps its top profile (the skyline) as a list of flat segments,
+and each stack is placed where it ends lowest, then furthest left, so a placement only looks at the segments under
+it rather than at every candidate point of a grid. It follows the same rules as the pattern engine (bundle_packing):
+
+    - SKUs shorter than the bundle are stacked lengthwise with SKUs of a similar width and height
+    - the bottom row only takes SKUs that can be at the bottom and fill the bundle's length, standing on edge
+    - a SKU above the bottom row needs BASE_COVERAGE_THRESHOLD of its base supported by the SKUs below
+    - a bundle stays within MAX_WIDTH, MAX_HEIGHT and MAX_WEIGHT, and MACH1 and MACH5 SKUs are not mixed
+    - SKUs with the same bundle override are packed into their own bundles
+
+It does not repack bundles to improve their shape or merge bundles afterwards, so it is much faster on large
+orders but can use more bundles; the packing effort does not change it.
+"""
+
+LONG_LENGTH = 7340  # mm, bundle length for SKUs longer than 3700 mm
+SHORT_LENGTH = 3680  # mm
+
+class _Stack:
+    """SKUs packed at the same position, one behind the other along the bundle's length"""
+    def __init__(self, skus: List[SKU]):
+        self.skus = skus
+        self.length = sum(sku.length for sku in skus)
+        self.weight = sum(sku.weight for sku in skus)
+        self.can_be_bottom = skus[0].can_be_bottom
+
+    def dimensions(self, vertical: bool) -> Tuple[int, int]:
+        """Width and height of the stack's footprint (its widest and tallest SKU) standing on edge or laid flat"""
+        sizes = [_get_sku_dimensions(sku, vertical) for sku in self.skus]
+        return max(width for width, _ in sizes), max(height for _, height in sizes)
+
+def _place_on_skyline(skyline: List[list], x: int, width: int, top: int) -> None:
+    """Raise the skyline to top over [x, x + width)"""
+    updated = []
+    for seg_x, seg_width, seg_y in skyline:
+        seg_end = seg_x + seg_width
+        if seg_end <= x or seg_x >= x + width:
+            updated.append([seg_x, seg_width, seg_y])
+            continue
+        if seg_x < x:
+            updated.append([seg_x, x - seg_x, seg_y])
+        if seg_end > x + width:
+            updated.append([x + width, seg_end - x - width, seg_y])
+    updated.append([x, width, top])
+    updated.sort()
+    skyline[:] = []
+    for segment in updated:
+        # merge neighbouring segments of the same height
+        if skyline and skyline[-1][2] == segment[2] and skyline[-1][0] + skyline[-1][1] == segment[0]:
+            skyline[-1][1] += segment[1]
+        else:
+            skyline.append(segment)
+
+def _best_position(config: PackingConfig, bundle: Bundle, skyline: List[list], stack: _Stack, bottom_row: bool):
+    """
+    Lowest-ending position of a stack on the skyline (then leftmost), as (x, y, vertical), or None if it does not fit.
+    With bottom_row, only bottom SKUs that fill the bundle's length, standing on edge, go on the bottom
+    """
+    if bundle.get_total_weight() + stack.weight > config.max_weight:
+        return None
+    bottom_ok = stack.can_be_bottom and stack.length >= bundle.max_length - 100
+    best = None
+    for vertical in (True, False):
+        width, height = stack.dimensions(vertical)
+        for index, (x, _, _) in enumerate(skyline):
+            if x + width > bundle.width:
+                break
+            # the stack rests on the highest segment under it
+            y, covered = 0, x
+            for seg_x, seg_width, seg_y in skyline[index:]:
+                if covered >= x + width:
+                    break
+                y = max(y, seg_y)
+                covered = seg_x + seg_width
+            if y + height > bundle.height:
+                continue
+            if y == 0 and bottom_row and not (bottom_ok and vertical):
+                continue
+            if y > 0 and not _has_sufficient_support(config, x, y, width, bundle):
+                continue
+            key = (y + height, y, x)
+            if best is None or key < best[0]:
+                best = (key, x, y, vertical)
+    return None if best is None else best[1:]
+
+class _FlatSection:
+    """A SKU's cross-section laid flat, for comparing SKUs without changing their orientation"""
+    __slots__ = ('sku', 'width', 'height')
+
+    def __init__(self, sku: SKU):
+        self.sku = sku
+        self.width, self.height = _get_sku_dimensions(sku, False)
+
+def _stack_buckets(config: PackingConfig, skus: List[SKU]) -> List[List[SKU]]:
+    """
+    Bucket SKUs by cross-section: each SKU joins the first bucket whose largest SKU it can be stacked with.
+    Stacking only compares widths and heights in the same orientation, so the buckets hold for either
+    """
+    buckets = []
+    for sku in sorted(skus, key=lambda sku: (max(sku.width, sku.height), min(sku.width, sku.height)), reverse=True):
+        flat = _FlatSection(sku)
+        for bucket in buckets:
+            if _skus_compatible_for_stacking(config, bucket[0], flat):
+                bucket.append(flat)
+                break
+        else:
+            buckets.append([flat])
+    return [[flat.sku for flat in bucket] for bucket in buckets]
+
+def _build_stacks(config: PackingConfig, skus: List[SKU], max_length: int) -> List[_Stack]:
+    """
+    Group SKUs into lengthwise stacks that fit the bundle length: the lengths of each cross-section bucket
+    are packed first-fit decreasing, a SKU joining the first stack it fits that its front SKU can be stacked with
+    """
+    stacks = []
+    for bucket in _stack_buckets(config, skus):
+        bucket.sort(key=lambda sku: (sku.length, max(sku.width, sku.height)), reverse=True)
+        bucket_stacks = []
+        for sku in bucket:
+            for stack in bucket_stacks:
+                if (stack[1] + sku.length <= max_length
+                        and _skus_compatible_for_stacking(config, _FlatSection(stack[0][0]), _FlatSection(sku))):
+                    stack[0].append(sku)
+                    stack[1] += sku.length
+                    break
+            else:
+                bucket_stacks.append([[sku], sku.length])
+        stacks.extend(_Stack(members) for members, _ in bucket_stacks)
+    # SKUs that can be at the bottom first, then by cross-section area; short SKUs (which support nothing) last
+    stacks.sort(key=lambda stack: (not stack.can_be_bottom, stack.length <= 609,
+                                   -max(s.width for s in stack.skus) * max(s.height for s in stack.skus)))
+    return stacks
+
+def _pack_group(run: PackingRun, skus: List[SKU], machine: str) -> List[Bundle]:
+    """Pack SKUs of one machine into as many bundles as needed"""
+    config = run.config
+    remaining = list(skus)
+    stacks, stacks_length = [], None
+    bundles = []
+    while remaining:
+        max_length = LONG_LENGTH if max(sku.length for sku in remaining) >= 3700 else SHORT_LENGTH
+        if max_length != stacks_length:
+            # the stacks are planned once, and again only if the bundles get shorter
+            stacks, stacks_length = _build_stacks(config, remaining, max_length), max_length
+        bundle = Bundle(config.max_width, config.max_height, max_length, packing_machine=machine)
+        # without SKUs for a bottom row, any SKU can be at the bottom (as in the pattern engine)
+        bottom_row = any(stack.can_be_bottom and stack.length >= max_length - 100 for stack in stacks)
+        skyline = [[0, config.max_width, 0]]
+        placed = []
+        for stack in list(stacks):
+            position = _best_position(config, bundle, skyline, stack, bottom_row)
+            if position is None:
+                continue
+            x, y, vertical = position
+            width, height = stack.dimensions(vertical)
+            for sku in stack.skus:
+                sku.width, sku.height = _get_sku_dimensions(sku, vertical)
+                bundle.add_sku(sku, x, y, vertical)
+            _place_on_skyline(skyline, x, width, y + height)
+            placed.extend(stack.skus)
+            stacks.remove(stack)
+
+        if not placed:
+            # the largest SKU fits no bundle: ship it on its own, as the pattern engine does
+            largest = max(remaining, key=lambda sku: sku.width * sku.height)
+            if largest.id not in [sku.id for sku in run.removed_skus]:
+                run.removed_skus.append(largest)
+            largest.width, largest.height = _get_sku_dimensions(largest, False)
+            bundle = Bundle(largest.width, largest.height, LONG_LENGTH if largest.length >= 3700 else SHORT_LENGTH,
+                            packing_machine=machine)
+            bundle.add_sku(largest, 0, 0, False)
+            placed = [largest]
+            stacks_length = None  # its stack is broken up
+        else:
+            bundle.resize_to_content()
+            _add_filler_material(run, bundle)
+        placed_ids = set(map(id, placed))
+        remaining = [sku for sku in remaining if id(sku) not in placed_ids]
+        bundles.append(bundle)
+    return bundles
+
+def _machine_groups(skus: List[SKU], mach1_skus: List[str]) -> dict:
+    """Split SKUs by packing machine (MACH1 colours, and MACH5 for the others)"""
+    groups = {}
+    for color, color_skus in _group_skus_by_color(skus).items():
+        groups.setdefault('MACH1' if color[-3:] in mach1_skus else 'MACH5', []).extend(color_skus)
+    return groups
+
+def pack_skus(skus: List[SKU], mach1_skus: List[str], config: PackingConfig) -> Tuple[List[Bundle], List[SKU], bool]:
+    """
+    Pack SKUs into bundles of at most config.max_width x config.max_height along a skyline (see the module docstring).
+    Returns the bundles (-1 if MACH1 and MACH5 SKUs share a bundle override), the SKUs that could not be fitted,
+    and whether a packing budget ran out (never: a placement is not searched for, so it needs no budget)
+    """
+    run = PackingRun(config, copy.copy(bundle_classes.FILLER_44), copy.copy(bundle_classes.FILLER_62))
+
+    override_groups = {}
+    regular_skus = []
+    for sku in skus:
+        if sku.data and sku.data.get('Bdl_Override'):
+            override_groups.setdefault(sku.data['Bdl_Override'], []).append(sku)
+        else:
+            regular_skus.append(sku)
+
+    bundles = []
+    for override_skus in override_groups.values():
+        groups = _machine_groups(override_skus, mach1_skus)
+        if len(groups) > 1:
+            return -1, run.removed_skus, run.budget_limited
+        for machine, group in groups.items():
+            bundles.extend(_pack_group(run, group, machine))
+    for machine, group in _machine_groups(regular_skus, mach1_skus).items():
+        bundles.extend(_pack_group(run, group, machine))
+
+    bundles = [bundle for bundle in bundles if bundle.skus]
+    for bundle in bundles:
+        bundle.add_packaging()
+    return bundles, run.removed_skus, run.budget_limited
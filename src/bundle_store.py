@@ -0,0 +1,222 @@
+# bundle_store.py
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Tuple
+
+"""
+Local results store for optimized bundles.
+
+Holds every optimized order's output rows (the same rows written to the "Optimized_Bundles" sheet)
+in a SQLite file next to the append workbook, indexed by OrderNbr and BundleNbr, together with the
+OptimizedOn/LastModifiedOn stamps and content fingerprints used to decide which orders need to be re-optimized.
+The Excel sheet is regenerated from the store instead of being scanned and edited row by row.
+"""
+
+STORE_EXTENSION = ".db"
+
+# Column positions in an "Optimized_Bundles" row
+COL_ORDER_NBR = 1
+COL_BUNDLE_NBR = 2
+COL_OVERRIDE = 3
+COL_SKU_ID = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    last_modified_on TEXT,
+    optimized_on TEXT,
+    has_override INTEGER NOT NULL DEFAULT 0,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS bundle_rows (
+    order_key TEXT NOT NULL,
+    row_idx INTEGER NOT NULL,
+    bundle_nbr TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (order_key, row_idx)
+);
+CREATE INDEX IF NOT EXISTS bundle_rows_bundle ON bundle_rows (order_key, bundle_nbr);
+CREATE INDEX IF NOT EXISTS orders_position ON orders (position);
+"""
+
+def store_path_for(workbook_path: str) -> str:
+    """Return the results store path that belongs to an optimized bundles workbook"""
+    return os.path.splitext(workbook_path)[0] + STORE_EXTENSION
+
+def order_key(order) -> str:
+    """Normalise an order number (int, numpy int/float or str) to the key used in the store"""
+    if isinstance(order, str):
+        order = order.strip()
+        return str(int(order)) if order.isdigit() else order
+    try:
+        return str(int(order))
+    except (TypeError, ValueError):
+        return str(order)
+
+def _cell(value):
+    """Convert a cell value into something that can be stored as JSON"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if value == '':
+        return None  # empty cells read back from Excel as None
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    return value
+
+class ResultsStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        # stores created before fingerprints were added
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(orders)")]
+        if 'fingerprint' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE orders ADD COLUMN fingerprint TEXT")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value) -> None:
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def order_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def needs_sync(self, workbook_path: str) -> bool:
+        """
+        Return True if the workbook was changed outside of the program since the store was last written
+        (or the store is new), meaning the store must be re-imported from the workbook
+        """
+        if not os.path.exists(workbook_path):
+            return False
+        return (self.order_count() == 0
+                or self.get_meta('workbook_mtime') != os.path.getmtime(workbook_path))
+
+    def mark_synced(self, workbook_path: str) -> None:
+        self.set_meta('workbook_mtime', os.path.getmtime(workbook_path))
+
+    def import_sheet(self, sheet) -> None:
+        """
+        Replace the store contents with the rows of an existing "Optimized_Bundles" sheet
+        """
+        headers = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), []))
+        order_rows = {}
+        current_key = None
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            if not any(cell is not None and cell != '' for cell in row):
+                current_key = None
+                continue
+            key = order_key(row[COL_ORDER_NBR])
+            if key != current_key:
+                # same order split over two blocks only happens in hand-edited files; keep the last block
+                order_rows[key] = []
+                current_key = key
+            order_rows[key].append([_cell(cell) for cell in row])
+
+        # keep the fingerprints of orders whose rows were not changed in the workbook
+        fingerprints = {}
+        for key, fingerprint in self.conn.execute("SELECT order_key, fingerprint FROM orders WHERE fingerprint IS NOT NULL"):
+            if key in order_rows and self.bundle_rows(key) == order_rows[key]:
+                fingerprints[key] = fingerprint
+
+        with self.conn:
+            self.conn.execute("DELETE FROM orders")
+            self.conn.execute("DELETE FROM bundle_rows")
+        self.replace_orders(order_rows, fingerprints)
+        self.set_meta('headers', headers)
+        self.set_meta('unit', 'imperial' if any(h and '_in' in str(h) for h in headers) else 'metric')
+
+    def replace_orders(self, order_rows: Dict[object, List[list]], fingerprints: Dict[object, str] = None) -> None:
+        """
+        Insert or replace the rows (and fingerprints) of the given orders. Replaced orders move to the end of the sheet
+        """
+        fingerprints = {order_key(order): fingerprint for order, fingerprint in (fingerprints or {}).items()}
+        next_position = self.conn.execute("SELECT COALESCE(MAX(position), 0) FROM orders").fetchone()[0] + 1
+        with self.conn:
+            for order, rows in order_rows.items():
+                key = order_key(order)
+                last_modified_on, optimized_on, has_override = None, None, False
+                for row in rows:
+                    if type(row[COL_BUNDLE_NBR]) is not int:
+                        continue
+                    last_modified_on, optimized_on = _cell(row[-2]), _cell(row[-1])
+                    sku_id = str(row[COL_SKU_ID] or '').strip()
+                    if row[COL_OVERRIDE] and not sku_id.startswith('Pack_'):
+                        has_override = True
+
+                self.conn.execute("DELETE FROM bundle_rows WHERE order_key = ?", (key,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO orders (order_key, position, last_modified_on, optimized_on, has_override, fingerprint) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, next_position, last_modified_on, optimized_on, int(has_override), fingerprints.get(key)))
+                self.conn.executemany(
+                    "INSERT INTO bundle_rows (order_key, row_idx, bundle_nbr, data) VALUES (?, ?, ?, ?)",
+                    [(key, idx, str(row[COL_BUNDLE_NBR]), json.dumps([_cell(cell) for cell in row]))
+                     for idx, row in enumerate(rows)])
+                next_position += 1
+
+    def orders_to_optimize(self, orders: list, override_orders: list, fingerprints: Dict[object, str] = None) -> list:
+        """
+        Return the orders that need to be (re-)optimized.
+        Orders with a stored fingerprint are re-optimized only if their fingerprint changed; otherwise
+        (orders imported from a workbook) new orders, orders modified after they were last optimized,
+        orders with a bundle override, and orders whose override has been removed are re-optimized
+        """
+        fingerprints = {order_key(order): fingerprint for order, fingerprint in (fingerprints or {}).items()}
+        override_keys = {order_key(order) for order in override_orders}
+        result = []
+        for order in orders:
+            key = order_key(order)
+            state = self.conn.execute(
+                "SELECT last_modified_on, optimized_on, has_override, fingerprint FROM orders WHERE order_key = ?",
+                (key,)).fetchone()
+            if state is None:
+                result.append(order)
+                continue
+            last_modified_on, optimized_on, has_override, stored_fingerprint = state
+            if stored_fingerprint and fingerprints.get(key):
+                if stored_fingerprint != fingerprints[key]:
+                    result.append(order)
+                continue
+            if key in override_keys:
+                result.append(order)
+                continue
+            if not (last_modified_on and optimized_on) or last_modified_on > optimized_on or has_override:
+                result.append(order)
+        return result
+
+    def bundle_rows(self, order, bundle_nbr=None) -> List[list]:
+        """Return the stored rows of an order, optionally only those of one bundle"""
+        if bundle_nbr is None:
+            cursor = self.conn.execute(
+                "SELECT data FROM bundle_rows WHERE order_key = ? ORDER BY row_idx", (order_key(order),))
+        else:
+            cursor = self.conn.execute(
+                "SELECT data FROM bundle_rows WHERE order_key = ? AND bundle_nbr = ? ORDER BY row_idx",
+                (order_key(order), str(bundle_nbr)))
+        return [json.loads(data) for (data,) in cursor]
+
+    def iter_orders(self) -> Iterator[Tuple[str, List[list]]]:
+        """Yield (order_key, rows) for every stored order, in sheet order"""
+        keys = [key for (key,) in self.conn.execute("SELECT order_key FROM orders ORDER BY position")]
+        for key in keys:
+            yield key, self.bundle_rows(key)
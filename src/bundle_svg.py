@@ -0,0 +1,164 @@
+# bundle_svg.py
+import hashlib
+import html
+import os
+from typing import Dict, List
+
+from bundle_classes import Bundle
+
+"""
+Lightweight SVG renderer for bundle cross-sections, as an alternative to the matplotlib images of
+bundle_visualize (selected with IMAGE_RENDERER in variables.json).
+
+Draws the same information (SKU rectangles, hatched fillers, SKU labels with stacked quantities,
+and the bundle's dimensions and weight in metric or imperial units) as plain SVG text,
+without importing matplotlib. write_html_report combines a run's drawings into one HTML page.
+"""
+
+PANEL_SIZE = 420  # px, drawing area of one bundle
+MARGIN = 40  # px, room for the title and axis labels
+FONT = "font-family:Arial,Helvetica,sans-serif"
+
+_FILLER_PATTERN = ('<defs><pattern id="fillerHatch" patternUnits="userSpaceOnUse" width="6" height="6" '
+                   'patternTransform="rotate(45)"><rect width="6" height="6" fill="#b3b3b3"/>'
+                   '<line x1="0" y1="0" x2="0" y2="6" stroke="#808080" stroke-width="2"/></pattern></defs>')
+
+def sku_color(sku_id: str) -> str:
+    """Stable colour for an SKU (partial sub-bundles share the colour of their SKU)"""
+    digest = hashlib.md5(sku_id.replace("_Partial", "").encode()).digest()
+    # same range as the matplotlib images: each channel between 0.3 and 1.0
+    return "#" + "".join(f"{int((0.3 + 0.7 * byte / 255) * 255):02x}" for byte in digest[:3])
+
+def _ticks(limit: float, step: float) -> List[float]:
+    ticks, value = [], 0.0
+    while value < limit:
+        ticks.append(value)
+        value += step
+    return ticks
+
+def _text(x: float, y: float, lines: List[str], size: float, weight: str = 'normal') -> str:
+    """Centred multi-line text"""
+    # one element per line (rather than tspans), and a baseline offset rather than dominant-baseline, for simple SVG viewers
+    top = y - (len(lines) - 1) * size * 0.6 + size * 0.35
+    return "".join(f'<text x="{x:.1f}" y="{top + i * size * 1.2:.1f}" text-anchor="middle" font-size="{size:.1f}" '
+                   f'font-weight="{weight}" style="{FONT}">{html.escape(line)}</text>' for i, line in enumerate(lines))
+
+def _bundle_panel(bundle: Bundle, number: int, offset_x: float, unit: str, packaging_height: float,
+                  packaging_width: float, lumber_height: float) -> str:
+    """SVG elements for one bundle, drawn with its top-left corner at offset_x"""
+    weight = bundle.get_total_weight()
+    # packaging SKUs are not drawn (fillers are)
+    skus = [sku for sku in bundle.skus if not sku.id.startswith("Pack_") or "Filler" in sku.id]
+    if not skus:
+        return ""
+    actual_width = max(sku.x + sku.width for sku in skus)
+    actual_height = max(sku.y + sku.height for sku in skus)
+    max_length = 3680 if max((sku.length for sku in skus if sku.length), default=0) < 3700 else 7340
+    lumber = lumber_height if all(sku.rotated is False for sku in skus) else 0
+    display_width = actual_width + packaging_width
+    display_height = actual_height + packaging_height + lumber
+
+    if unit == 'imperial':
+        divisor, weight_multiplier, length_unit, weight_unit, ticks = 25.4, 2.20462, 'in', 'lbs', 2
+    else:
+        divisor, weight_multiplier, length_unit, weight_unit, ticks = 1, 1, 'mm', 'kg', 50
+    if not (bundle.height > 400 or bundle.width > 400):
+        ticks /= 2
+
+    scale = PANEL_SIZE / max(actual_width, actual_height)  # px per mm
+    left, top = offset_x + MARGIN, MARGIN
+    bottom = top + actual_height * scale
+
+    def px(x, y):
+        return left + x * scale, bottom - y * scale
+
+    parts = [_text(left + actual_width * scale / 2, 16, [
+        f"Bundle {number}",
+        f"({display_width / divisor:.0f}x{display_height / divisor:.0f}x{max_length / divisor:.0f}{length_unit}, "
+        f"{weight * weight_multiplier:.2f}{weight_unit})"], 11)]
+
+    # axes with ticks in the selected unit
+    parts.append(f'<rect x="{left:.1f}" y="{top:.1f}" width="{actual_width * scale:.1f}" height="{actual_height * scale:.1f}" '
+                 'fill="white" stroke="black" stroke-width="1"/>')
+    for tick in _ticks(actual_width / divisor, ticks):
+        x, _ = px(tick * divisor, 0)
+        parts.append(f'<line x1="{x:.1f}" y1="{bottom:.1f}" x2="{x:.1f}" y2="{bottom + 4:.1f}" stroke="black" stroke-width="0.5"/>')
+        parts.append(f'<text x="{x:.1f}" y="{bottom + 12:.1f}" text-anchor="middle" font-size="6" style="{FONT}">{tick:g}</text>')
+    for tick in _ticks(actual_height / divisor, ticks):
+        _, y = px(0, tick * divisor)
+        parts.append(f'<line x1="{left - 4:.1f}" y1="{y:.1f}" x2="{left:.1f}" y2="{y:.1f}" stroke="black" stroke-width="0.5"/>')
+        parts.append(f'<text x="{left - 6:.1f}" y="{y + 2:.1f}" text-anchor="end" font-size="6" style="{FONT}">{tick:g}</text>')
+
+    # largest SKUs first, so smaller ones stay visible
+    sku_locations = {}
+    for sku in sorted(skus, key=lambda sku: sku.width * sku.height, reverse=True):
+        x, y = px(sku.x, sku.y + sku.height)
+        if "Filler" in sku.id:
+            parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{sku.width * scale:.1f}" height="{sku.height * scale:.1f}" '
+                         'fill="url(#fillerHatch)" fill-opacity="0.7" stroke="red" stroke-width="1.5" stroke-dasharray="4 2"/>')
+        else:
+            parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{sku.width * scale:.1f}" height="{sku.height * scale:.1f}" '
+                         f'fill="{sku_color(sku.id)}" stroke="black" stroke-width="0.8"/>')
+        sku_locations.setdefault((sku.x, sku.y), []).append(sku)
+
+    # label each position with its SKUs and stacked quantities
+    for location_skus in sku_locations.values():
+        larger_sku = max(location_skus, key=lambda s: s.width * s.height)
+        counts = {}
+        for sku in location_skus:
+            if sku.height == 0 or sku.width == 0:
+                continue
+            counts[sku.id] = counts.get(sku.id, 0) + 1
+        lines = []
+        for sku_id, quantity in counts.items():
+            lines.extend(sku_id.replace("_Partial", "\n(Partial)").split("\n"))
+            if quantity > 1:
+                lines.append(f"(x{quantity})")
+        if not lines:
+            continue
+        cx, cy = px(larger_sku.x + larger_sku.width / 2, larger_sku.y + larger_sku.height / 2)
+        size = 5
+        box_w = max(len(line) for line in lines) * size * 0.6 + 4
+        box_h = len(lines) * size * 1.2 + 2
+        parts.append(f'<rect x="{cx - box_w / 2:.1f}" y="{cy - box_h / 2:.1f}" width="{box_w:.1f}" height="{box_h:.1f}" '
+                     'rx="2" fill="white" fill-opacity="0.8"/>')
+        parts.append(_text(cx, cy, lines, size, 'bold'))
+    return "".join(parts)
+
+def bundle_svg(bundles: List[Bundle], unit: str = 'metric', packaging_height: float = 0,
+               packaging_width: float = 0, lumber_height: float = 0) -> str:
+    """
+    Build an SVG document showing the cross-section of each bundle side by side
+    """
+    panel_width = PANEL_SIZE + 2 * MARGIN
+    panels = [_bundle_panel(bundle, idx + 1, idx * panel_width, unit, packaging_height, packaging_width, lumber_height)
+              for idx, bundle in enumerate(bundles)]
+    width, height = panel_width * len(bundles), PANEL_SIZE + 2 * MARGIN
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+            f'{_FILLER_PATTERN}<rect width="100%" height="100%" fill="white"/>{"".join(panels)}</svg>')
+
+def write_bundle_svg(bundles: List[Bundle], savePath: str, unit: str = 'metric', packaging_height: float = 0,
+                     packaging_width: float = 0, lumber_height: float = 0) -> None:
+    """
+    Write an order's bundles to an SVG file (same arguments as visualize_bundles)
+    """
+    if not bundles:
+        return
+    with open(savePath, 'w', encoding='utf-8') as fh:
+        fh.write(bundle_svg(bundles, unit, packaging_height, packaging_width, lumber_height))
+
+def write_html_report(order_images: Dict[object, str], report_path: str, title: str = "Optimized Bundles") -> None:
+    """
+    Write one HTML page with the SVG drawing of every order (order -> SVG file path); missing drawings are skipped
+    """
+    sections = []
+    for order, svg_path in order_images.items():
+        if not os.path.exists(svg_path):
+            continue
+        with open(svg_path, encoding='utf-8') as fh:
+            svg = fh.read()
+        sections.append(f'<section><h2>Order {html.escape(str(order).split(".")[0])}</h2>{svg}</section>')
+    with open(report_path, 'w', encoding='utf-8') as fh:
+        fh.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+                 f'<style>body{{{FONT};background:#f4f4f4}} section{{background:white;margin:12px;padding:8px;overflow-x:auto}}</style>'
+                 f'</head><body><h1>{html.escape(title)}</h1>{"".join(sections)}</body></html>')
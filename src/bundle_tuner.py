@@ -0,0 +1,407 @@
+# bundle_tuner.py
+import argparse
+import copy
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import fields
+from typing import Dict, Iterator, List, Tuple
+
+from bundle_classes import create_packaging_classes
+from bundle_config import PackingConfig
+from bundle_fingerprint import catalog_version, order_fingerprint
+from bundle_pipeline import _init_packer, pack_order
+
+"""
+Tunes the packing limits of variables.json against real shipments: packs historical orders with different
+parameter sets and compares the bundle counts and weights with what was actually shipped.
+
+Actual counts and weights are read from the comparison sheets of the history directory (an "Order_Comparison"
+sheet with its Actual_Bund / Actual_kg columns filled in, or similar "Opt.vs.Act" and "Shipped Orders" sheets),
+and the orders' lines from the SO-PackExport workbooks next to them. Each parameter set is scored by:
+
+    bundle_error    mean absolute difference between packed and actual bundle counts
+    weight_error    mean absolute difference between packed and actual weight, in % of the actual weight
+    seconds         total packing time
+
+and the sets that no other set beats on all three are reported as the Pareto front. Orders are packed on all cores,
+and each (order, parameter set) result is cached, so a repeated or extended sweep only packs what is new.
+
+Usage: startupBundleOptimizer.exe tune <history dir> [--param MIN_CEILING_COVERAGE=0.6,0.7,0.8 ...] [--samples 8]
+"""
+
+CACHE_NAME = "tuning_cache.db"
+CACHE_VERSION = 1  # bump when the packing changes, so cached results are not reused
+LBS_PER_KG = 2.20462
+
+# search ranges of the random search (parameters of PackingConfig, in variables.json names)
+TUNABLE = {
+    'MIN_HEIGHT_WIDTH_RATIO': (0.2, 0.5),
+    'MIN_CEILING_COVERAGE': (0.5, 0.9),
+    'MAX_DIST_FROM_CEILING': (20, 100),
+    'STACKING_MAX_DIFF': (10, 40),
+    'SKU_MAX_HEIGHT_DIFF': (50, 150),
+    'BASE_COVERAGE_THRESHOLD': (0.6, 0.95),
+    'SKU_COVERAGE_HEIGHT_BUFFER': (5, 40),
+}
+OBJECTIVES = ('bundle_error', 'weight_error', 'seconds')
+
+## Historical orders
+
+def _order_number(value) -> str:
+    """Normalise an order number from a sheet (1013935, 1013935.0, 'SO-1013935') to '1013935'"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        value = int(value)
+    digits = re.sub(r'^\D+', '', str(value).strip())
+    return digits or None
+
+def _actual_columns(title: str, headers: list):
+    """
+    Find the order, actual bundle count and actual weight columns of a sheet's header row;
+    returns (order, bundles, weight, weight in lbs) indexes, or None if the sheet has no actuals
+    """
+    names = [re.sub(r'[^a-z#]', '', str(header).lower()) if header is not None else '' for header in headers]
+    order = next((i for i, name in enumerate(names) if name in ('sordernbr', 'ordernbr', 'so#', 'so', 'order')), None)
+    if order is None:
+        return None
+    if any(name.startswith('act') for name in names):
+        bundles = next((i for i, name in enumerate(names) if name.startswith('act') and 'bund' in name), None)
+        weight = next((i for i, name in enumerate(names) if name.startswith('act') and ('lbs' in name or 'kg' in name)), None)
+    elif title.lower().startswith('shipped'):
+        bundles = next((i for i, name in enumerate(names) if name.startswith('bundle')), None)
+        weight = next((i for i, name in enumerate(names) if 'weight' in name), None)
+    else:
+        return None
+    if bundles is None:
+        return None
+    return order, bundles, weight, weight is not None and 'lbs' in names[weight]
+
+def load_actuals(paths: List[str]) -> Dict[str, Tuple[int, float]]:
+    """
+    Read the actual bundle count and weight (kg, None if not recorded) of each order from the comparison sheets
+    of the workbooks; orders found in several sheets keep the last value read
+    """
+    import openpyxl
+    actuals = {}
+    for path in paths:
+        try:
+            workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        except Exception:
+            continue  # not a workbook (e.g. an Excel lock file)
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            columns = _actual_columns(sheet.title, list(header or []))
+            if columns is None:
+                continue
+            order_col, bundles_col, weight_col, in_lbs = columns
+            for row in rows:
+                if len(row) <= bundles_col:
+                    continue
+                order = _order_number(row[order_col])
+                bundles = row[bundles_col]
+                if order is None or not isinstance(bundles, (int, float)) or bundles <= 0:
+                    continue
+                weight = row[weight_col] if weight_col is not None and weight_col < len(row) else None
+                if isinstance(weight, (int, float)) and weight > 0:
+                    weight = weight / LBS_PER_KG if in_lbs else float(weight)
+                else:
+                    weight = None
+                actuals[order] = (int(bundles), weight)
+        workbook.close()
+    return actuals
+
+def history_files(history_dir: str) -> Tuple[List[str], List[str]]:
+    """The workbooks of a history directory (recursively): (SO-PackExport files, other workbooks)"""
+    exports, others = [], []
+    for root, _, names in os.walk(history_dir):
+        for name in sorted(names):
+            if name.startswith('~$') or not name.lower().endswith(('.xlsx', '.xlsm')):
+                continue
+            (exports if name.startswith('SO-PackExport') else others).append(os.path.join(root, name))
+    return exports, others
+
+def load_orders(export_paths: List[str], wanted: set, optimizer, limit: int = None) -> Dict[str, list]:
+    """
+    Create the SKUs of the wanted orders (None for all) from the SO-PackExport workbooks (the first workbook with
+    an order wins), with the current sub-bundle data; stops reading workbooks once limit orders are found
+    """
+    import openpyxl
+    orders = {}
+    for path in export_paths:
+        if (wanted is not None and not wanted - orders.keys()) or (limit and len(orders) >= limit):
+            break
+        try:
+            workbook = openpyxl.load_workbook(path, data_only=True)
+            optimizer.alerts, optimizer.mach1_skus = [], []  # the MACH1 SKUs are read again with each workbook
+            data = optimizer.get_data(workbook)
+        except Exception as e:
+            print(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        if data.empty:
+            continue
+        order_rows = {}
+        for order, rows in data.groupby('OrderNbr', sort=False):
+            order = _order_number(order)
+            if (wanted is None or order in wanted) and order not in orders:
+                order_rows[order] = rows
+        orders.update((order, skus) for order, skus in
+                      optimizer.remove_invalids(optimizer.create_sku_objects(order_rows)).items() if skus)
+    return dict(list(orders.items())[:limit]) if limit else orders
+
+## Parameter sets
+
+def params_key(config: PackingConfig) -> str:
+    """Key of a parameter set in the cache"""
+    return hashlib.sha256(json.dumps([CACHE_VERSION, config.to_variables()], sort_keys=True).encode()).hexdigest()
+
+def _parse_value(name: str, text: str):
+    types = {f.name.upper(): f.type for f in fields(PackingConfig)}
+    if name not in types:
+        raise ValueError(f"Unknown parameter {name}. Expected one of: {', '.join(types)}")
+    if types[name] is str:
+        return text.strip()
+    return types[name](float(text)) if types[name] is int else float(text)
+
+def grid_configs(base: PackingConfig, grid: Dict[str, list]) -> List[PackingConfig]:
+    """Every combination of the grid's values (the other parameters as in the base configuration)"""
+    names = list(grid)
+    variables = base.to_variables()
+    return [PackingConfig.from_variables({**variables, **dict(zip(names, values))})
+            for values in itertools.product(*(grid[name] for name in names))]
+
+def random_configs(base: PackingConfig, samples: int, seed: int = 0, names: List[str] = None) -> List[PackingConfig]:
+    """Random parameter sets within the TUNABLE ranges (values rounded, so later sweeps can reuse them)"""
+    rng = random.Random(seed)
+    types = {f.name.upper(): f.type for f in fields(PackingConfig)}
+    variables = base.to_variables()
+    configs = []
+    for _ in range(samples):
+        values = {}
+        for name in names or TUNABLE:
+            low, high = TUNABLE[name]
+            values[name] = rng.randint(low, high) if types[name] is int else round(rng.uniform(low, high), 2)
+        configs.append(PackingConfig.from_variables({**variables, **values}))
+    return configs
+
+## Evaluation
+
+class TuningCache:
+    """Results of packed (order, parameter set) pairs, in SQLite"""
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (order_key TEXT, params_key TEXT, bundles INTEGER, "
+                          "weight REAL, seconds REAL, PRIMARY KEY (order_key, params_key))")
+
+    def get_all(self, params: str) -> Dict[str, tuple]:
+        rows = self.conn.execute("SELECT order_key, bundles, weight, seconds FROM results WHERE params_key = ?", (params,))
+        return {order_key: (bundles, weight, seconds) for order_key, bundles, weight, seconds in rows}
+
+    def put(self, order_key: str, params: str, result: tuple) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (order_key, params, *result))
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+def evaluate_order(skus: list, mach1_skus: List[str], config: PackingConfig) -> tuple:
+    """
+    Pack a copy of an order's SKUs (packing changes them, and the serial sweep packs the same SKUs with every
+    parameter set); returns its bundle count (None if it cannot be packed), total weight (kg) and packing time
+    """
+    start = time.perf_counter()
+    bundles, _, _ = pack_order(copy.deepcopy(skus), mach1_skus, config)
+    seconds = time.perf_counter() - start
+    if bundles == -1:
+        return None, None, seconds
+    return len(bundles), sum(bundle.get_total_weight() for bundle in bundles), seconds
+
+def run_sweep(orders: Dict[str, list], order_keys: Dict[str, str], configs: List[PackingConfig], mach1_skus: List[str],
+              packaging_data: dict, cache: TuningCache, workers: int) -> Iterator[int]:
+    """
+    Pack every order with every parameter set that is not cached yet, storing the results in the cache;
+    yields the number of results done so far
+    """
+    tasks = []
+    for config in configs:
+        key = params_key(config)
+        cached = cache.get_all(key)
+        tasks.extend((order, key, config) for order in orders if order_keys[order] not in cached)
+    if not tasks:
+        return
+    done = 0
+    if workers <= 1:
+        for order, key, config in tasks:
+            cache.put(order_keys[order], key, evaluate_order(orders[order], mach1_skus, config))
+            done += 1
+            if done % 10 == 0:
+                cache.commit()
+            yield done
+        cache.commit()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_packer, initargs=(packaging_data,)) as executor:
+        pending = {}
+        task_iter = iter(tasks)
+        try:
+            while True:
+                # keep a few tasks per worker queued, so the orders are not all pickled up front
+                for order, key, config in itertools.islice(task_iter, max(0, 4 * workers - len(pending))):
+                    pending[executor.submit(evaluate_order, orders[order], mach1_skus, config)] = (order, key)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    order, key = pending.pop(future)
+                    cache.put(order_keys[order], key, future.result())
+                    done += 1
+                cache.commit()  # an interrupted sweep keeps what it has packed
+                yield done
+        finally:
+            for future in pending:
+                future.cancel()
+
+def score(config: PackingConfig, results: Dict[str, tuple], actuals: Dict[str, Tuple[int, float]],
+          order_keys: Dict[str, str]) -> dict:
+    """Score a parameter set on the orders it packed"""
+    bundle_errors, bundle_diffs, weight_errors, seconds = [], [], [], 0.0
+    for order, order_key in order_keys.items():
+        if order_key not in results:
+            continue
+        bundles, weight, order_seconds = results[order_key]
+        seconds += order_seconds
+        if bundles is None:
+            continue
+        actual_bundles, actual_weight = actuals[order]
+        bundle_diffs.append(bundles - actual_bundles)
+        bundle_errors.append(abs(bundles - actual_bundles))
+        if actual_weight:
+            weight_errors.append(abs(weight - actual_weight) / actual_weight * 100)
+    return {
+        **{name: value for name, value in config.to_variables().items() if name in TUNABLE},
+        'PACKING_ENGINE': config.packing_engine,
+        'PACKING_EFFORT': config.packing_effort,
+        'orders': len(bundle_errors),
+        'bundle_error': round(sum(bundle_errors) / len(bundle_errors), 3) if bundle_errors else None,
+        'bundle_bias': round(sum(bundle_diffs) / len(bundle_diffs), 3) if bundle_diffs else None,
+        'exact_bundles_pct': round(100 * bundle_errors.count(0) / len(bundle_errors), 1) if bundle_errors else None,
+        'weight_error': round(sum(weight_errors) / len(weight_errors), 2) if weight_errors else None,
+        'seconds': round(seconds, 2),
+    }
+
+def pareto_front(scores: List[dict]) -> List[dict]:
+    """The scores that no other score is at least as good as on every objective and better on one"""
+    def values(s):
+        return tuple(float('inf') if s[name] is None else s[name] for name in OBJECTIVES)
+    front = []
+    for candidate in scores:
+        c = values(candidate)
+        dominated = any(all(o <= v for o, v in zip(values(other), c)) and values(other) != c for other in scores)
+        if not dominated:
+            front.append(candidate)
+    return front
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="startupBundleOptimizer tune",
+                                     description="Tune the packing limits against the actual bundles of past orders.")
+    parser.add_argument("history", help="directory with SO-PackExport workbooks and comparison sheets of shipped orders")
+    parser.add_argument("--param", action='append', default=[], metavar="NAME=V1,V2,...",
+                        help="values of a parameter to sweep (repeat for a grid over several parameters)")
+    parser.add_argument("--samples", type=int, default=8,
+                        help="random parameter sets to try when no --param is given (default: 8)")
+    parser.add_argument("--tune", help=f"comma-separated parameters of the random search (default: all of {', '.join(TUNABLE)})")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random search")
+    parser.add_argument("--orders", type=int, help="only use the first N orders with actuals (for a quick sweep)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="packing processes (default: all cores)")
+    parser.add_argument("--cache", help=f"results cache (default: {CACHE_NAME} in the history directory)")
+    parser.add_argument("--report", help="write every parameter set's scores to this CSV file")
+    args = parser.parse_args(argv)
+
+    from bundle_daemon import HeadlessOptimizer
+    optimizer = HeadlessOptimizer(export_formats=[], draw_images=False)
+    optimizer.mach1_skus, optimizer.missingDataSKUs = [], []
+    try:
+        base = optimizer.get_packing_config()
+    except (OSError, ValueError) as e:
+        print(f"Unable to read the packing limits from variables.json: {e}")
+        return 1
+
+    try:
+        if args.param:
+            grid = {}
+            for spec in args.param:
+                name, _, values = spec.partition('=')
+                name = name.strip().upper()
+                grid[name] = [_parse_value(name, value) for value in values.split(',') if value.strip()]
+            configs = grid_configs(base, grid)
+        else:
+            names = [name.strip().upper() for name in args.tune.split(',')] if args.tune else None
+            unknown = [name for name in names or [] if name not in TUNABLE]
+            if unknown:
+                parser.error(f"cannot tune {', '.join(unknown)}; expected some of: {', '.join(TUNABLE)}")
+            configs = random_configs(base, args.samples, args.seed, names)
+    except ValueError as e:
+        parser.error(str(e))
+    configs = [base] + [config for config in configs if config != base]  # the current settings, for reference
+
+    export_paths, other_paths = history_files(args.history)
+    actuals = load_actuals(other_paths)
+    orders = load_orders(export_paths, set(actuals), optimizer, args.orders)
+    if not orders:
+        print(f"No orders with actual bundles found in {args.history} ({len(actuals)} orders with actuals, "
+              f"{len(export_paths)} SO-PackExport files).")
+        return 1
+    print(f"{len(orders)} orders with actual bundles ({len(actuals)} recorded), {len(configs)} parameter sets")
+
+    packaging_data = optimizer.get_packaging_data()
+    create_packaging_classes(packaging_data)
+    # the variables are part of each parameter set's key, so only the data files version the orders
+    program_dir = os.path.dirname(os.path.abspath(__file__))
+    catalog = catalog_version([os.path.join(program_dir, 'Sub-Bundle_Data.xlsx'), os.path.join(program_dir, 'Packaging_Data.xlsx')])
+    order_keys = {order: order_fingerprint(skus, catalog) for order, skus in orders.items()}
+
+    cache = TuningCache(args.cache or os.path.join(args.history, CACHE_NAME))
+    try:
+        start = time.perf_counter()
+        done = 0
+        for done in run_sweep(orders, order_keys, configs, optimizer.mach1_skus, packaging_data, cache, args.workers):
+            print(f"\rPacked {done} orders ({time.perf_counter() - start:.0f}s)", end='', flush=True)
+        print(f"\rPacked {done} new orders in {time.perf_counter() - start:.1f}s (the other results were cached)")
+        scores = [score(config, cache.get_all(params_key(config)), actuals, order_keys) for config in configs]
+    except KeyboardInterrupt:
+        print("\nInterrupted; the orders packed so far are cached.")
+        return 1
+    finally:
+        cache.close()
+
+    front = pareto_front(scores)
+    for entry in scores:
+        entry['pareto'] = entry in front
+    columns = list(scores[0])
+    if args.report:
+        with open(args.report, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.DictWriter(fh, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(scores)
+
+    print("\nPareto front (bundle error, weight error %, seconds):")
+    for index, entry in enumerate(sorted(front, key=lambda s: [float('inf') if s[name] is None else s[name] for name in OBJECTIVES])):
+        label = "current" if scores.index(entry) == 0 else f"set {scores.index(entry)}"
+        changes = {name: value for name, value in entry.items()
+                   if (name in TUNABLE or name in ('PACKING_ENGINE', 'PACKING_EFFORT')) and value != scores[0][name]}
+        print(f"  {label}: {entry['bundle_error']} bundles, {entry['weight_error']}%, {entry['seconds']}s "
+              f"(bias {entry['bundle_bias']}, exact {entry['exact_bundles_pct']}%) "
+              f"{json.dumps(changes) if changes else ''}")
+    return 0
@@ -11,7 +11,8 @@ Behavior:
 - Loads variables.json from the same directory as this file on import.
 - Exposes VARIABLES (dict) and creates module-level variables for each top-level key
     (only if the key is a valid Python identifier).
-- Provides reload(path=None) to reload from disk and get(key, default) to access values.
+- Provides reload(path=None) to reload from disk, read(path=None) to read the file without reloading it,
+    and get(key, default) to access values.
 """
 
 
@@ -42,6 +43,14 @@ def reload(path: Union[str, Path, None] = None) -> None:
         """
         _load(_JSON_PATH if path is None else path)
 
+def read(path: Union[str, Path, None] = None) -> Dict[str, Any]:
+        """
+        Read variables from disk without changing the loaded ones (for settings that are read again on each run).
+        Unlike reload, a missing or invalid file raises an error.
+        """
+        with Path(_JSON_PATH if path is None else path).open("r", encoding="utf-8") as fh:
+                return json.load(fh) or {}
+
 def get(key: str, default: Any = None) -> Any:
         """Return the value for key from the loaded variables, or default if missing."""
         return _data.get(key, default)
@@ -1,5 +1,7 @@
+import os
 import sys
-from PyQt6 import QtWidgets
+import multiprocessing
+from PyQt6 import QtCore, QtWidgets
 import BundleGUI as gui
 
 def handleException():
@@ -20,10 +22,40 @@ def startGUI():
     # create an instance of the GUI
     ui = gui.ProgramGUI()
 
+    report_path = os.environ.get("BUNDLE_STARTUP_REPORT")
+    if report_path:
+        # started by the startup benchmark: report once the window is shown, then exit
+        from bundle_benchmark import window_shown
+        QtCore.QTimer.singleShot(0, lambda: window_shown(report_path, app))
+
     # exit the GUI
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # bundle images are drawn in worker processes, which a frozen executable must be able to start
+    multiprocessing.freeze_support()
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        # watch-folder mode, without a window (see bundle_daemon)
+        from bundle_daemon import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        # local HTTP packing service (see bundle_service)
+        from bundle_service import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'filter':
+        # JSON Lines packing filter on stdin/stdout (see bundle_jsonl)
+        from bundle_jsonl import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        # benchmarks, e.g. time to window (see bundle_benchmark)
+        from bundle_benchmark import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'tune':
+        # tune the packing limits against past orders (see bundle_tuner)
+        from bundle_tuner import main
+        sys.exit(main(sys.argv[2:]))
+
     # set the exception hook to handle uncaught exceptions
     sys.excepthook = handleException()
 
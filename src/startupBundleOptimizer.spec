@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # not used by the program: tkinter (file dialogs are Qt's), Qt bindings other than PyQt6
+    # and interactive tools that pandas/matplotlib import only if present
+    excludes=['tkinter', '_tkinter', 'PyQt5', 'PySide2', 'PySide6', 'IPython', 'jupyter_client', 'notebook'],
     noarchive=False,
     optimize=0,
 )
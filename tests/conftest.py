@@ -0,0 +1,87 @@
+import os
+import sys
+import warnings
+
+import openpyxl
+import pytest
+
+# the program is a folder of scripts: make its modules importable, and run Qt without a display
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+EXAMPLE_INPUT = os.path.join(SRC_DIR, 'SO_Input_Example.xlsx')
+SAMPLE_DIR = os.path.join(os.path.dirname(SRC_DIR), 'sample_data', 'data_aug4')
+
+def write_example_input(path, keep_orders=None, doubled_orders=()):
+    """Write a copy of the example input with only keep_orders, doubling the first line of doubled_orders"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # the example has dates openpyxl cannot read
+        workbook = openpyxl.load_workbook(EXAMPLE_INPUT)
+    sheet = workbook['SO-PackExportData']
+    header = [cell.value for cell in sheet[1]]
+    order_col, quantity_col = header.index('OrderNbr') + 1, header.index('BaseOrderQty') + 1
+    changed = set()
+    for row in range(sheet.max_row, 1, -1):
+        order = sheet.cell(row, order_col).value
+        if keep_orders is not None and order not in keep_orders:
+            sheet.delete_rows(row)
+    for row in range(2, sheet.max_row + 1):
+        order = sheet.cell(row, order_col).value
+        if order in doubled_orders and order not in changed:
+            sheet.cell(row, quantity_col).value *= 2
+            changed.add(order)
+    workbook.save(path)
+
+def example_orders():
+    """The order numbers of the example input, in the order they appear"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        workbook = openpyxl.load_workbook(EXAMPLE_INPUT, read_only=True)
+    rows = workbook['SO-PackExportData'].iter_rows(min_row=2, values_only=True)
+    orders = list(dict.fromkeys(row[1] for row in rows if row[1] is not None))
+    workbook.close()
+    return orders
+
+def read_input(path):
+    """
+    An input's SKUs by order, its MACH1 colours and the packing configuration of variables.json,
+    with the packaging SKUs set up. Packing changes SKUs, so tests pack copies of them
+    """
+    from bundle_classes import create_packaging_classes
+    from bundle_daemon import HeadlessOptimizer
+    optimizer = HeadlessOptimizer(export_formats=[], draw_images=False)
+    optimizer.mach1_skus, optimizer.missingDataSKUs, optimizer.alerts = [], [], []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        data = optimizer.get_data(openpyxl.load_workbook(path, data_only=True))
+    order_rows = {order: rows for order, rows in data.groupby('OrderNbr', sort=False)}
+    order_skus = optimizer.remove_invalids(optimizer.create_sku_objects(order_rows))
+    create_packaging_classes(optimizer.get_packaging_data())
+    return order_skus, optimizer.mach1_skus, optimizer.get_packing_config()
+
+@pytest.fixture(scope='session')
+def example():
+    """The example input, read with read_input"""
+    return read_input(EXAMPLE_INPUT)
+
+@pytest.fixture(scope='session')
+def sample_1011854():
+    """Order 1011854 of the sample data (long lengths and hitches), read with read_input"""
+    return read_input(os.path.join(SAMPLE_DIR, 'SO-PackExport Data_1011854.xlsx'))
+
+@pytest.fixture
+def optimizer():
+    """A headless optimizer writing workbooks only; .packed records the orders it packs"""
+    from bundle_daemon import HeadlessOptimizer
+    optimizer = HeadlessOptimizer(export_formats=['xlsx'], draw_images=False)
+    packed = []
+    pack_order_skus = optimizer.pack_order_skus
+
+    def recording_pack(order, skus):
+        packed.append(order)
+        return pack_order_skus(order, skus)
+    optimizer.pack_order_skus = recording_pack
+    optimizer.packed = packed
+    yield optimizer
+    optimizer.close()
@@ -0,0 +1,39 @@
+import dataclasses
+
+from conftest import example_orders, write_example_input
+
+def test_append_packs_only_new_and_changed_orders(optimizer, tmp_path):
+    orders = example_orders()
+    first, later = orders[:3], orders[3:]
+    append_path = str(tmp_path / 'Optimized_Bundles.xlsx')
+    write_example_input(tmp_path / 'first.xlsx', keep_orders=first)
+    assert optimizer.optimize_file(str(tmp_path / 'first.xlsx'), str(tmp_path))
+    assert sorted(optimizer.packed) == sorted(first)
+
+    # all orders: only those not optimized yet are packed
+    write_example_input(tmp_path / 'all.xlsx')
+    optimizer.packed.clear()
+    assert optimizer.optimize_file(str(tmp_path / 'all.xlsx'), str(tmp_path), append_path)
+    assert sorted(optimizer.packed) == sorted(later)
+
+    # all orders again, one of them with a changed line: only that order is packed (its fingerprint changed)
+    write_example_input(tmp_path / 'changed.xlsx', doubled_orders=[later[0]])
+    optimizer.packed.clear()
+    assert optimizer.optimize_file(str(tmp_path / 'changed.xlsx'), str(tmp_path), append_path)
+    assert optimizer.packed == [later[0]]
+
+def test_append_of_optimized_orders_packs_nothing(optimizer, tmp_path):
+    write_example_input(tmp_path / 'input.xlsx', keep_orders=example_orders()[:2])
+    assert optimizer.optimize_file(str(tmp_path / 'input.xlsx'), str(tmp_path))
+    optimizer.packed.clear()
+    optimizer.optimize_file(str(tmp_path / 'input.xlsx'), str(tmp_path), str(tmp_path / 'Optimized_Bundles.xlsx'))
+    assert optimizer.packed == []
+    assert any(title == "No Orders" for title, _, _ in optimizer.alerts)
+
+def test_catalog_version_follows_the_packing_limits(optimizer):
+    """Only the variables the packing uses re-pack the optimized orders"""
+    config = optimizer.get_packing_config()
+    catalog = optimizer.get_catalog_version(config)
+    assert optimizer.get_catalog_version(dataclasses.replace(config)) == catalog
+    assert optimizer.get_catalog_version(dataclasses.replace(config, max_width=config.max_width + 1)) != catalog
+    assert optimizer.get_catalog_version(dataclasses.replace(config, packing_effort='fast')) != catalog
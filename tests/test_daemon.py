@@ -0,0 +1,20 @@
+from conftest import write_example_input
+
+def test_input_without_orders(optimizer, tmp_path):
+    write_example_input(tmp_path / 'empty.xlsx', keep_orders=[])
+    assert optimizer.optimize_file(str(tmp_path / 'empty.xlsx'), str(tmp_path))
+    assert optimizer.alerts == [("No Orders", "There are no orders to pack in the input file.", "info")]
+    assert optimizer.last_text != "Cancelled."
+
+def test_cancel_before_any_order_is_packed(optimizer, tmp_path):
+    start_pack_pool = optimizer.start_pack_pool
+
+    def cancelling_start(*args):
+        optimizer.cancel_requested = True
+        return start_pack_pool(*args)
+    optimizer.start_pack_pool = cancelling_start
+    write_example_input(tmp_path / 'input.xlsx')
+    assert optimizer.optimize_file(str(tmp_path / 'input.xlsx'), str(tmp_path))
+    assert optimizer.packed == []
+    assert optimizer.alerts == []
+    assert optimizer.last_text == "Cancelled."
@@ -0,0 +1,115 @@
+import copy
+import dataclasses
+import itertools
+
+import pytest
+
+import bundle_exact
+import bundle_skyline
+from bundle_pipeline import ENGINES, pack_order
+from conftest import example_orders
+
+def _machine(sku, mach1_skus):
+    return 'MACH1' if sku.id.split('.')[-1].replace('_Partial', '')[-3:] in mach1_skus else 'MACH5'
+
+def _check_bundles(bundles, removed_skus, skus, config):
+    """The bundles hold each SKU once, within the bundle limits and without overlapping SKUs"""
+    placed = []
+    for bundle in bundles:
+        # the packaging is around the content; fillers fill its gaps
+        content = [sku for sku in bundle.skus if not sku.id.startswith('Pack_')]
+        assert content
+        assert all(sku.x >= 0 and sku.y >= 0 for sku in content)
+        assert all(sku.x + sku.width <= config.max_width + 1e-6 for sku in content)
+        assert all(sku.y + sku.height <= config.max_height + 1e-6 for sku in content)
+        assert sum(sku.weight for sku in content) <= config.max_weight
+        # SKUs at the same position are stacked lengthwise (lengths are rounded to the mm in the bundle length)
+        stacks = {}
+        for sku in content:
+            stacks.setdefault((sku.x, sku.y), []).append(sku)
+        assert all(sum(sku.length for sku in stack) < bundle.max_length + 1 for stack in stacks.values())
+        for ((x1, y1), stack1), ((x2, y2), stack2) in itertools.combinations(stacks.items(), 2):
+            width1, height1 = max(sku.width for sku in stack1), max(sku.height for sku in stack1)
+            width2, height2 = max(sku.width for sku in stack2), max(sku.height for sku in stack2)
+            assert (x1 + width1 <= x2 + 1e-6 or x2 + width2 <= x1 + 1e-6
+                    or y1 + height1 <= y2 + 1e-6 or y2 + height2 <= y1 + 1e-6)
+        placed.extend(sku.id for sku in content if 'Filler' not in sku.id)
+    assert sorted(placed + [sku.id for sku in removed_skus]) == sorted(sku.id for sku in skus)
+
+@pytest.mark.parametrize('order', example_orders())
+def test_skyline_follows_the_rules(example, order):
+    order_skus, mach1_skus, config = example
+    bundles, removed_skus, budget_limited = bundle_skyline.pack_skus(copy.deepcopy(order_skus[order]), mach1_skus,
+                                                                     config)
+    _check_bundles(bundles, removed_skus, order_skus[order], config)
+    for bundle in bundles:
+        machines = {_machine(sku, mach1_skus) for sku in bundle.skus if not sku.id.startswith('Pack_')}
+        assert machines == {bundle.packing_machine}
+    assert not budget_limited
+
+def test_skyline_long_order(sample_1011854):
+    """Fewer bundles than the pattern engine (2 against 3), so check that they follow the rules"""
+    order_skus, mach1_skus, config = sample_1011854
+    skus = order_skus[1011854]
+    bundles, removed_skus, _ = bundle_skyline.pack_skus(copy.deepcopy(skus), mach1_skus, config)
+    _check_bundles(bundles, removed_skus, skus, config)
+    assert not removed_skus
+    assert {bundle.max_length for bundle in bundles} == {bundle_skyline.LONG_LENGTH}
+
+def test_skyline_override(example):
+    order_skus, mach1_skus, config = example
+    skus = copy.deepcopy(order_skus[1013888])
+    mach1 = [sku for sku in skus if _machine(sku, mach1_skus) == 'MACH1']
+    mach5 = [sku for sku in skus if _machine(sku, mach1_skus) == 'MACH5']
+    assert mach1 and mach5
+
+    # SKUs of one machine with the same override get their own bundle
+    for sku in mach5[:2]:
+        sku.data = {**sku.data, 'Bdl_Override': 'A'}  # the rows' data is shared between SKUs
+    bundles, removed_skus, _ = bundle_skyline.pack_skus(copy.deepcopy(skus), mach1_skus, config)
+    _check_bundles(bundles, removed_skus, skus, config)
+    override_bundles = [bundle for bundle in bundles if any(sku.data and sku.data.get('Bdl_Override')
+                                                            for sku in bundle.skus)]
+    assert len(override_bundles) == 1
+    assert sum(not sku.id.startswith('Pack_') for sku in override_bundles[0].skus) == 2
+
+    # MACH1 and MACH5 SKUs cannot share a bundle
+    mach1[0].data = {**mach1[0].data, 'Bdl_Override': 'A'}
+    bundles, _, _ = bundle_skyline.pack_skus(copy.deepcopy(skus), mach1_skus, config)
+    assert bundles == -1
+
+@pytest.mark.parametrize('order', example_orders())
+def test_exact_keeps_at_most_the_engine_bundles(example, order):
+    order_skus, mach1_skus, config = example
+    # the skyline engine packs 1013888 (27 SKUs) quickly; the search lays its bundles out with the pattern engine
+    exact_config = dataclasses.replace(config, packing_engine='skyline', exact_max_skus=30, exact_time_limit=1)
+    skus = order_skus[order]
+    engine_bundles, _, _ = ENGINES['skyline'](copy.deepcopy(skus), mach1_skus, config)
+    bundles, removed_skus, _ = pack_order(copy.deepcopy(skus), mach1_skus, exact_config)
+    _check_bundles(bundles, removed_skus, skus, config)
+    assert len(bundles) <= len(engine_bundles)
+
+class _Clock:
+    """A clock that moves a second each time it is read"""
+    def __init__(self):
+        self.now = 0
+
+    def monotonic(self):
+        self.now += 1
+        return self.now
+
+@pytest.mark.parametrize('time_limit, time_budget, budget_limited', [(5, 0, False), (5, 1000, False),
+                                                                     (1000, 5, True)])
+def test_exact_time_limits(example, monkeypatch, time_limit, time_budget, budget_limited):
+    """The search of order 1013888 (27 SKUs in 2 bundles) takes seconds: it stops at the earlier deadline"""
+    order_skus, mach1_skus, config = example
+    config = dataclasses.replace(config, packing_engine='skyline', exact_max_skus=30, exact_time_limit=time_limit,
+                                 order_time_budget=time_budget)
+    clock = _Clock()
+    monkeypatch.setattr(bundle_exact, 'time', clock)
+    skus = order_skus[1013888]
+    bundles, removed_skus, limited = pack_order(copy.deepcopy(skus), mach1_skus, config)
+    assert limited == budget_limited
+    assert min(time_limit, time_budget or time_limit) < clock.now <= 10
+    assert len(bundles) == 2
+    _check_bundles(bundles, removed_skus, skus, config)
@@ -0,0 +1,48 @@
+import random
+import time
+
+import pytest
+
+from bundle_pipeline import Pipeline, Stage
+
+def test_sinks_get_items_in_source_order():
+    def slow_double(key, value):
+        time.sleep(random.uniform(0, 0.005))
+        return value * 2
+    sunk = []
+    pipeline = Pipeline([Stage("double", slow_double, workers=4)], [lambda key, value: sunk.append((key, value))])
+    assert pipeline.run((i, i) for i in range(200)) == 200
+    assert sunk == [(i, i * 2) for i in range(200)]
+
+def test_items_finished_early_are_bounded_while_the_first_is_slow():
+    queue_size, workers = 2, 2
+    taken, sunk, most_in_flight = [0], [], [0]
+
+    def source():
+        for i in range(500):
+            taken[0] += 1
+            most_in_flight[0] = max(most_in_flight[0], taken[0] - len(sunk))
+            yield i, i
+
+    def work(key, value):
+        if key == 0:
+            time.sleep(0.5)  # every other item finishes first
+        return value
+
+    pipeline = Pipeline([Stage("work", work, workers)], [lambda key, value: sunk.append(key)], queue_size=queue_size)
+    assert pipeline.run(source()) == 500
+    assert sunk == list(range(500))
+    # the ingest stage holds one item while it waits for a free place
+    assert most_in_flight[0] <= queue_size + workers + 1
+
+def test_dropped_items_and_errors():
+    def drop_odd(key, value):
+        if key == 7:
+            raise ValueError("bad order")
+        return None if key % 2 else value
+    sunk = []
+    pipeline = Pipeline([Stage("drop", drop_odd)], [lambda key, value: sunk.append(key)], queue_size=1)
+    with pytest.raises(ValueError):
+        pipeline.run((i, i) for i in range(100))
+    # items after the error may have been dropped before reaching the sinks, but none are sunk
+    assert all(key % 2 == 0 and key < 7 for key in sunk)
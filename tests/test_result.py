@@ -0,0 +1,47 @@
+import copy
+import gzip
+import json
+
+import pytest
+
+from bundle_pipeline import pack_order
+from bundle_result import PackResult, load_pack_result, save_pack_result
+
+def _placements(bundles):
+    return [(bundle.width, bundle.height, bundle.max_length, bundle.packing_machine,
+             [(sku.id, sku.x, sku.y, bool(sku.rotated), sku.width, sku.height, sku.length, sku.weight, sku.bundleqty,
+               sku.desc, bool(sku.can_be_bottom), sku.data) for sku in bundle.skus])
+            for bundle in bundles]
+
+def test_round_trip(example, tmp_path):
+    order_skus, mach1_skus, config = example
+    order = 1013888
+    skus = copy.deepcopy(order_skus[order])
+    bundles, removed_skus, _ = pack_order(skus, mach1_skus, config)
+    assert any('Filler' in sku.id for bundle in bundles for sku in bundle.skus)
+    assert any(sku.id.startswith('Pack_Angle') for bundle in bundles for sku in bundle.skus)
+
+    path = str(tmp_path / 'Optimized_Bundles.pack.json.gz')
+    save_pack_result(path, PackResult({order: bundles}, removed_skus=removed_skus, packaging_height=12.5,
+                                      packaging_width=7.0, lumber_height=89.0, unit='imperial',
+                                      params={'headers': ['OrderType', 'OrderNbr']}, fingerprints={order: 'abc'}))
+    result = load_pack_result(path)
+    assert list(result.order_bundles) == [order]
+    assert _placements(result.order_bundles[order]) == _placements(bundles)
+    assert [sku.id for sku in result.removed_skus] == [sku.id for sku in removed_skus]
+    assert (result.packaging_height, result.packaging_width, result.lumber_height) == (12.5, 7.0, 89.0)
+    assert result.unit == 'imperial'
+    assert result.params == {'headers': ['OrderType', 'OrderNbr']}
+    assert result.fingerprints == {order: 'abc'}
+
+@pytest.mark.parametrize('version', [None, 0, '1', 2])
+def test_unknown_version_is_rejected(tmp_path, version):
+    path = str(tmp_path / 'Optimized_Bundles.pack.json.gz')
+    save_pack_result(path, PackResult({}))
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        payload = json.load(fh)
+    payload['version'] = version
+    with gzip.open(path, 'wt', encoding='utf-8') as fh:
+        json.dump(payload, fh)
+    with pytest.raises(ValueError, match='version'):
+        load_pack_result(path)
@@ -0,0 +1,96 @@
+import json
+import os
+
+import openpyxl
+
+from conftest import write_example_input
+from bundle_store import ResultsStore, store_path_for
+
+BASELINE_SHEET = os.path.join(os.path.dirname(__file__), 'data', 'baseline_sheet_1013888.json')
+
+HEADERS = ['OrderType', 'OrderNbr', 'BundleNbr', 'Bdl_Override', 'Machine', 'ReviewedBy', 'ApprovedBy', 'InventoryID',
+           'LastModifiedOn', 'OptimizedOn']
+
+def _order_rows(order, bundles=1, optimized_on='2025-08-01'):
+    """Rows of an order as in the "Optimized_Bundles" sheet (a few of its columns)"""
+    rows = [['SO', order, 'ALL', None, None, None, None, 'Total_Order', '2025-07-30', optimized_on]]
+    for bundle in range(1, bundles + 1):
+        rows.append(['SO', order, f'{bundle}_ALL', None, 'MACH5', None, None, f'Total_Bundle_{bundle}', '2025-07-30',
+                     optimized_on])
+        rows.append(['SO', order, bundle, None, 'MACH5', None, None, '6PSP.289.15BRD', '2025-07-30', optimized_on])
+        rows.append(['SO', order, bundle, None, 'MACH5', None, None, 'Pack_Angle_7340', '2025-07-30', optimized_on])
+    return rows
+
+def _write_sheet(path, order_rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Optimized_Bundles"
+    sheet.append(HEADERS)
+    for rows in order_rows.values():
+        for row in rows:
+            sheet.append(row)
+        sheet.append([])
+    workbook.save(path)
+
+def test_import_replace_round_trip(tmp_path):
+    workbook_path = str(tmp_path / 'Optimized_Bundles.xlsx')
+    orders = {1013888: _order_rows(1013888, bundles=2), 1013895: _order_rows(1013895)}
+    _write_sheet(workbook_path, orders)
+    with ResultsStore(store_path_for(workbook_path)) as store:
+        store.import_sheet(openpyxl.load_workbook(workbook_path)['Optimized_Bundles'])
+        assert store.get_meta('headers') == HEADERS
+        assert list(store.iter_orders()) == [('1013888', orders[1013888]), ('1013895', orders[1013895])]
+        assert store.bundle_rows(1013888, 2) == [row for row in orders[1013888] if row[2] == 2]
+
+        # a replaced order moves to the end, with its fingerprint
+        replaced = _order_rows(1013888, optimized_on='2025-08-02')
+        store.replace_orders({1013888: replaced}, {1013888: 'abc'})
+        assert list(store.iter_orders()) == [('1013895', orders[1013895]), ('1013888', replaced)]
+        assert store.orders_to_optimize([1013888, 1013895, 1013913], [], {1013888: 'abc'}) == [1013913]
+        assert store.orders_to_optimize([1013888], [], {1013888: 'changed'}) == [1013888]
+
+def test_needs_sync_after_the_workbook_changes(tmp_path):
+    workbook_path = str(tmp_path / 'Optimized_Bundles.xlsx')
+    _write_sheet(workbook_path, {1013888: _order_rows(1013888)})
+    with ResultsStore(store_path_for(workbook_path)) as store:
+        assert store.needs_sync(workbook_path)  # a new store
+        store.import_sheet(openpyxl.load_workbook(workbook_path)['Optimized_Bundles'])
+        store.mark_synced(workbook_path)
+        assert not store.needs_sync(workbook_path)
+
+        # edited outside of the program
+        modified = os.path.getmtime(workbook_path) + 10
+        os.utime(workbook_path, (modified, modified))
+        assert store.needs_sync(workbook_path)
+        store.mark_synced(workbook_path)
+        assert not store.needs_sync(workbook_path)
+
+def test_sheet_rows_and_outline_levels_match_the_original_writer(tmp_path):
+    from bundle_daemon import HeadlessOptimizer
+    with open(BASELINE_SHEET) as fh:
+        baseline = json.load(fh)
+    write_example_input(tmp_path / 'input.xlsx', keep_orders=[1013888])
+    optimizer = HeadlessOptimizer(unit='metric', export_formats=['xlsx'], draw_images=False)
+    try:
+        assert optimizer.optimize_file(str(tmp_path / 'input.xlsx'), str(tmp_path))
+    finally:
+        optimizer.close()
+
+    sheet = openpyxl.load_workbook(tmp_path / 'Optimized_Bundles.xlsx')['Optimized_Bundles']
+    assert [cell.value for cell in sheet[1]] == baseline['headers']
+    written = [{'level': sheet.row_dimensions[row].outlineLevel, 'row': [cell.value for cell in sheet[row]][:-1]}
+               for row in range(2, sheet.max_row + 1) if sheet.cell(row, 2).value is not None]
+    assert written == baseline['rows']
+
+def test_sheet_lists_orders_like_the_original_writer(tmp_path):
+    from bundle_daemon import HeadlessOptimizer
+    write_example_input(tmp_path / 'input.xlsx')
+    optimizer = HeadlessOptimizer(unit='metric', export_formats=['xlsx'], draw_images=False)
+    try:
+        assert optimizer.optimize_file(str(tmp_path / 'input.xlsx'), str(tmp_path))
+    finally:
+        optimizer.close()
+    sheet = openpyxl.load_workbook(tmp_path / 'Optimized_Bundles.xlsx')['Optimized_Bundles']
+    orders = list(dict.fromkeys(row[1] for row in sheet.iter_rows(min_row=2, values_only=True) if row[1] is not None))
+    # the original program lists the orders in reverse input order
+    assert orders == [1013895, 1013888, 1013935, 1013950, 1013913, 1013947, 1013896, 1013868]
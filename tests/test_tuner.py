@@ -0,0 +1,18 @@
+import copy
+import dataclasses
+
+from bundle_tuner import evaluate_order
+
+def _state(skus):
+    return [dataclasses.astuple(sku) for sku in skus]
+
+def test_evaluate_order_keeps_the_skus(example):
+    """The serial sweep packs the same SKUs with each parameter set"""
+    order_skus, mach1_skus, config = example
+    config = dataclasses.replace(config, packing_engine='skyline')
+    skus = copy.deepcopy(order_skus[1013888])
+    before = _state(skus)
+    first = evaluate_order(skus, mach1_skus, config)
+    assert _state(skus) == before
+    assert first[0] == 2
+    assert evaluate_order(skus, mach1_skus, config)[:2] == first[:2]